@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import functools
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Track
+from benchmarks.replay import SyntheticCatalog, ReplaySpotify, ReplayDeezerSession, ReplayYTMusic
+
+SONGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "songs.txt")
+
+
+def synthetic_tracks(size: int, seed: int = 7) -> List[Track]:
+    """Playlist sintética con artistas repetidos, duraciones y algunos ISRC"""
+    tracks = []
+    for i in range(size):
+        artist_id = (i * 7919 + seed) % max(1, size // 8)
+        tracks.append(Track(
+            artist=f"Artista {artist_id}",
+            title=f"Canción {i} de prueba",
+            album=f"Álbum {artist_id % 500}",
+            duration_ms=150_000 + (i * 37 % 180) * 1000,
+            isrc=f"BENCH{i:07d}" if i % 3 == 0 else None,
+        ))
+    return tracks
+
+
+def _load_source(scenario: dict, latency: float) -> List[Track]:
+    """Lee las canciones de la fuente del escenario (archivo, Deezer o YouTube simulados)"""
+    import clone_cli
+    from services.deezer_service import DeezerClient
+    from services.youtube_music_service import YoutubeMusicClient
+
+    tracks = synthetic_tracks(scenario["size"]) if scenario["size"] else clone_cli.read_songs_file(SONGS_FILE)
+
+    if scenario["source"] == "deezer":
+        client = DeezerClient()
+        client.session = ReplayDeezerSession(tracks, latency=latency)
+        return client.get_tracks_from_playlist("https://www.deezer.com/playlist/1")
+
+    if scenario["source"] == "youtube":
+        client = YoutubeMusicClient(yt=ReplayYTMusic(tracks, latency=latency))
+        return client.get_tracks_from_playlist("PLbenchmark")
+
+    return tracks
+
+
+def run_scenario(scenario: dict, options: dict) -> dict:
+    """Corre el flujo completo (fuente → búsqueda → playlist) y devuelve las métricas"""
+    import clone_cli
+    from services.client_registry import REGISTRY
+    from services.metrics import METRICS
+
+    fixtures = {}
+    if options["fixtures"]:
+        with open(options["fixtures"], "r", encoding="utf-8") as f:
+            fixtures = json.load(f)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        tracks = _load_source(scenario, options["latency"])
+        source_time = time.perf_counter() - start
+
+        catalog = SyntheticCatalog(tracks)
+        sp = ReplaySpotify(fixtures, catalog, latency=options["latency"])
+        #con --processes cada proceso crea su propio ReplaySpotify igual a este
+        REGISTRY.register("spotify", functools.partial(ReplaySpotify, fixtures, catalog, latency=options["latency"]))
+        start = time.perf_counter()
+        result = clone_cli.create_playlist_in_destination(
+            "1",
+            "benchmark",
+            tracks,
+            sp=sp,
+            workers=options["workers"],
+            rate=options["rate"],
+            processes=options["processes"],
+        )
+        clone_time = time.perf_counter() - start
+
+    total = len(tracks)
+    wall = source_time + clone_time
+    return {
+        "scenario": scenario["name"],
+        "tracks": total,
+        "found": result["found"],
+        "source_s": round(source_time, 3),
+        "wall_s": round(wall, 3),
+        #con --processes las búsquedas se hacen en otros procesos: se usa el contador global
+        "api_calls_per_track": round(METRICS.counter("search_api_calls_total") / total, 3) if total else 0.0,
+        "matches_per_s": round(result["found"] / clone_time, 1) if clone_time else 0.0,
+        #ru_maxrss está en KB en Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        #latencias por endpoint/etapa, contadores de caché, etc. (solo en --json)
+        "metrics": METRICS.snapshot(),
+    }
+
+
+def _run_isolated(scenario: dict, options: dict) -> dict:
+    """Cada escenario corre en su propio proceso para que el pico de memoria sea suyo"""
+    ctx = multiprocessing.get_context("spawn")
+    #ProcessPoolExecutor y no Pool: sus procesos pueden crear hijos (--processes)
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+        return executor.submit(run_scenario, scenario, options).result()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark offline del clonador de playlists")
+    parser.add_argument("--sizes", default="10000,100000", help="tamaños de las playlists sintéticas, separados por coma")
+    parser.add_argument("--sources", default="file", help="fuentes a simular: file, deezer, youtube (separadas por coma)")
+    parser.add_argument("--latency", type=float, default=0.002, help="latencia simulada por llamada, en segundos")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--processes", type=int, default=1, help="procesos para la búsqueda (modo multi-proceso)")
+    parser.add_argument("--rate", type=float, default=100_000.0, help="búsquedas por segundo permitidas")
+    parser.add_argument("--fixtures", default=None, help="JSON con respuestas grabadas (RecordingSpotify.save)")
+    parser.add_argument("--no-songs", action="store_true", help="no correr el escenario con songs.txt")
+    parser.add_argument("--json", default=None, help="guardar los resultados en este archivo")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    options = {
+        "latency": args.latency,
+        "workers": args.workers,
+        "rate": args.rate,
+        "processes": args.processes,
+        "fixtures": args.fixtures,
+    }
+
+    scenarios = []
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    for source in [s.strip() for s in args.sources.split(",") if s.strip()]:
+        if not args.no_songs:
+            scenarios.append({"name": f"{source}:songs.txt", "source": source, "size": 0})
+        for size in sizes:
+            scenarios.append({"name": f"{source}:synthetic-{size}", "source": source, "size": size})
+
+    results = []
+    header = f"{'escenario':<26}{'tracks':>8}{'wall s':>9}{'fuente s':>10}{'llam/track':>11}{'matches/s':>11}{'RSS MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for scenario in scenarios:
+        r = _run_isolated(scenario, options)
+        results.append(r)
+        print(
+            f"{r['scenario']:<26}{r['tracks']:>8}{r['wall_s']:>9}{r['source_s']:>10}"
+            f"{r['api_calls_per_track']:>11}{r['matches_per_s']:>11}{r['peak_rss_mb']:>9}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"options": options, "results": results}, f, indent=2)
+        print(f"\n→ Resultados guardados en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
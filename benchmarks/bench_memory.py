@@ -0,0 +1,67 @@
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Track, TrackStore
+from benchmarks.bench_clone import synthetic_tracks
+
+
+@dataclass
+class LegacyTrack:
+    """Track como estaba antes (dataclass sin __slots__), solo para comparar"""
+    artist: str
+    title: str
+    album: Optional[str] = None
+    duration_ms: Optional[int] = None
+    isrc: Optional[str] = None
+
+
+def _measure(build: Callable[[], object]) -> int:
+    """Bytes que ocupa lo que construye build (medido con tracemalloc)"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def _rows(size: int):
+    #las filas se generan como texto, para que los strings de cada colección sean suyos
+    return [
+        (t.artist, t.title, t.album, t.duration_ms, t.isrc)
+        for t in synthetic_tracks(size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria por canción: lista de Tracks vs TrackStore")
+    parser.add_argument("--sizes", default="10000,100000")
+    args = parser.parse_args()
+
+    header = f"{'canciones':>10}{'LegacyTrack B/track':>22}{'Track B/track':>16}{'TrackStore B/track':>21}"
+    print(header)
+    print("-" * len(header))
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        rows = _rows(size)
+
+        def _copy(value):
+            #copia del string para no medir memoria compartida con `rows`
+            return None if value is None else "".join(value)
+
+        legacy = _measure(lambda: [LegacyTrack(*map(_copy, r[:3]), r[3], _copy(r[4])) for r in rows])
+        slotted = _measure(lambda: [Track(*map(_copy, r[:3]), r[3], _copy(r[4])) for r in rows])
+        store = _measure(lambda: TrackStore(Track(*map(_copy, r[:3]), r[3], _copy(r[4])) for r in rows))
+
+        print(f"{size:>10}{legacy / size:>22.1f}{slotted / size:>16.1f}{store / size:>21.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+from models import Track
+
+
+def _sleep(latency: float):
+    if latency > 0:
+        time.sleep(latency)
+
+
+class SyntheticCatalog:
+    """
+    Catálogo de Spotify generado a partir de una lista de Tracks.
+
+    Algunas canciones no existen (miss_rate) y otras aparecen con
+    variaciones en el título o el artista, para que el matcher tenga que
+    escalar a otras estrategias como pasaría con la API real.
+    """
+
+    def __init__(self, tracks: Sequence[Track], miss_rate: float = 0.03, variant_rate: float = 0.2, seed: int = 42):
+        rng = random.Random(seed)
+        self.by_wide: Dict[str, List[dict]] = {}
+        self.by_strict: Dict[str, List[dict]] = {}
+        self.by_title: Dict[str, List[dict]] = {}
+        self.by_isrc: Dict[str, dict] = {}
+
+        for idx, track in enumerate(tracks):
+            if rng.random() < miss_rate:
+                continue
+
+            name, artist = track.title, track.artist
+            variant = rng.random()
+            if variant < variant_rate / 2:
+                name = f"{name} - Remastered"
+            elif variant < variant_rate:
+                artist = f"{artist} & Orquesta"
+
+            item = {
+                "id": f"sp{idx:07d}",
+                "name": name,
+                "artists": [{"name": artist}],
+                "duration_ms": track.duration_ms or 180_000 + (idx % 120) * 1000,
+                "external_ids": {"isrc": track.isrc} if track.isrc else {},
+            }
+            self.by_wide.setdefault(f"{track.title} {track.artist}".lower(), []).append(item)
+            self.by_strict.setdefault(f"track:{name} artist:{artist}".lower(), []).append(item)
+            self.by_title.setdefault(track.title.lower(), []).append(item)
+            if track.isrc:
+                self.by_isrc[track.isrc.lower()] = item
+
+    def search(self, query: str, limit: int) -> List[dict]:
+        query = query.lower()
+        if query.startswith("isrc:"):
+            item = self.by_isrc.get(query[5:])
+            return [item] if item else []
+        if query.startswith("track:"):
+            return self.by_strict.get(query, [])[:limit]
+        return (self.by_wide.get(query) or self.by_title.get(query) or [])[:limit]
+
+
+class ReplaySpotify:
+    """
+    Sustituto de spotipy.Spotify para benchmarks.
+
+    Contesta primero con respuestas grabadas (fixtures["search"][query]) y,
+    si no hay, con el catálogo sintético. Cuenta las llamadas por endpoint.
+    """
+
+    def __init__(self, fixtures: Optional[dict] = None, catalog: Optional[SyntheticCatalog] = None, latency: float = 0.0):
+        self.fixtures = fixtures or {}
+        self.catalog = catalog
+        self.latency = latency
+        self.calls = Counter()
+        self.added = 0
+        self._lock = threading.Lock()
+
+    def _count(self, endpoint: str):
+        with self._lock:
+            self.calls[endpoint] += 1
+
+    def search(self, q: str, type: str = "track", limit: int = 10, **kwargs) -> dict:
+        self._count("search")
+        _sleep(self.latency)
+        recorded = self.fixtures.get("search", {}).get(q)
+        if recorded is not None:
+            return recorded
+        items = self.catalog.search(q, limit) if self.catalog else []
+        return {"tracks": {"items": items}}
+
+    def current_user(self) -> dict:
+        self._count("me")
+        _sleep(self.latency)
+        return {"id": "benchmark", "display_name": "Benchmark"}
+
+    def user_playlist_create(self, user: str, name: str, public: bool = False, description: str = "") -> dict:
+        self._count("playlist_create")
+        _sleep(self.latency)
+        return {"id": "benchmark-playlist"}
+
+    def playlist_add_items(self, playlist_id: str, items: List[str], position: Optional[int] = None) -> dict:
+        self._count("playlist_add_items")
+        _sleep(self.latency)
+        with self._lock:
+            self.added += len(items)
+        return {"snapshot_id": str(self.added)}
+
+    def playlist_items(self, playlist_id: str, fields: Optional[str] = None, limit: int = 100, **kwargs) -> dict:
+        """Solo el total de canciones agregadas (sin los items)"""
+        self._count("playlist_items")
+        _sleep(self.latency)
+        return {"total": self.added, "items": [], "next": None}
+
+
+class RecordingSpotify:
+    """
+    Envuelve un cliente spotipy real y guarda las respuestas de búsqueda
+    para poder reproducirlas después con ReplaySpotify.
+    """
+
+    def __init__(self, sp):
+        self.sp = sp
+        self.recorded = {"search": {}}
+        self._lock = threading.Lock()
+
+    def search(self, q: str, type: str = "track", limit: int = 10, **kwargs) -> dict:
+        result = self.sp.search(q=q, type=type, limit=limit, **kwargs)
+        with self._lock:
+            self.recorded["search"][q] = result
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.sp, name)
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.recorded, f, ensure_ascii=False)
+
+
+class _ReplayResponse:
+    def __init__(self, data: dict):
+        self._data = data
+        self.content = json.dumps(data).encode("utf-8")
+
+    def raise_for_status(self):
+        pass
+
+    def json(self) -> dict:
+        return self._data
+
+
+class ReplayDeezerSession:
+    """
+    Sustituto de requests.Session que sirve una playlist de Deezer paginada.
+    Igual que la API real, las canciones de la playlist no traen ISRC: solo
+    /track/{id} (el id es la posición + 1).
+    """
+
+    def __init__(self, tracks: Sequence[Track], latency: float = 0.0, page_size: int = 100):
+        self.tracks = tracks
+        self.latency = latency
+        self.page_size = page_size
+        self.calls = 0
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None, **kwargs):
+        self.calls += 1
+        _sleep(self.latency)
+        if "/track/" in url:
+            track_id = int(url.rsplit("/", 1)[1])
+            return _ReplayResponse({"id": track_id, "isrc": self.tracks[track_id - 1].isrc or ""})
+
+        params = params or {}
+        index = int(params.get("index", url.split("index=")[1].split("&")[0] if "index=" in url else 0))
+        page = self.tracks[index:index + self.page_size]
+        data = {
+            "data": [
+                {
+                    "id": index + i + 1,
+                    "title": t.title,
+                    "artist": {"name": t.artist},
+                    "album": {"title": t.album or ""},
+                    "duration": (t.duration_ms or 0) // 1000,
+                }
+                for i, t in enumerate(page)
+            ],
+            "total": len(self.tracks),
+        }
+        if index + self.page_size < len(self.tracks):
+            data["next"] = f"{url.split('?')[0]}?limit={self.page_size}&index={index + self.page_size}"
+        return _ReplayResponse(data)
+
+
+class ReplayYTMusic:
+    """Sustituto de ytmusicapi.YTMusic que devuelve una playlist fija"""
+
+    def __init__(self, tracks: Sequence[Track], latency: float = 0.0):
+        self.tracks = tracks
+        self.latency = latency
+        self.calls = 0
+
+    def get_playlist(self, playlistId: str, limit: Optional[int] = 100, **kwargs) -> dict:
+        self.calls += 1
+        _sleep(self.latency)
+        tracks = self.tracks if limit is None else self.tracks[:limit]
+        return {
+            "id": playlistId,
+            "trackCount": len(self.tracks),
+            "tracks": [
+                {
+                    "title": t.title,
+                    "artists": [{"name": t.artist}],
+                    "album": {"name": t.album} if t.album else None,
+                    "duration_seconds": (t.duration_ms or 0) // 1000,
+                    "videoId": f"vid{i:07d}",
+                }
+                for i, t in enumerate(tracks)
+            ],
+        }
@@ -1,50 +1,85 @@
+import time
+
+#para --profile-startup: cuánto tardan los imports de este módulo
+_IMPORT_STARTED = time.perf_counter()
+
+import argparse
+import itertools
 import os
-from typing import List, Tuple
-from models import Track
+import sys
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List, Optional
+from models import IncompleteSourceError, Track, TrackStore
 from services.apple_service import get_tracks_from_apple_playlist
-from services.spotify_service import (
-    load_env,
-    init_spotify,
-    search_track,
-    create_playlist,
-    add_tracks_in_batches
-)
-from services.deezer_service import (
-    get_tracks_from_deezer_playlist,
-    create_playlist_in_deezer,
-    add_tracks_to_deezer_playlist
+from services.matching_service import (
+    resolve_tracks,
+    stream_resolve,
+    ResolveStats,
+    DEFAULT_WORKERS,
+    DEFAULT_RATE
 )
-from services.youtube_music_service import (
-    get_tracks_from_youtube_music_playlist,
-    create_playlist_in_youtube_music,
-    add_tracks_to_youtube_music_playlist
+from services.metrics import METRICS, write_json, write_prometheus
+from services.rate_limiter import get_limiter
+from services.checkpoint import CheckpointJournal, JournalMismatchError, SourceChangedError
+from services.client_registry import REGISTRY, get_client
+from services.match_cache import MatchCache, DEFAULT_CACHE_PATH
+from services.catalog_index import DEFAULT_CATALOG_PATH
+from services.http_cache import (
+    configure_http_cache,
+    close_http_cache,
+    shared_http_cache,
+    DEFAULT_HTTP_CACHE_PATH,
+    DEFAULT_FRESH_SECONDS,
+    DEFAULT_MAX_BYTES
 )
+from services.ingest_service import IngestReport, iter_merged_sources, parse_source_spec
+from services.file_import_service import ImportReport, import_tracks, iter_tracks_from_file, DEFAULT_SEPARATOR
+
+#spotipy, requests, ytmusicapi y los servicios de cada plataforma se importan
+#dentro de las funciones que los usan: una corrida solo carga lo que necesita
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+#módulos pesados que se reportan en --profile-startup
+HEAVY_MODULES = ("spotipy", "requests", "ytmusicapi", "httpx", "numpy", "rapidfuzz", "dotenv")
 
-def read_songs_file(path: str) -> List[Tuple[str, str]]:
+def read_songs_file(
+        path: str,
+        compact: bool = False,
+        separator: str = DEFAULT_SEPARATOR,
+        dedupe: bool = False
+) -> List[Track]:
     """
     Lee un archivo de texto con el siguiente formato:
     Artista - Título
 
     y devuelve una lista de objetos de clase Track
+    (o un TrackStore si compact=True, para archivos muy grandes)
+
+    También acepta CSV y M3U/M3U8 (según la extensión). Las líneas inválidas
+    se resumen al final en lugar de imprimirse una por una.
     """
-    songs: List[Track] = []
-
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            #separar por " - "
-            parts=line.split(" - ", maxsplit=1)
-            if len(parts) != 2:
-                print(f"[ADVERTENCIA] Línea inválida, se ignorará: {line}")
-                continue
-            artist, title = parts[0].strip(), parts[1].strip()
-            track = Track(artist=artist, title=title)
-            songs.append(track)
+    songs, report = import_tracks(path, separator=separator, dedupe=dedupe, compact=compact)
+    if report.malformed or report.duplicates:
+        print(report.summary())
     return songs
 
-def get_tracks_from_source(source_type: str) -> List[Track]:
+def iter_songs_file(path: str, separator: str = DEFAULT_SEPARATOR, dedupe: bool = False) -> Iterator[Track]:
+    """
+    Igual que read_songs_file, pero entrega las canciones una por una (modo
+    streaming); el resumen de líneas inválidas se muestra al terminar el archivo.
+    """
+    report = ImportReport()
+    yield from iter_tracks_from_file(path, separator=separator, dedupe=dedupe, report=report)
+    if report.malformed or report.duplicates:
+        print(report.summary())
+
+def get_tracks_from_source(
+        source_type: str,
+        compact: bool = False,
+        songs_file: str = "songs.txt",
+        separator: str = DEFAULT_SEPARATOR,
+        dedupe: bool = False
+) -> List[Track]:
     """
     Obtiene canciones desde cualquier fuente.
     source_type puede ser: 
@@ -52,15 +87,17 @@ def get_tracks_from_source(source_type: str) -> List[Track]:
         "2" (apple), 
         "3" (deezer), 
         "4" (youtube)
+    Con compact=True las canciones se guardan en un TrackStore.
+    songs_file, separator y dedupe aplican a la fuente archivo.
     """
     if source_type == "1":
         #fuente: archivo
-        songs_file = "songs.txt"
         if not os.path.exists(songs_file):
             print(f"Error: no se encontró el archivo {songs_file}.")
             return []
         
-        songs = read_songs_file(songs_file)
+        with METRICS.timer("source_fetch_seconds", source="file"):
+            songs = read_songs_file(songs_file, compact=compact, separator=separator, dedupe=dedupe)
         if not songs:
             print("No se encontraron canciones válidas en el archivo.")
             return []
@@ -71,7 +108,8 @@ def get_tracks_from_source(source_type: str) -> List[Track]:
     elif source_type == "2":
         #fuente: apple music (solo simulado)
         fake_url = "https://music.apple.com/mx/playlist/demo"
-        songs = get_tracks_from_apple_playlist(fake_url)
+        with METRICS.timer("source_fetch_seconds", source="apple"):
+            songs = get_tracks_from_apple_playlist(fake_url)
         if not songs:
             print("No se obtuvieron canciones desde Apple Music (solo simulado)")
             return []
@@ -80,12 +118,22 @@ def get_tracks_from_source(source_type: str) -> List[Track]:
     
     elif source_type == "3":
         #fuente: deezer
+        from services.deezer_service import get_tracks_from_deezer_playlist, iter_tracks_from_deezer_playlist
+
         deezer_url = input("Pega la URL de la playlist de Deezer: ").strip()
         if not deezer_url:
             print("URL vacía.")
             return []
         print("\n→ Obteniendo canciones desde Deezer...")
-        songs = get_tracks_from_deezer_playlist(deezer_url)
+        try:
+            with METRICS.timer("source_fetch_seconds", source="deezer"):
+                if compact:
+                    songs = TrackStore(iter_tracks_from_deezer_playlist(deezer_url))
+                else:
+                    songs = get_tracks_from_deezer_playlist(deezer_url)
+        except IncompleteSourceError as e:
+            print(f"❌ {e}")
+            return []
         if not songs:
             print("No se obtuvieron canciones desde Deezer.")
             return []
@@ -94,12 +142,25 @@ def get_tracks_from_source(source_type: str) -> List[Track]:
     
     elif source_type == "4":
         #fuente: youtube music
+        from services.youtube_music_service import (
+            get_tracks_from_youtube_music_playlist,
+            iter_tracks_from_youtube_music_playlist
+        )
+
         yt_url = input("Pega la URL o ID de la playlist de Youtube Music: ").strip()
         if not yt_url:
             print("URL vacía.")
             return[]
         print("\n→ Obteniendo canciones desde Youtube Music...")
-        songs = get_tracks_from_youtube_music_playlist(yt_url)
+        try:
+            with METRICS.timer("source_fetch_seconds", source="youtube"):
+                if compact:
+                    songs = TrackStore(iter_tracks_from_youtube_music_playlist(yt_url))
+                else:
+                    songs = get_tracks_from_youtube_music_playlist(yt_url)
+        except IncompleteSourceError as e:
+            print(f"❌ {e}")
+            return []
         if not songs:
             print("No se obtuvieron canciones desde Youtube Music.")
             return []
@@ -109,53 +170,297 @@ def get_tracks_from_source(source_type: str) -> List[Track]:
         print("Opción de fuente inválida.")
         return []
 
+def load_tracks(source: str, location: str = "", compact: bool = False) -> List[Track]:
+    """
+    Versión no interactiva de get_tracks_from_source (para jobs y scripts).
+    source puede ser: "file", "apple", "deezer", "youtube"
+    location es la ruta del archivo o la URL/ID de la playlist.
+    Con compact=True las canciones se guardan en un TrackStore.
+    """
+    if source == "file":
+        path = location or "songs.txt"
+        if not os.path.exists(path):
+            print(f"Error: no se encontró el archivo {path}.")
+            return []
+        return read_songs_file(path, compact=compact)
+    elif source == "apple":
+        tracks = get_tracks_from_apple_playlist(location)
+    elif source == "deezer":
+        from services.deezer_service import get_tracks_from_deezer_playlist, iter_tracks_from_deezer_playlist
+        try:
+            if compact:
+                return TrackStore(iter_tracks_from_deezer_playlist(location))
+            return get_tracks_from_deezer_playlist(location)
+        except IncompleteSourceError as e:
+            print(f"❌ {e}")
+            return []
+    elif source == "youtube":
+        from services.youtube_music_service import (
+            get_tracks_from_youtube_music_playlist,
+            iter_tracks_from_youtube_music_playlist
+        )
+        try:
+            if compact:
+                return TrackStore(iter_tracks_from_youtube_music_playlist(location))
+            return get_tracks_from_youtube_music_playlist(location)
+        except IncompleteSourceError as e:
+            print(f"❌ {e}")
+            return []
+    else:
+        print(f"Fuente inválida: {source}")
+        return []
+
+    return TrackStore(tracks) if compact else tracks
+
+def iter_tracks_from_source(
+        source_type: str,
+        songs_file: str = "songs.txt",
+        separator: str = DEFAULT_SEPARATOR,
+        dedupe: bool = False
+) -> Iterator[Track]:
+    """
+    Igual que get_tracks_from_source, pero devuelve un iterador para el modo
+    streaming: el archivo y Deezer entregan canciones conforme se leen, sin
+    esperar la playlist completa. YouTube Music se descarga completa
+    (ytmusicapi no pagina hacia afuera) y luego se entrega una por una.
+
+    Las preguntas al usuario (URL, etc.) se hacen antes de devolver el iterador.
+    """
+    if source_type == "1":
+        if not os.path.exists(songs_file):
+            print(f"Error: no se encontró el archivo {songs_file}.")
+            return iter([])
+        print(f"→ Leyendo canciones desde {songs_file} (streaming)...")
+        return iter_songs_file(songs_file, separator=separator, dedupe=dedupe)
+
+    if source_type == "3":
+        from services.deezer_service import iter_tracks_from_deezer_playlist
+
+        deezer_url = input("Pega la URL de la playlist de Deezer: ").strip()
+        if not deezer_url:
+            print("URL vacía.")
+            return iter([])
+        print("\n→ Obteniendo canciones desde Deezer (streaming)...")
+        return iter_tracks_from_deezer_playlist(deezer_url)
+
+    if source_type == "4":
+        from services.youtube_music_service import iter_tracks_from_youtube_music_playlist
+
+        yt_url = input("Pega la URL o ID de la playlist de Youtube Music: ").strip()
+        if not yt_url:
+            print("URL vacía.")
+            return iter([])
+        print("\n→ Obteniendo canciones desde Youtube Music (streaming)...")
+        return iter_tracks_from_youtube_music_playlist(yt_url)
+
+    #el resto de fuentes todavía se leen completas
+    return iter(get_tracks_from_source(source_type))
+
+async def _resolve_tracks_async(
+        sp,
+        tracks: List[Track],
+        cache: MatchCache,
+        stats: ResolveStats,
+        on_result=None,
+        catalog=None,
+        limiter=None
+):
+    """Búsqueda con el cliente asíncrono, usando el mismo login que sp"""
+    from services.async_http import close_async_client
+    from services.async_spotify_service import AsyncSpotifyClient, resolve_tracks_async
+
+    try:
+        client = AsyncSpotifyClient(sp.auth_manager, limiter=limiter)
+        return await resolve_tracks_async(
+            client, tracks, cache=cache, stats=stats, on_result=on_result, catalog=catalog
+        )
+    finally:
+        await close_async_client()
+
+def _open_spotify_playlist(sp, playlist_name: str, journal: Optional[CheckpointJournal]) -> Optional[str]:
+    """Crea la playlist en Spotify, o reutiliza la de la corrida anterior si hay journal"""
+    from services.spotify_service import create_playlist, get_current_user
+
+    if journal and journal.playlist_id:
+        print(f"\n→ Reanudando la playlist '{playlist_name}' ({journal.playlist_id}) de la corrida anterior")
+        return journal.playlist_id
+
+    #obtener username (el perfil ya se pidió al autenticar)
+    username = get_current_user(sp)["id"]
+
+    print(f"\n→ Creando playlist '{playlist_name}' en Spotify...")
+    playlist_id = create_playlist(sp, username, playlist_name)
+    if playlist_id and journal:
+        journal.set_playlist(playlist_id)
+    return playlist_id
+
+def _committed_in_playlist(sp, playlist_id: str, journal: Optional[CheckpointJournal]) -> int:
+    """
+    Cuántos ids (en orden) ya están en la playlist según el journal. Al reanudar
+    se compara con el total real: si el proceso murió justo después de que
+    Spotify aceptó un lote, ese lote no quedó anotado y no se debe repetir.
+    """
+    from services.spotify_service import get_playlist_total
+
+    if not journal or not journal.resuming:
+        return 0
+    remote = get_playlist_total(sp, playlist_id)
+    if remote > journal.committed:
+        journal.record_batch(remote)
+    return journal.committed
+
 def create_playlist_in_destination(
         destination_type: str,
         playlist_name: str,
         tracks: List[Track],
-        sp=None #cliente Spotify si es necesario
+        sp=None, #cliente Spotify si es necesario
+        workers: int = DEFAULT_WORKERS,
+        rate: float = DEFAULT_RATE,
+        cache: MatchCache = None,
+        use_async: bool = False,
+        journal: Optional[CheckpointJournal] = None,
+        processes: int = 1,
+        catalog=None
 ) -> dict:
     """
     Crea una playlist en el destino elegido y agrega las canciones
     destination_type puede ser: "1" (spotify), "2", (deezer), "3" (youtube)
+
+    workers y rate controlan la búsqueda concurrente en Spotify
+    (hilos y peticiones por segundo). cache es opcional y evita repetir
+    búsquedas ya hechas en ejecuciones anteriores. use_async hace la
+    búsqueda con el cliente asíncrono (un solo pool de conexiones).
+    Con processes > 1 la búsqueda y el fuzzy matching se reparten entre
+    varios procesos (bibliotecas muy grandes, ver parallel_matching).
+    catalog (ver CatalogIndex) resuelve sin llamar a la API las canciones
+    que ya aparecieron entre los candidatos de búsquedas anteriores.
+
+    Con journal (solo Spotify) cada paso queda anotado y, si el journal es
+    de una corrida interrumpida, se continúa donde se quedó: misma playlist,
+    sin repetir búsquedas ni lotes ya agregados.
     """
 
     if destination_type == "1":
         #Destino: Spotify
+        from services.spotify_service import open_playlist_writer
+
         if not sp:
             print("Cliente Spotify no inicializado")
             return {"status": "error", "message": "Spotify client not inicialized"}
         
-        #obtener username
-        me= sp.current_user()
-        username = me["id"]
+        #con journal solo se buscan las canciones que no se resolvieron antes
+        pending = tracks
+        pending_idx = None
+        if journal:
+            try:
+                pending_idx = [i for i, song in enumerate(tracks) if not journal.get(i, song)[0]]
+            except SourceChangedError as e:
+                return {"status": "error", "message": str(e)}
+            pending = [tracks[i] for i in pending_idx]
+            if len(pending) < len(tracks):
+                print(f"→ {len(tracks) - len(pending)} canciones ya se habían buscado en la corrida anterior")
 
-        print(f"\n→ Creando playlist '{playlist_name}' en Spotify...")
-        playlist_id = create_playlist(sp, username, playlist_name)
+        #--rate es el total de peticiones a Spotify: con varios procesos el
+        #principal (playlist y lotes) se queda una parte y el resto se reparte
+        search_rate = rate
+        if processes > 1 and not use_async:
+            from services.parallel_matching import split_rate
+            main_rate, search_rate = split_rate(rate)
+        else:
+            main_rate = rate
+        limiter = get_limiter("spotify", main_rate)
 
+        playlist_id = _open_spotify_playlist(sp, playlist_name, journal)
         if not playlist_id:
             return {"status": "error", "message": "Failed to create Spotify playlist"}
-        
-        #buscar cada canción en Spotify
-        found_track_ids = []
-        not_found = []
-
-        print("\n=== Buscando canciones en Spotify ===")
-        for idx, song in enumerate(tracks, start=1):
-            print(f"[{idx}/{len(tracks)}] Buscando: {song}...", end=" ", flush=True)
-            track = search_track(sp, song.artist, song.title, song.duration_ms)
-            if track:
-                found_track_ids.append(track["id"])
-                print(f"✅")
+
+        #los ids se van escribiendo en la playlist (en otro hilo) conforme se
+        #resuelven, en el orden de la fuente, sin esperar a terminar la búsqueda
+        committed = _committed_in_playlist(sp, playlist_id, journal)
+        writer = open_playlist_writer(
+            sp,
+            playlist_id,
+            start=committed,
+            on_commit=journal.record_batch if journal else None,
+            limiter=limiter
+        )
+        found = 0
+        cursor = 0 #con journal: siguiente posición de la fuente que falta mandar al writer
+
+        def _push(track_id: Optional[str]):
+            nonlocal found
+            if track_id:
+                found += 1
+                #los primeros `committed` ya están en la playlist desde la corrida anterior
+                if found > committed:
+                    writer.add(track_id)
+
+        def _push_until(end: int):
+            nonlocal cursor
+            while cursor < end:
+                _push(journal.get(cursor, tracks[cursor])[1])
+                cursor += 1
+
+        def on_result(j: int, song: Track, item: Optional[dict]):
+            track_id = item["id"] if item else None
+            if not journal:
+                _push(track_id)
+                return
+            journal.record_track(pending_idx[j], song, track_id)
+            #antes de esta canción puede haber otras resueltas en la corrida anterior
+            _push_until(pending_idx[j] + 1)
+
+        #buscar cada canción en Spotify (en paralelo, con rate limit compartido)
+        print(f"\n=== Buscando canciones en Spotify ({workers} hilos) ===")
+        stats = ResolveStats()
+        with writer:
+            if use_async:
+                import asyncio
+                found_track_ids, not_found = asyncio.run(
+                    _resolve_tracks_async(sp, pending, cache, stats, on_result, catalog, limiter)
+                )
+            elif processes > 1:
+                from services.parallel_matching import resolve_tracks_parallel
+                found_track_ids, not_found = resolve_tracks_parallel(
+                    pending,
+                    processes=processes,
+                    workers=workers,
+                    rate=search_rate,
+                    cache_path=cache.path if cache else None,
+                    catalog_path=catalog.path if catalog else None,
+                    stats=stats,
+                    on_result=on_result
+                )
             else:
-                not_found.append(song)
-                print(f"❌")
-        
-        #agregar canciones
-        if found_track_ids:
-            print(f"→ Agregando {len(found_track_ids)} canciones a Spotify...")
-            add_tracks_in_batches(sp, playlist_id, found_track_ids)
-        
+                found_track_ids, not_found = resolve_tracks(
+                    sp,
+                    pending,
+                    workers=workers,
+                    limiter=limiter,
+                    cache=cache,
+                    stats=stats,
+                    on_result=on_result,
+                    catalog=catalog
+                )
+            if journal:
+                _push_until(len(tracks))
+        print(f"→ Búsquedas: {stats.summary()}")
+        print(f"→ Escritura: {writer.summary()}")
+
+        if journal:
+            journal.finish()
+            #resultados de esta corrida y de la anterior, en el orden original
+            track_ids = [journal.get(i, song)[1] for i, song in enumerate(tracks)]
+            found_track_ids = [track_id for track_id in track_ids if track_id]
+            not_found = [song for song, track_id in zip(tracks, track_ids) if not track_id]
+        #con varios procesos cada uno usa su propia conexión a la caché (sus
+        #aciertos aparecen en la etapa "cache" del resumen de búsquedas)
+        if cache and processes <= 1:
+            cache_stats = cache.stats()
+            print(f"→ Caché de búsquedas: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos")
+        if catalog and processes <= 1:
+            print_catalog_stats(catalog)
+
         return {
             "status": "success",
             "destination": "Spotify",
@@ -168,6 +473,8 @@ def create_playlist_in_destination(
     
     elif destination_type == "2":
         # Destino: Deezer
+        from services.deezer_service import create_playlist_in_deezer, add_tracks_to_deezer_playlist
+
         print(f"\n→ Creando playlist '{playlist_name}' en Deezer...")
         playlist_id = create_playlist_in_deezer(playlist_name)
         
@@ -185,6 +492,8 @@ def create_playlist_in_destination(
     
     elif destination_type == "3":
         # Destino: YouTube Music
+        from services.youtube_music_service import create_playlist_in_youtube_music, add_tracks_to_youtube_music_playlist
+
         print(f"\n→ Creando playlist '{playlist_name}' en YouTube Music...")
         playlist_id = create_playlist_in_youtube_music(playlist_name)
         
@@ -203,30 +512,466 @@ def create_playlist_in_destination(
     else:
         return {"status": "error", "message": "Invalid destination type"}
 
+def stream_clone_to_spotify(
+        sp,
+        playlist_name: str,
+        tracks: Iterable[Track],
+        workers: int = DEFAULT_WORKERS,
+        rate: float = DEFAULT_RATE,
+        cache: MatchCache = None,
+        journal: Optional[CheckpointJournal] = None,
+        catalog=None
+) -> dict:
+    """
+    Modo streaming hacia Spotify: las canciones pasan de la fuente a la
+    búsqueda y los ids encontrados se agregan a la playlist (en otro hilo,
+    un lote de hasta 100 a la vez) mientras se sigue buscando, en lugar de
+    esperar a terminar cada fase.
+    Con journal se puede reanudar igual que en create_playlist_in_destination.
+    """
+    from services.spotify_service import open_playlist_writer
+
+    playlist_id = _open_spotify_playlist(sp, playlist_name, journal)
+    if not playlist_id:
+        return {"status": "error", "message": "Failed to create Spotify playlist"}
+
+    total = 0
+    found = 0
+    not_found = []
+    committed = _committed_in_playlist(sp, playlist_id, journal)
+    writer = open_playlist_writer(
+        sp,
+        playlist_id,
+        start=committed,
+        on_commit=journal.record_batch if journal else None
+    )
+
+    #las canciones ya resueltas en la corrida anterior no pasan por la búsqueda;
+    #tee guarda solo las que van entre la lectura y la búsqueda
+    songs, to_search = itertools.tee(enumerate(tracks))
+    done = set(journal.resolved) if journal else set()
+    to_search = (song for i, song in to_search if i not in done)
+
+    print(f"\n=== Buscando canciones en Spotify ({workers} hilos, streaming) ===")
+    stats = ResolveStats()
+    results = stream_resolve(
+        sp,
+        to_search,
+        workers=workers,
+        limiter=get_limiter("spotify", rate),
+        cache=cache,
+        stats=stats,
+        catalog=catalog
+    )
+    with writer:
+        try:
+            for i, song in songs:
+                total += 1
+                print(f"[{total}] Buscando: {song}...", end=" ", flush=True)
+                if i in done:
+                    try:
+                        track_id = journal.get(i, song)[1]
+                    except SourceChangedError as e:
+                        #lo ya agregado queda anotado; la corrida se detiene aquí
+                        return {"status": "error", "message": str(e)}
+                else:
+                    _, track = next(results)
+                    track_id = track["id"] if track else None
+                    if journal:
+                        journal.record_track(i, song, track_id)
+
+                if track_id:
+                    found += 1
+                    print("✅")
+                    #los ids que ya estaban en la playlist no se vuelven a agregar
+                    if found > committed:
+                        writer.add(track_id)
+                else:
+                    not_found.append(song)
+                    print("❌")
+        except IncompleteSourceError as e:
+            #lo ya agregado queda anotado en el journal; se puede reanudar con --resume
+            return {"status": "error", "message": str(e)}
+
+    if journal:
+        journal.finish()
+
+    print(f"→ Búsquedas: {stats.summary()}")
+    print(f"→ Escritura: {writer.summary()}")
+
+    if cache:
+        cache_stats = cache.stats()
+        print(f"→ Caché de búsquedas: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos")
+    if catalog:
+        print_catalog_stats(catalog)
+
+    return {
+        "status": "success",
+        "destination": "Spotify",
+        "playlist_id": playlist_id,
+        "playlist_name": playlist_name,
+        "total": total,
+        "found": found,
+        "not_found": len(not_found),
+        "not_found_list": not_found
+    }
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Clonador de playlists")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"hilos para buscar canciones en Spotify (default: {DEFAULT_WORKERS})"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=DEFAULT_RATE,
+        help=f"peticiones por segundo máximas a Spotify; ante 429/5xx el rate baja solo y vuelve a subir poco a poco (default: {DEFAULT_RATE})"
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=DEFAULT_CACHE_PATH,
+        help=f"archivo SQLite con la caché de búsquedas (default: {DEFAULT_CACHE_PATH})"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="no usar la caché de búsquedas"
+    )
+    parser.add_argument(
+        "--catalog-path",
+        default=DEFAULT_CATALOG_PATH,
+        help=f"archivo SQLite con el catálogo local de candidatos de Spotify (default: {DEFAULT_CATALOG_PATH})"
+    )
+    parser.add_argument(
+        "--no-catalog",
+        action="store_true",
+        help="no consultar ni llenar el catálogo local: toda canción fuera de la caché se busca en la API"
+    )
+    parser.add_argument(
+        "--http-cache-path",
+        default=DEFAULT_HTTP_CACHE_PATH,
+        help=f"archivo SQLite con las respuestas de Deezer y YouTube Music al leer playlists (default: {DEFAULT_HTTP_CACHE_PATH})"
+    )
+    parser.add_argument(
+        "--http-cache-mb",
+        type=int,
+        default=DEFAULT_MAX_BYTES // (1024 * 1024),
+        help=f"tamaño máximo de la caché HTTP en MB; se borran las respuestas menos usadas (default: {DEFAULT_MAX_BYTES // (1024 * 1024)})"
+    )
+    parser.add_argument(
+        "--http-cache-fresh",
+        type=float,
+        default=DEFAULT_FRESH_SECONDS,
+        help="segundos que se reutiliza una respuesta sin revalidar si el servidor no manda Cache-Control; "
+             f"con --sync siempre es 0 (default: {DEFAULT_FRESH_SECONDS})"
+    )
+    parser.add_argument(
+        "--deezer-isrc",
+        action="store_true",
+        help="pedir el ISRC de cada canción de las playlists de Deezer (una petición más por canción, ~10 por segundo)"
+    )
+    parser.add_argument(
+        "--no-http-cache",
+        action="store_true",
+        help="descargar siempre las playlists de Deezer y YouTube Music completas"
+    )
+    parser.add_argument(
+        "--file",
+        default="songs.txt",
+        help="archivo a leer con la fuente 1: texto, CSV o M3U/M3U8 (default: songs.txt)"
+    )
+    parser.add_argument(
+        "--separator",
+        default=DEFAULT_SEPARATOR,
+        help=f"separador entre artista y título en archivos de texto (default: '{DEFAULT_SEPARATOR}')"
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="omitir canciones repetidas al leer el archivo"
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="guardar las canciones en formato compacto (bibliotecas de 100k+ canciones)"
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="buscar en Spotify con el cliente asíncrono (httpx, conexiones compartidas)"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="repartir la búsqueda y el fuzzy matching entre N procesos, cada uno con --workers hilos "
+             "(bibliotecas de 100k+ canciones; solo destino Spotify sin --stream)"
+    )
+    parser.add_argument(
+        "--jobs",
+        metavar="MANIFEST",
+        help="modo no interactivo: clona todas las playlists de un manifiesto JSON"
+    )
+    parser.add_argument(
+        "--sync",
+        metavar="PLAYLIST_ID",
+        help="sincronizar una playlist de Spotify existente: solo agrega lo que falta"
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="con --sync, quitar de la playlist las canciones que ya no están en la fuente"
+    )
+    parser.add_argument(
+        "--yes",
+        action="store_true",
+        help="con --prune, quitar las canciones sin pedir confirmación"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="buscar y agregar canciones conforme se leen de la fuente (solo destino Spotify)"
+    )
+    parser.add_argument(
+        "--merge",
+        nargs="+",
+        metavar="TIPO:UBICACIÓN",
+        help="leer varias fuentes a la vez y combinarlas sin duplicados, en el orden dado "
+             "(p. ej. deezer:URL youtube:ID file:songs.csv)"
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="al terminar, mostrar cuánto tardó el arranque (imports, autenticación) y qué módulos se cargaron"
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar="RUTA",
+        help="al terminar, guardar las métricas de la corrida (latencias, llamadas, 429s, caché) en JSON"
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        metavar="RUTA",
+        help="al terminar, guardar las métricas en formato textfile de Prometheus"
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="JOURNAL",
+        help="anotar el avance en este archivo (JSONL) y, si la corrida anterior con el mismo nombre no terminó, continuarla"
+    )
+    return parser.parse_args(argv)
+
+def connect_spotify():
+    """
+    Autentica con Spotify y pide el perfil del usuario (que queda en caché).
+    Solo se llama si la corrida de verdad usa Spotify.
+    """
+    with METRICS.timer("startup_seconds", phase="spotify_import"):
+        from services.spotify_service import get_current_user
+
+    with METRICS.timer("startup_seconds", phase="spotify_auth"):
+        print("→ Iniciando autenticación con Spotify...")
+        #el cliente queda en el registro: jobs y servicios reutilizan el mismo
+        sp = get_client("spotify")
+    with METRICS.timer("startup_seconds", phase="spotify_user"):
+        me = get_current_user(sp)
+    print(f"✅ Autenticado en Spotify como: {me['display_name']}\n")
+    return sp
+
+def confirm_prune(items: List[dict]) -> bool:
+    """Pregunta antes de quitar canciones de la playlist con --prune"""
+    answer = input(f"¿Quitar estas {len(items)} canciones de la playlist? [s/N]: ").strip().lower()
+    return answer in ("s", "si", "sí", "y", "yes")
+
+def open_catalog(args: argparse.Namespace):
+    """Catálogo local de candidatos (None con --no-catalog)"""
+    if args.no_catalog:
+        return None
+    from services.catalog_index import CatalogIndex
+
+    return CatalogIndex(args.catalog_path)
+
+def print_catalog_stats(catalog):
+    catalog_stats = catalog.stats()
+    print(
+        f"→ Catálogo local: {catalog_stats['hits']} resueltas sin API, "
+        f"{catalog_stats['misses']} a la API ({len(catalog)} tracks en el catálogo)"
+    )
+
+def print_http_cache_stats():
+    """Resumen de la caché HTTP, solo si alguna lectura la usó"""
+    http_cache = shared_http_cache(create=False)
+    if http_cache is None:
+        return
+    stats = http_cache.stats()
+    if stats["fresh"] or stats["revalidated"] or stats["misses"]:
+        print(
+            f"→ Caché HTTP: {stats['fresh']} sin red, {stats['revalidated']} revalidadas (304), "
+            f"{stats['misses']} descargadas | {stats['bytes'] / 1024:.0f} KB guardados"
+        )
+
+def print_startup_profile():
+    """Reporte de --profile-startup: en qué se fue el arranque y qué módulos pesados se cargaron"""
+    print("\n=== Perfil de arranque ===")
+    print(f"   imports de clone_cli: {_IMPORT_SECONDS * 1000:.0f} ms")
+    for phase in ("spotify_import", "spotify_auth", "spotify_user"):
+        histogram = METRICS.histogram("startup_seconds", phase=phase)
+        if histogram:
+            print(f"   {phase}: {histogram.sum * 1000:.0f} ms")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    skipped = [name for name in HEAVY_MODULES if name not in sys.modules]
+    print(f"   módulos pesados cargados: {', '.join(loaded) or 'ninguno'}")
+    print(f"   no cargados: {', '.join(skipped) or 'ninguno'}")
+
+def export_metrics(args: argparse.Namespace):
+    """Escribe las métricas de la corrida a los archivos pedidos por línea de comandos"""
+    if not (args.metrics_json or args.metrics_prom):
+        return
+    print("\n=== Métricas ===")
+    print(METRICS.summary())
+    if args.metrics_json:
+        write_json(args.metrics_json)
+        print(f"→ Métricas guardadas en {args.metrics_json}")
+    if args.metrics_prom:
+        write_prometheus(args.metrics_prom)
+        print(f"→ Métricas guardadas en {args.metrics_prom}")
+
 def main():
+    args = parse_args()
+    #antes de crear cualquier cliente de Deezer/YouTube Music
+    #--sync borra de la playlist lo que ya no está en la fuente: nunca con una lectura vieja
+    fresh_seconds = 0 if args.sync else args.http_cache_fresh
+    configure_http_cache(
+        None if args.no_http_cache else args.http_cache_path,
+        args.http_cache_mb * 1024 * 1024,
+        fresh_seconds
+    )
+    if args.deezer_isrc:
+        from services.deezer_service import configure_isrc_lookup
+        configure_isrc_lookup(True)
+    try:
+        run(args)
+    finally:
+        print_http_cache_stats()
+        #también se exportan si la corrida falla o se interrumpe
+        export_metrics(args)
+        if args.profile_startup:
+            print_startup_profile()
+        REGISTRY.close()
+        close_http_cache()
+
+def run(args: argparse.Namespace):
     print("=== Playlist Cloner (v0.3.0 - Bidireccional) ===\n")
 
-    # 1. Cargar configuración de Spotify
-    client_id, client_secret, redirect_uri, username = load_env()
+    # 1-2. Spotify se autentica solo si la corrida lo usa (jobs, --sync o destino Spotify)
+    sp = None
 
-    # 2. Inicializar cliente Spotify (siempre necesario para búsqueda)
-    print("→ Iniciando autenticación con Spotify...")
-    sp = init_spotify(client_id, client_secret, redirect_uri)
-    me = sp.current_user()
-    print(f"✅ Autenticado en Spotify como: {me['display_name']}\n")
+    if args.jobs:
+        from job_runner import run_manifest
+        cache = None if args.no_cache else MatchCache(args.cache_path)
+        catalog = open_catalog(args)
+        run_manifest(
+            args.jobs,
+            None,
+            workers=args.workers,
+            rate=args.rate,
+            cache=cache,
+            compact=args.compact,
+            connect=connect_spotify,
+            catalog=catalog
+        )
+        if cache:
+            cache.close()
+        if catalog:
+            catalog.close()
+        return
 
     # 3. Seleccionar ORIGEN de canciones
-    print("=== SELECCIONA ORIGEN DE CANCIONES ===")
-    print("  1) Archivo 'songs.txt'")
-    print("  2) Apple Music (simulado)")
-    print("  3) Deezer (URL pública)")
-    print("  4) YouTube Music (URL o ID)")
-    source_choice = input("\nOpción [1/2/3/4]: ").strip() or "1"
+    ingest_report = None
+    if args.merge:
+        #varias fuentes a la vez: no se pregunta nada, las ubicaciones vienen en --merge
+        source_choice = None
+        ingest_report = IngestReport()
+        specs = [parse_source_spec(text) for text in args.merge]
+        print(f"→ Leyendo {len(specs)} fuentes a la vez...")
+    else:
+        print("=== SELECCIONA ORIGEN DE CANCIONES ===")
+        print(f"  1) Archivo '{args.file}'")
+        print("  2) Apple Music (simulado)")
+        print("  3) Deezer (URL pública)")
+        print("  4) YouTube Music (URL o ID)")
+        source_choice = input("\nOpción [1/2/3/4]: ").strip() or "1"
 
     # 4. Obtener canciones desde la fuente
-    songs = get_tracks_from_source(source_choice)
-    if not songs:
-        print("❌ No se obtuvieron canciones. Abortando.")
+    #en modo streaming solo se prepara el iterador; se lee al clonar
+    if args.merge:
+        songs = iter_merged_sources(specs, separator=args.separator, report=ingest_report)
+        if not args.stream:
+            songs = TrackStore(songs) if args.compact else list(songs)
+            print(ingest_report.summary())
+            if not songs:
+                print("❌ No se obtuvieron canciones. Abortando.")
+                return
+    elif args.stream:
+        songs = iter_tracks_from_source(
+            source_choice,
+            songs_file=args.file,
+            separator=args.separator,
+            dedupe=args.dedupe
+        )
+    else:
+        songs = get_tracks_from_source(
+            source_choice,
+            compact=args.compact,
+            songs_file=args.file,
+            separator=args.separator,
+            dedupe=args.dedupe
+        )
+        if not songs:
+            print("❌ No se obtuvieron canciones. Abortando.")
+            return
+
+    # 4b. Modo sincronización: la playlist destino ya existe
+    if args.sync:
+        from services.sync_service import sync_playlist
+        if not isinstance(songs, Sequence):
+            try:
+                songs = list(songs)
+            except IncompleteSourceError as e:
+                print(f"❌ {e}. Abortando.")
+                return
+        #con --merge, una fuente que falló o no dio canciones deja la lista incompleta
+        source_complete = ingest_report is None or all(result.complete for result in ingest_report.sources)
+        if ingest_report and args.stream:
+            print(ingest_report.summary())
+        sp = connect_spotify()
+        cache = None if args.no_cache else MatchCache(args.cache_path)
+        catalog = open_catalog(args)
+        result = sync_playlist(
+            sp,
+            args.sync,
+            songs,
+            workers=args.workers,
+            limiter=get_limiter("spotify", args.rate),
+            cache=cache,
+            prune=args.prune,
+            catalog=catalog,
+            source_complete=source_complete,
+            confirm=None if args.yes else confirm_prune
+        )
+        if cache:
+            cache.close()
+        if catalog:
+            catalog.close()
+        print("\n=== Resumen de sincronización ===")
+        print(f"Canciones en la fuente: {result['total']}")
+        print(f"Agregadas: {result['added']}")
+        print(f"Quitadas: {result['removed']}")
+        print(f"No encontradas: {result['not_found']}")
         return
 
     # 5. Seleccionar DESTINO
@@ -239,21 +984,73 @@ def main():
     # 6. Preguntar nombre de la playlist destino
     playlist_name = input("\nNombre de la nueva playlist: ").strip() or "Mi playlist clonada"
 
+    #la búsqueda y la escritura solo necesitan Spotify si es el destino
+    if destination_choice == "1":
+        print()
+        sp = connect_spotify()
+
     # 7. Crear playlist en destino y agregar canciones
     print("\n" + "="*50)
-    result = create_playlist_in_destination(
-        destination_choice,
-        playlist_name,
-        songs,
-        sp=sp
-    )
+    cache = None if args.no_cache else MatchCache(args.cache_path)
+    #el catálogo solo sirve para buscar en Spotify
+    catalog = open_catalog(args) if destination_choice == "1" else None
+    journal = None
+    if args.resume and destination_choice == "1":
+        try:
+            journal = CheckpointJournal(args.resume, playlist_name)
+        except JournalMismatchError as e:
+            print(f"❌ {e}")
+            if cache:
+                cache.close()
+            if catalog:
+                catalog.close()
+            return
+        if journal.resuming:
+            print(f"→ Reanudando la corrida anotada en {args.resume}")
+    if args.stream and destination_choice == "1":
+        result = stream_clone_to_spotify(
+            sp,
+            playlist_name,
+            songs,
+            workers=args.workers,
+            rate=args.rate,
+            cache=cache,
+            journal=journal,
+            catalog=catalog
+        )
+    else:
+        #los destinos simulados necesitan la lista completa
+        if not isinstance(songs, Sequence):
+            songs = list(songs)
+        result = create_playlist_in_destination(
+            destination_choice,
+            playlist_name,
+            songs,
+            sp=sp,
+            workers=args.workers,
+            rate=args.rate,
+            cache=cache,
+            use_async=args.use_async,
+            journal=journal,
+            processes=args.processes,
+            catalog=catalog
+        )
+    if cache:
+        cache.close()
+    if catalog:
+        catalog.close()
+    if journal:
+        journal.close()
+    if ingest_report and args.stream:
+        #en streaming las fuentes terminan de leerse durante la clonación
+        print(ingest_report.summary())
 
     # 8. Mostrar resumen
     if result["status"] == "success":
         print("\n=== Resumen ===")
-        print(f"Origen: {source_choice}")
+        print(f"Origen: {', '.join(args.merge) if args.merge else source_choice}")
         print(f"Destino: {result['destination']}")
-        print(f"Total obtuvieron: {len(songs)}")
+        print(f"Total obtuvieron: {result.get('total', len(songs))}")
         print(f"Encontradas en destino: {result['found']}")
         print(f"No encontradas: {result['not_found']}")
         
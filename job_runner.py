@@ -0,0 +1,196 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from models import Track
+from clone_cli import load_tracks, create_playlist_in_destination
+from services.match_cache import MatchCache
+from services.matching_service import stream_resolve, ResolveStats, DEFAULT_WORKERS, DEFAULT_RATE
+from services.normalization import TrackIndex
+from services.rate_limiter import get_limiter
+
+SOURCES = ("file", "apple", "deezer", "youtube")
+DESTINATIONS = {"spotify": "1", "deezer": "2", "youtube": "3"}
+#cada cuántas canciones se imprime el avance de la búsqueda
+PROGRESS_EVERY = 100
+
+
+def load_manifest(path: str) -> List[dict]:
+    """
+    Lee un manifiesto JSON de jobs. Acepta una lista o {"jobs": [...]}; cada job:
+        {"source": "deezer", "location": "https://...", "name": "Mi copia", "destination": "spotify"}
+    Los jobs inválidos se reportan y se ignoran.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    jobs = []
+    for idx, job in enumerate(data.get("jobs", []) if isinstance(data, dict) else data, start=1):
+        source = job.get("source")
+        destination = job.get("destination", "spotify")
+        if source not in SOURCES or destination not in DESTINATIONS:
+            print(f"❌ Job {idx} inválido (source={source}, destination={destination}), se ignorará")
+            continue
+        jobs.append({
+            "source": source,
+            "location": job.get("location", ""),
+            "name": job.get("name") or f"Playlist clonada {idx}",
+            "destination": destination,
+        })
+    return jobs
+
+
+def _write_spotify_job(sp, job: dict, tracks: List[Track], track_ids_by_track: List[Optional[str]]) -> dict:
+    """Crea la playlist de un job en Spotify con los ids ya resueltos (uno por canción)"""
+    from services.spotify_service import create_playlist, add_tracks_in_batches, get_current_user
+
+    track_ids = []
+    not_found = []
+    for track, track_id in zip(tracks, track_ids_by_track):
+        if track_id:
+            track_ids.append(track_id)
+        else:
+            not_found.append(track)
+
+    #create_playlist ya toma su token del limiter compartido (ver _api_call)
+    me = get_current_user(sp)
+    playlist_id = create_playlist(sp, me["id"], job["name"])
+    if not playlist_id:
+        return {"status": "error", "message": "Failed to create Spotify playlist", "playlist_name": job["name"]}
+
+    if track_ids:
+        add_tracks_in_batches(sp, playlist_id, track_ids, start=0)
+
+    return {
+        "status": "success",
+        "destination": "Spotify",
+        "playlist_id": playlist_id,
+        "playlist_name": job["name"],
+        "total": len(tracks),
+        "found": len(track_ids),
+        "not_found": len(not_found),
+        "not_found_list": not_found
+    }
+
+
+def _load_job(job: dict, compact: bool) -> Tuple[List[Track], Optional[str]]:
+    """Canciones de la fuente de un job y el error si no se pudo leer (no detiene a los demás jobs)"""
+    try:
+        return load_tracks(job["source"], job["location"], compact=compact), None
+    except Exception as e:
+        print(f"❌ {job['name']}: no se pudo leer la fuente: {e}")
+        return [], f"No se pudo leer la fuente: {e}"
+
+
+def run_jobs(
+        jobs: List[dict],
+        sp,
+        workers: int = DEFAULT_WORKERS,
+        rate: float = DEFAULT_RATE,
+        cache: Optional[MatchCache] = None,
+        compact: bool = False,
+        catalog=None,
+) -> List[dict]:
+    """
+    Corre varios jobs de clonación juntos:
+    1) Lee todas las fuentes en paralelo.
+    2) Busca en Spotify una sola vez cada canción distinta (aunque aparezca en
+       varias playlists). Todos los jobs comparten el mismo rate limiter
+       y, si se pasa, el catálogo local de candidatos.
+    3) Crea las playlists y agrega las canciones en paralelo.
+
+    Un job que falla (fuente que no se puede leer, playlist que no se puede
+    crear) se reporta en su resultado y los demás siguen.
+    Con compact=True las fuentes se guardan como TrackStore (menos memoria).
+    Devuelve el resultado de cada job (mismo formato que create_playlist_in_destination).
+    """
+    limiter = get_limiter("spotify", rate)
+
+    # 1. Fuentes
+    print(f"→ Leyendo {len(jobs)} fuentes...")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        loaded = list(executor.map(lambda job: _load_job(job, compact), jobs))
+    sources = [tracks for tracks, _ in loaded]
+    errors = [error for _, error in loaded]
+
+    # 2. Búsqueda de canciones distintas (solo las que van a Spotify)
+    #el índice junta la misma canción aunque venga de distintas playlists
+    #(mismo ISRC o mismo artista/título normalizados)
+    index = TrackIndex()
+    spotify_jobs = [(job, tracks) for job, tracks in zip(jobs, sources) if job["destination"] == "spotify"]
+    for job, tracks in spotify_jobs:
+        index.extend(tracks)
+
+    unique = index.representatives
+    resolved: List[Optional[str]] = []
+    if unique:
+        print(f"\n=== Buscando {len(unique)} canciones distintas ({len(index.groups)} en total) en Spotify ===")
+        stats = ResolveStats()
+        results = stream_resolve(
+            sp, unique, workers=workers, limiter=limiter, cache=cache, stats=stats, dedupe=False, catalog=catalog
+        )
+        for idx, (track, item) in enumerate(results, start=1):
+            resolved.append(item["id"] if item else None)
+            if idx % PROGRESS_EVERY == 0 or idx == len(unique):
+                print(f"[{idx}/{len(unique)}] canciones buscadas")
+        print(f"→ Búsquedas: {stats.summary()}")
+
+    #ids por canción de cada job, en el mismo orden en que se agregaron al índice
+    all_ids = index.fan_out(resolved)
+    ids_by_job = {}
+    offset = 0
+    for job, tracks in spotify_jobs:
+        ids_by_job[id(job)] = all_ids[offset:offset + len(tracks)]
+        offset += len(tracks)
+
+    # 3. Playlists destino
+    def _write(args) -> dict:
+        job, tracks, error = args
+        if error:
+            return {"status": "error", "message": error, "playlist_name": job["name"]}
+        if not tracks:
+            return {"status": "error", "message": "No se obtuvieron canciones", "playlist_name": job["name"]}
+        try:
+            if job["destination"] == "spotify":
+                return _write_spotify_job(sp, job, tracks, ids_by_job[id(job)])
+            return create_playlist_in_destination(DESTINATIONS[job["destination"]], job["name"], tracks)
+        except Exception as e:
+            return {"status": "error", "message": f"No se pudo escribir la playlist: {e}", "playlist_name": job["name"]}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return list(executor.map(_write, zip(jobs, sources, errors)))
+
+
+def run_manifest(
+        path: str,
+        sp,
+        workers: int = DEFAULT_WORKERS,
+        rate: float = DEFAULT_RATE,
+        cache: Optional[MatchCache] = None,
+        compact: bool = False,
+        connect: Optional[Callable[[], object]] = None,
+        catalog=None,
+) -> List[dict]:
+    """
+    Carga el manifiesto, corre los jobs e imprime un resumen por job.
+    Si sp es None, connect() se llama para autenticar con Spotify solo
+    cuando algún job tiene destino Spotify.
+    """
+    jobs = load_manifest(path)
+    if not jobs:
+        print("❌ El manifiesto no tiene jobs válidos.")
+        return []
+    if sp is None and connect and any(job["destination"] == "spotify" for job in jobs):
+        sp = connect()
+
+    results = run_jobs(jobs, sp, workers=workers, rate=rate, cache=cache, compact=compact, catalog=catalog)
+
+    print("\n=== Resumen de jobs ===")
+    for job, result in zip(jobs, results):
+        if result["status"] == "success":
+            print(
+                f"✅ {job['name']} ({job['source']} → {result['destination']}): "
+                f"{result['found']} encontradas, {result['not_found']} no encontradas"
+            )
+        else:
+            print(f"❌ {job['name']}: {result.get('message', 'Desconocido')}")
+    return results
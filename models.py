@@ -1,7 +1,17 @@
+from array import array
+from collections.abc import Sequence
 from dataclasses import dataclass
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 
-@dataclass
+
+class IncompleteSourceError(RuntimeError):
+    """
+    La playlist de origen no se pudo leer completa (p. ej. falló una página
+    a la mitad): lo leído no es la playlist entera y no se debe tratar como tal
+    """
+
+
+@dataclass(slots=True)
 class Track:
     """Rerpresenta una cacnión sin depender de alguna plataforma específica"""
     artist: str
@@ -9,7 +19,82 @@ class Track:
     album: Optional[str] = None
     duration_ms: Optional[int] = None
     isrc: Optional[str] = None
+    source_id: Optional[str] = None #id en la plataforma de origen (p. ej. videoId de YouTube Music)
 
     def __str__(self) -> str:
         """Devuelve una representación legible del Track (Artista - Título)"""
-        return f"{self.artist} - {self.title}"
\ No newline at end of file
+        return f"{self.artist} - {self.title}"
+
+
+#valor usado en la columna de duraciones cuando no se conoce
+_NO_DURATION = -1
+
+
+class TrackStore(Sequence):
+    """
+    Colección compacta de Tracks para playlists y bibliotecas muy grandes.
+
+    En lugar de un objeto Track por canción guarda columnas: los artistas y
+    álbumes se internan (cada nombre repetido se guarda una sola vez) y las
+    duraciones van en un array de enteros. Se comporta como una lista de
+    solo lectura: al indexar o iterar se crean los Track al vuelo, así que
+    la puede usar cualquier código que espere una lista de Tracks.
+    """
+
+    def __init__(self, tracks: Iterable[Track] = ()):
+        self._artists: List[str] = []
+        self._titles: List[str] = []
+        self._albums: List[Optional[str]] = []
+        self._durations = array("q")
+        self._isrcs: List[Optional[str]] = []
+        self._source_ids: List[Optional[str]] = []
+        self._strings: Dict[str, str] = {}
+        self.extend(tracks)
+
+    @classmethod
+    def from_iterable(cls, tracks: Iterable[Track]) -> "TrackStore":
+        return cls(tracks)
+
+    def _intern(self, value: Optional[str]) -> Optional[str]:
+        if value is None:
+            return None
+        return self._strings.setdefault(value, value)
+
+    def append(self, track: Track):
+        self._artists.append(self._intern(track.artist))
+        self._titles.append(track.title)
+        self._albums.append(self._intern(track.album))
+        self._durations.append(track.duration_ms if track.duration_ms is not None else _NO_DURATION)
+        self._isrcs.append(track.isrc)
+        self._source_ids.append(track.source_id)
+
+    def extend(self, tracks: Iterable[Track]):
+        for track in tracks:
+            self.append(track)
+
+    def _track_at(self, idx: int) -> Track:
+        duration = self._durations[idx]
+        return Track(
+            artist=self._artists[idx],
+            title=self._titles[idx],
+            album=self._albums[idx],
+            duration_ms=None if duration == _NO_DURATION else duration,
+            isrc=self._isrcs[idx],
+            source_id=self._source_ids[idx],
+        )
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[Track, "TrackStore"]:
+        if isinstance(idx, slice):
+            return TrackStore(self._track_at(i) for i in range(*idx.indices(len(self))))
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("TrackStore index out of range")
+        return self._track_at(idx)
+
+    def __iter__(self) -> Iterator[Track]:
+        for idx in range(len(self)):
+            yield self._track_at(idx)
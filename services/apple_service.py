@@ -1,5 +1,6 @@
 from typing import List, Optional
 from models import Track
+from services.client_registry import get_client
 
 class AppleMusicClient:
     """
@@ -69,5 +70,5 @@ def get_tracks_from_apple_playlist(playlist_url: str) -> List[Track]:
     TODO
     Usar API real en un futuro
     """
-    client = AppleMusicClient()
+    client = get_client("apple")
     return client.get_tracks_from_playlist(playlist_url)
\ No newline at end of file
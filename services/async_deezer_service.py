@@ -0,0 +1,187 @@
+import asyncio
+import time
+from typing import AsyncIterator, List, Optional
+from models import IncompleteSourceError, Track
+from services.async_http import get_async_client, httpx
+from services.deezer_service import DeezerClient, QUOTA_ERROR_CODE, QUOTA_PAUSE, isrc_lookup_enabled
+from services.metrics import METRICS
+from services.rate_limiter import (
+    MAX_RETRIES,
+    CircuitOpenError,
+    TokenBucket,
+    backoff_delay,
+    get_limiter,
+    retry_after_seconds,
+    wait_for_circuit_async,
+)
+
+
+class AsyncDeezerClient:
+    """
+    Versión asíncrona de DeezerClient.
+    Usa el cliente HTTP compartido de services.async_http y el mismo
+    limiter que DeezerClient (ver get_limiter).
+    """
+
+    BASE_URL = DeezerClient.BASE_URL
+    PAGE_SIZE = DeezerClient.PAGE_SIZE
+
+    def __init__(
+            self,
+            client: Optional["httpx.AsyncClient"] = None,
+            limiter: Optional[TokenBucket] = None,
+            fetch_isrc: Optional[bool] = None
+    ):
+        self._client = client
+        self.limiter = limiter or get_limiter("deezer")
+        self.fetch_isrc = isrc_lookup_enabled() if fetch_isrc is None else fetch_isrc
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        return self._client or get_async_client()
+
+    async def _request(self, url: str, params: Optional[dict], endpoint: str) -> dict:
+        """GET con el limiter compartido, reintentando ante 429, 5xx, cuota excedida y errores de red"""
+        for attempt in range(MAX_RETRIES + 1):
+            await wait_for_circuit_async(self.limiter)
+            #el token se espera sin bloquear el event loop
+            wait = self.limiter.try_acquire()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self.limiter.try_acquire()
+
+            start = time.perf_counter()
+            try:
+                response = await self.client.get(url, params=params)
+            except httpx.TransportError:
+                #error de red (conexión, timeout): se reintenta y cuenta como falla, igual que call_with_retries
+                self.limiter.record_failure()
+                if attempt == MAX_RETRIES:
+                    raise
+                METRICS.inc("api_retries_total", service="deezer", endpoint=endpoint)
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            METRICS.observe("api_request_seconds", time.perf_counter() - start, service="deezer", endpoint=endpoint)
+            METRICS.inc("response_bytes_total", len(response.content), service="deezer")
+
+            data = response.json() if response.status_code < 400 else None
+            error = data.get("error") if isinstance(data, dict) else None
+            if response.status_code == 429:
+                delay = retry_after_seconds(response.headers)
+            elif response.status_code >= 500:
+                delay = 0.0
+            elif isinstance(error, dict) and error.get("code") == QUOTA_ERROR_CODE:
+                delay = QUOTA_PAUSE
+            else:
+                delay = None
+
+            if delay is None:
+                self.limiter.record_success()
+            else:
+                self.limiter.record_failure(throttled=delay > 0)
+            if delay is None or attempt == MAX_RETRIES:
+                response.raise_for_status()
+                return data
+            METRICS.inc("api_retries_total", service="deezer", endpoint=endpoint)
+            if delay > 0:
+                self.limiter.pause(delay)
+            else:
+                await asyncio.sleep(backoff_delay(attempt))
+
+    async def _get_json(self, url: str, params: Optional[dict] = None, endpoint: str = "playlist_tracks") -> Optional[dict]:
+        """GET que devuelve el JSON o None si hubo error (igual que DeezerClient)"""
+        try:
+            data = await self._request(url, params, endpoint)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            METRICS.inc("api_errors_total", service="deezer", endpoint=endpoint)
+            print(f"Error en petición a Deezer: {e}")
+            return None
+
+        if "error" in data:
+            print(f"Error en petición a Deezer: {data['error'].get('message', data['error'])}")
+            return None
+        return data
+
+    async def _get_page(self, url: str, params: Optional[dict] = None) -> Optional[dict]:
+        """Una página de la playlist; con fetch_isrc, con el ISRC de cada canción (ver DeezerClient._fill_isrcs)"""
+        page = await self._get_json(url, params)
+        if page and self.fetch_isrc:
+            items = [item for item in page.get("data", []) if item.get("id") and not item.get("isrc")]
+            details = await asyncio.gather(
+                *(self._get_json(f"{self.BASE_URL}/track/{item['id']}", endpoint="track") for item in items)
+            )
+            for item, detail in zip(items, details):
+                item["isrc"] = (detail or {}).get("isrc") or None
+        return page
+
+    async def search_tracks(self, query: str, limit: int = 5) -> List[Track]:
+        """Busca canciones en Deezer por query (artista o título)"""
+        data = await self._get_json(f"{self.BASE_URL}/search/track", {"q": query, "limit": limit}, endpoint="search")
+        if not data:
+            return []
+        return [DeezerClient._track_from_item(item) for item in data.get("data", [])]
+
+    async def iter_tracks_from_playlist(self, playlist_url: str, prefetch: bool = True) -> AsyncIterator[Track]:
+        """
+        Recorre una playlist de Deezer página por página. Con prefetch=True la
+        siguiente página se pide mientras se entregan las canciones de la actual.
+        Igual que DeezerClient, si falla una página (incluida la primera) o se
+        reciben menos canciones que el total se lanza IncompleteSourceError.
+        """
+        playlist_id = DeezerClient._extract_playlist_id(playlist_url)
+        if not playlist_id:
+            print("No se pudo extraer el ID de la playlist de la URL")
+            return
+
+        endpoint = f"{self.BASE_URL}/playlist/{playlist_id}/tracks"
+        index = 0
+        page = await self._get_page(endpoint, {"limit": self.PAGE_SIZE, "index": index})
+        if page is None:
+            METRICS.inc("source_incomplete_total", source="deezer")
+            raise IncompleteSourceError("No se pudo leer la playlist de Deezer")
+        expected = page.get("total")
+        pending = None
+
+        try:
+            while page:
+                items = page.get("data", [])
+                index += len(items)
+                next_request = DeezerClient._next_page_request(page, endpoint, index)
+
+                pending = asyncio.ensure_future(self._get_page(*next_request)) if next_request and prefetch else None
+
+                for item in items:
+                    yield DeezerClient._track_from_item(item)
+
+                if pending:
+                    page = await pending
+                    pending = None
+                elif next_request:
+                    page = await self._get_page(*next_request)
+                else:
+                    page = None
+
+                if next_request and page is None:
+                    METRICS.inc("source_incomplete_total", source="deezer")
+                    raise IncompleteSourceError(
+                        f"No se pudo leer completa la playlist de Deezer: se leyeron {index} canciones"
+                    )
+        finally:
+            if pending:
+                pending.cancel()
+
+        if isinstance(expected, int) and index < expected:
+            METRICS.inc("source_incomplete_total", source="deezer")
+            raise IncompleteSourceError(
+                f"Deezer reporta {expected} canciones en la playlist, pero solo se recibieron {index}"
+            )
+
+    async def get_tracks_from_playlist(self, playlist_url: str) -> List[Track]:
+        tracks = [track async for track in self.iter_tracks_from_playlist(playlist_url)]
+        print(f"→ Se obtuvieron {len(tracks)} canciones desde Deezer")
+        return tracks
+
+
+async def get_tracks_from_deezer_playlist_async(playlist_url: str) -> List[Track]:
+    """Equivalente asíncrono de get_tracks_from_deezer_playlist"""
+    return await AsyncDeezerClient().get_tracks_from_playlist(playlist_url)
@@ -0,0 +1,57 @@
+import asyncio
+from typing import Optional
+
+try:
+    import httpx
+except ImportError:
+    print("httpx no instalado, instala con pip install httpx[http2] para usar el modo asíncrono")
+    httpx = None
+
+try:
+    import h2  # noqa: F401 (solo se revisa si está disponible)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+#conexiones abiertas como máximo; cientos de peticiones en vuelo las comparten
+MAX_CONNECTIONS = 10
+DEFAULT_TIMEOUT = 10.0
+
+_client: Optional["httpx.AsyncClient"] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_async_client() -> "httpx.AsyncClient":
+    """
+    Devuelve el cliente HTTP compartido por todos los servicios asíncronos.
+
+    Es un solo pool de conexiones keep-alive (HTTP/2 si está instalado h2),
+    así que muchas búsquedas simultáneas reutilizan unas pocas conexiones.
+    Se crea uno por event loop, porque httpx no permite compartirlo entre loops.
+    """
+    global _client, _client_loop
+
+    if httpx is None:
+        raise RuntimeError("httpx no está instalado")
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+            ),
+        )
+        _client_loop = loop
+    return _client
+
+
+async def close_async_client():
+    """Cierra el cliente compartido (llamar al terminar)"""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
@@ -0,0 +1,246 @@
+import asyncio
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+from spotipy.exceptions import SpotifyException
+from models import Track
+from services.async_http import get_async_client, httpx
+from services.match_cache import MatchCache
+from services.matching_service import ResolveStats, STAGE_CACHE, STAGE_CATALOG, STAGE_DUPLICATE, STAGE_ERROR
+from services.metrics import METRICS
+from services.normalization import TrackIndex
+from services.rate_limiter import (
+    CircuitOpenError,
+    TokenBucket,
+    backoff_delay,
+    get_limiter,
+    retry_after_seconds,
+    wait_for_circuit_async,
+)
+from services.spotify_service import search_plan, SearchResult, BATCH_SIZE, MAX_RATE_LIMIT_RETRIES, SERVER_ERRORS
+
+API_URL = "https://api.spotify.com/v1"
+#peticiones simultáneas a Spotify (todas comparten el pool de conexiones)
+DEFAULT_CONCURRENCY = 32
+#canciones que se mandan a buscar juntas (limita la memoria con playlists enormes)
+CHUNK_SIZE = 500
+#cada cuánto se vuelve a pedir el token al auth manager de spotipy
+TOKEN_REFRESH_SECONDS = 300
+
+
+class AsyncSpotifyClient:
+    """
+    Cliente asíncrono mínimo de la Web API de Spotify.
+
+    Reutiliza el auth manager de spotipy (mismos tokens y caché) y hace las
+    peticiones con el cliente HTTP compartido. Usa el mismo limiter que el
+    cliente normal (ver get_limiter): un 429 pausa a todas las peticiones
+    durante lo que diga `Retry-After` y el rate se adapta igual.
+    """
+
+    def __init__(
+            self,
+            auth_manager,
+            client: Optional["httpx.AsyncClient"] = None,
+            concurrency: int = DEFAULT_CONCURRENCY,
+            limiter: Optional[TokenBucket] = None
+    ):
+        self.auth_manager = auth_manager
+        self.concurrency = concurrency
+        self.limiter = limiter or get_limiter("spotify")
+        self._client = client
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._token: Optional[str] = None
+        self._token_time = 0.0
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        return self._client or get_async_client()
+
+    async def _auth_header(self) -> dict:
+        if not self._token or time.monotonic() - self._token_time > TOKEN_REFRESH_SECONDS:
+            #el auth manager es bloqueante (puede refrescar el token), se corre en otro hilo
+            self._token = await asyncio.to_thread(self.auth_manager.get_access_token, as_dict=False)
+            self._token_time = time.monotonic()
+        return {"Authorization": f"Bearer {self._token}"}
+
+    async def _request(
+            self,
+            method: str,
+            path: str,
+            endpoint: str,
+            params: Optional[dict] = None,
+            payload: Optional[dict] = None
+    ) -> dict:
+        """
+        Petición a la API; endpoint es el nombre con el que se registran las
+        métricas. Reintenta ante 429, 5xx y errores de red (conexión, timeout)
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            await wait_for_circuit_async(self.limiter)
+            #el token se espera sin bloquear el event loop
+            wait = self.limiter.try_acquire()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                wait = self.limiter.try_acquire()
+
+            async with self._semaphore:
+                start = time.perf_counter()
+                error = None
+                try:
+                    response = await self.client.request(
+                        method, f"{API_URL}/{path}", params=params, json=payload, headers=await self._auth_header()
+                    )
+                except httpx.TransportError as e:
+                    #error de red (conexión, timeout): se reintenta y cuenta como falla, igual que call_with_retries
+                    error = e
+                METRICS.observe("api_request_seconds", time.perf_counter() - start, service="spotify", endpoint=endpoint)
+            if error is not None:
+                METRICS.inc("api_errors_total", service="spotify", endpoint=endpoint)
+                self.limiter.record_failure()
+                if attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise error
+                METRICS.inc("api_retries_total", service="spotify", endpoint=endpoint)
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            METRICS.inc("response_bytes_total", len(response.content), service="spotify")
+
+            if response.status_code >= 400:
+                METRICS.inc("api_errors_total", service="spotify", endpoint=endpoint, status=response.status_code)
+            throttled = response.status_code == 429
+            retryable = throttled or response.status_code in SERVER_ERRORS
+            if retryable:
+                self.limiter.record_failure(throttled=throttled)
+            else:
+                self.limiter.record_success()
+            if retryable and attempt < MAX_RATE_LIMIT_RETRIES:
+                METRICS.inc("api_retries_total", service="spotify", endpoint=endpoint)
+                if throttled:
+                    self.limiter.pause(retry_after_seconds(response.headers))
+                else:
+                    await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            if response.status_code >= 400:
+                raise SpotifyException(response.status_code, -1, f"{response.url}:\n {response.text}", headers=response.headers)
+            return response.json() if response.content else {}
+
+    async def search(self, q: str, type: str = "track", limit: int = 10) -> dict:
+        return await self._request("GET", "search", "search", params={"q": q, "type": type, "limit": limit})
+
+    async def current_user(self) -> dict:
+        return await self._request("GET", "me", "me")
+
+    async def user_playlist_create(self, user: str, name: str, public: bool = False, description: str = "") -> dict:
+        payload = {"name": name, "public": public, "description": description}
+        return await self._request("POST", f"users/{user}/playlists", "playlist_create", payload=payload)
+
+    async def playlist_add_items(self, playlist_id: str, items: List[str], position: Optional[int] = None) -> dict:
+        payload = {"uris": [f"spotify:track:{item}" if ":" not in item else item for item in items]}
+        if position is not None:
+            payload["position"] = position
+        return await self._request("POST", f"playlists/{playlist_id}/tracks", "playlist_add_items", payload=payload)
+
+
+async def search_track_with_stage_async(
+        client: AsyncSpotifyClient,
+        artist: str,
+        title: str,
+        duration_ms: int = None,
+        isrc: Optional[str] = None,
+        catalog=None
+) -> SearchResult:
+    """Igual que search_track_with_stage, pero con el cliente asíncrono"""
+    plan = search_plan(artist, title, duration_ms, isrc)
+    try:
+        stage, query, limit = next(plan)
+        while True:
+            start = time.perf_counter()
+            result = await client.search(query, limit=limit)
+            METRICS.observe("search_stage_seconds", time.perf_counter() - start, stage=stage)
+            if catalog is not None:
+                catalog.add_items(result.get("tracks", {}).get("items", []))
+            stage, query, limit = plan.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+async def resolve_tracks_async(
+        client: AsyncSpotifyClient,
+        tracks: Sequence[Track],
+        cache: Optional[MatchCache] = None,
+        stats: Optional[ResolveStats] = None,
+        on_result: Optional[Callable[[int, Track, Optional[dict]], None]] = None,
+        catalog=None,
+) -> Tuple[List[str], List[Track]]:
+    """
+    Versión asíncrona de resolve_tracks: cientos de búsquedas en vuelo que
+    comparten unas pocas conexiones. Devuelve (ids encontrados, no encontradas)
+    en el orden original. on_result y catalog igual que en resolve_tracks.
+    """
+
+    async def _resolve(song: Track):
+        if cache:
+            cached, item = cache.get(song)
+            if cached:
+                return item, STAGE_CACHE if item else None, 0
+
+        item = catalog.lookup(song) if catalog is not None else None
+        if item:
+            if cache:
+                cache.put(song, item)
+            return item, STAGE_CATALOG, 0
+
+        try:
+            item, stage, api_calls = await search_track_with_stage_async(
+                client, song.artist, song.title, song.duration_ms, isrc=song.isrc, catalog=catalog
+            )
+        except (SpotifyException, httpx.HTTPError, CircuitOpenError) as e:
+            #igual que stream_resolve: la canción queda como no encontrada y la corrida sigue
+            print(f"Error buscando {song}: {e}")
+            return None, STAGE_ERROR, 0
+        if cache:
+            cache.put(song, item)
+        return item, stage, api_calls
+
+    found_track_ids = []
+    not_found = []
+    total = len(tracks)
+
+    #cada canción distinta se busca una sola vez
+    index = TrackIndex()
+    index.extend(tracks)
+    unique = index.representatives
+    results = []
+    for start in range(0, len(unique), CHUNK_SIZE):
+        chunk = unique[start:start + CHUNK_SIZE]
+        results.extend(await asyncio.gather(*(_resolve(song) for song in chunk)))
+
+    searched = set()
+    for idx, (song, group) in enumerate(zip(tracks, index.groups), start=1):
+        item, stage, api_calls = results[group]
+        if stats:
+            if group in searched:
+                stats.record(STAGE_DUPLICATE if item else stage, 0)
+            else:
+                searched.add(group)
+                stats.record(stage, api_calls)
+        print(f"[{idx}/{total}] Buscando: {song}... {'✅' if item else '❌'}")
+        if on_result:
+            on_result(idx - 1, song, item)
+        if item:
+            found_track_ids.append(item["id"])
+        else:
+            not_found.append(song)
+
+    return found_track_ids, not_found
+
+
+async def add_tracks_in_batches_async(client: AsyncSpotifyClient, playlist_id: str, track_ids: List[str]):
+    """Agrega tracks en lotes de 100, en orden"""
+    for i in range(0, len(track_ids), BATCH_SIZE):
+        batch = track_ids[i : i + BATCH_SIZE]
+        await client.playlist_add_items(playlist_id, batch)
+        print(f"→ Agregadas {len(batch)} canciones a la playlist (total parcial: {i + len(batch)})")
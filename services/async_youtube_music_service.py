@@ -0,0 +1,37 @@
+import asyncio
+from typing import List, Optional
+from models import Track
+from services.async_http import MAX_CONNECTIONS
+from services.youtube_music_service import YoutubeMusicClient
+
+
+class AsyncYoutubeMusicClient:
+    """
+    Versión asíncrona de YoutubeMusicClient.
+
+    ytmusicapi no tiene API asíncrona, así que las llamadas se corren en hilos
+    (asyncio.to_thread) sobre un solo YTMusic con una sesión HTTP keep-alive
+    compartida, en lugar de crear un YTMusic y una conexión nueva cada vez.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONNECTIONS):
+        self._sync = YoutubeMusicClient(pool_size=max_concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.max_concurrency = max_concurrency
+
+    async def _run(self, func, *args, **kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def search_tracks(self, query: str, limit: int = 5) -> List[Track]:
+        return await self._run(self._sync.search_tracks, query, limit)
+
+    async def get_tracks_from_playlist(self, playlist_url: str) -> List[Track]:
+        return await self._run(self._sync.get_tracks_from_playlist, playlist_url)
+
+
+async def get_tracks_from_youtube_music_playlist_async(playlist_url: str) -> List[Track]:
+    """Equivalente asíncrono de get_tracks_from_youtube_music_playlist"""
+    return await AsyncYoutubeMusicClient().get_tracks_from_playlist(playlist_url)
@@ -0,0 +1,187 @@
+import json
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Set
+from models import Track
+from services.match_cache import compact_item
+from services.metrics import METRICS
+from services.normalization import canonical_artist, canonical_text, canonical_title
+
+DEFAULT_CATALOG_PATH = ".catalog_index.sqlite3"
+#candidatos (los que más tokens comparten) que se califican por consulta
+MAX_CANDIDATES = 20
+
+
+def catalog_tokens(artist: str, title: str) -> Set[str]:
+    """Tokens canónicos (sin acentos ni puntuación) de artista y título"""
+    return set(canonical_text(f"{artist} {title}").split())
+
+
+def _item_tokens(item: dict) -> Set[str]:
+    artists = " ".join(a.get("name", "") for a in item.get("artists") or [])
+    return catalog_tokens(artists, item.get("name", ""))
+
+
+def _same_song(track: Track, item: dict) -> bool:
+    """
+    Sin la API no hay una búsqueda que descarte parecidos ("Parte 1" y
+    "Parte 2" tienen score alto): se pide el mismo título canónico y que el
+    artista sea uno de los del candidato.
+    """
+    if canonical_title(track.title) != canonical_title(item.get("name")):
+        return False
+    artist = canonical_artist(track.artist)
+    return any(artist == canonical_artist(a.get("name")) for a in item.get("artists") or [])
+
+
+class CatalogIndex:
+    """
+    Catálogo local (SQLite) de todos los tracks que ha devuelto la búsqueda
+    de Spotify, no solo los elegidos: cada candidato de cada respuesta se
+    guarda con su ISRC, duración y un índice invertido de tokens de
+    artista/título.
+
+    Antes de buscar en la API se consulta aquí: por ISRC, o por los tracks
+    que más tokens comparten con la canción, calificados con el mismo
+    fuzzy matching que la búsqueda normal. Solo un candidato con el mismo
+    título y artista canónicos y score >= min_score (el umbral con el que
+    la búsqueda amplia deja de buscar) se usa sin llamar a la API. Así las
+    canciones populares que ya aparecieron en otras playlists se resuelven
+    sin red.
+
+    A diferencia de MatchCache (resultado final por canción buscada), el
+    catálogo sirve para canciones que nunca se han buscado.
+    """
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH, destination: str = "spotify", min_score: Optional[float] = None):
+        #rapidfuzz y spotipy se importan hasta que se abre el catálogo (arranque rápido del CLI)
+        from services.scoring import score_candidates
+        from services.spotify_service import CONFIDENT_SCORE
+
+        self.path = path
+        self.destination = destination
+        self.min_score = CONFIDENT_SCORE if min_score is None else min_score
+        self._score_candidates = score_candidates
+        self.hits = 0
+        self.misses = 0
+        self._known: Set[str] = set() #ids ya guardados en esta ejecución
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                destination TEXT NOT NULL,
+                id TEXT NOT NULL,
+                isrc TEXT,
+                duration_ms INTEGER,
+                item TEXT NOT NULL,
+                PRIMARY KEY (destination, id)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS items_isrc ON items (destination, isrc)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tokens (
+                destination TEXT NOT NULL,
+                token TEXT NOT NULL,
+                id TEXT NOT NULL,
+                PRIMARY KEY (destination, token, id)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def add_items(self, items: Iterable[Optional[dict]]):
+        """Guarda los candidatos de una respuesta de búsqueda (los ya conocidos se ignoran)"""
+        rows, token_rows = [], []
+        with self._lock:
+            for item in items:
+                if not item or not item.get("id") or item["id"] in self._known:
+                    continue
+                self._known.add(item["id"])
+                compact = compact_item(item)
+                isrc = (compact["external_ids"].get("isrc") or "").upper() or None
+                rows.append((self.destination, compact["id"], isrc, compact["duration_ms"], json.dumps(compact)))
+                token_rows.extend((self.destination, token, compact["id"]) for token in _item_tokens(compact))
+            if not rows:
+                return
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO items (destination, id, isrc, duration_ms, item) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.executemany("INSERT OR IGNORE INTO tokens (destination, token, id) VALUES (?, ?, ?)", token_rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _by_isrc(self, isrc: str) -> Optional[dict]:
+        row = self._conn.execute(
+            "SELECT item FROM items WHERE destination = ? AND isrc = ? LIMIT 1",
+            (self.destination, isrc.upper()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _by_tokens(self, tokens: Set[str]) -> List[dict]:
+        #se piden los que comparten al menos la mitad de los tokens, los que más primero
+        placeholders = ",".join("?" * len(tokens))
+        rows = self._conn.execute(
+            f"""
+            SELECT items.item FROM (
+                SELECT id, COUNT(*) AS shared FROM tokens
+                WHERE destination = ? AND token IN ({placeholders})
+                GROUP BY id HAVING shared >= ?
+                ORDER BY shared DESC LIMIT ?
+            ) AS best JOIN items ON items.destination = ? AND items.id = best.id
+            """,
+            (self.destination, *tokens, max(1, (len(tokens) + 1) // 2), MAX_CANDIDATES, self.destination),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def lookup(self, track: Track) -> Optional[dict]:
+        """Devuelve el track del catálogo que corresponde a la canción, o None si no hay uno confiable"""
+        with self._lock:
+            item = self._by_isrc(track.isrc) if track.isrc else None
+            if item is None:
+                tokens = catalog_tokens(track.artist, track.title)
+                candidates = self._by_tokens(tokens) if tokens else []
+            else:
+                candidates = []
+
+        candidates = [candidate for candidate in candidates if _same_song(track, candidate)]
+        if item is None and candidates:
+            #el score además descarta duraciones que no coinciden
+            scores = self._score_candidates(track.artist, track.title, track.duration_ms, candidates)
+            best = max(range(len(candidates)), key=scores.__getitem__)
+            if scores[best] >= self.min_score:
+                item = candidates[best]
+
+        if item is None:
+            self.misses += 1
+            METRICS.inc("catalog_lookups_total", result="miss")
+            return None
+        self.hits += 1
+        METRICS.inc("catalog_lookups_total", result="hit")
+        return item
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM items WHERE destination = ?", (self.destination,)
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        """Aciertos/fallos del catálogo en esta ejecución"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from models import Track
+from services.normalization import dedupe_key
+
+#tipos de registro del journal
+RECORD_RUN = "run"
+RECORD_PLAYLIST = "playlist"
+RECORD_TRACK = "track"
+RECORD_BATCH = "batch"
+RECORD_DONE = "done"
+
+
+class SourceChangedError(RuntimeError):
+    """La fuente ya no coincide con la de la corrida que se quiere reanudar"""
+
+
+class JournalMismatchError(RuntimeError):
+    """El archivo del journal es de otra corrida sin terminar (o no es un journal): no se sobrescribe"""
+
+
+def track_fingerprint(track: Track) -> str:
+    """Identificador corto de una canción, para comprobar que la fuente no cambió"""
+    return dedupe_key(track).hex()
+
+
+class CheckpointJournal:
+    """
+    Journal de solo-agregar (JSONL) para reanudar una clonación interrumpida.
+
+    Cada línea es un registro:
+        {"type": "run", "name": ..., "destination": ...}
+        {"type": "playlist", "id": ...}            playlist creada
+        {"type": "track", "i": 3, "fp": ..., "id": ...}  canción i resuelta (id None = no encontrada)
+        {"type": "batch", "committed": 200}        ids ya agregados a la playlist
+        {"type": "done"}
+
+    Al abrir un journal de una corrida sin terminar con el mismo nombre y
+    destino se recupera el estado: la playlist no se vuelve a crear, las
+    canciones resueltas no se vuelven a buscar y los lotes confirmados no
+    se vuelven a agregar. Si la última línea quedó a medias (el proceso
+    murió escribiendo) se ignora.
+
+    Un journal de una corrida ya terminada se reemplaza por uno nuevo. Si
+    el archivo es de una corrida sin terminar con otro nombre/destino (o no
+    es un journal) se lanza JournalMismatchError en lugar de borrarlo: es
+    el único registro de esa corrida.
+
+    Se escribe desde dos hilos: record_track desde el que recoge resultados
+    y record_batch desde el PlaylistWriter (on_commit). Cada registro se
+    escribe completo (con su flush/fsync) bajo un lock para que las líneas
+    no se mezclen.
+    """
+
+    def __init__(self, path: str, name: str, destination: str = "spotify"):
+        self.path = path
+        self.name = name
+        self.destination = destination
+        self.playlist_id: Optional[str] = None
+        self.resolved: Dict[int, Tuple[str, Optional[str]]] = {} #i -> (fp, id)
+        self.committed = 0
+        self.resuming = False
+        self._lock = threading.Lock()
+
+        if os.path.exists(path) and self._load():
+            self.resuming = True
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+            self._write({"type": RECORD_RUN, "name": name, "destination": destination}, sync=True)
+
+    def _load(self) -> bool:
+        """
+        Lee el journal; devuelve True si es una corrida de este nombre/destino
+        sin terminar y False si se puede empezar de nuevo (vacío o terminado)
+        """
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        records = []
+        valid = 0 #bytes de registros completos
+        for line in data.split(b"\n")[:-1]: #lo que va después del último \n está incompleto
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break #línea escrita a medias: lo que sigue no es confiable
+            valid += len(line) + 1
+
+        if not records or records[0].get("type") != RECORD_RUN:
+            if data.strip():
+                raise JournalMismatchError(
+                    f"{self.path} no es un journal de clonación (o está dañado); usa otra ruta en --resume"
+                )
+            return False
+        if any(record.get("type") == RECORD_DONE for record in records):
+            return False
+        header = records[0]
+        if header.get("name") != self.name or header.get("destination") != self.destination:
+            raise JournalMismatchError(
+                f"{self.path} es de otra corrida sin terminar (playlist '{header.get('name')}', "
+                f"destino {header.get('destination')}); para reanudarla usa ese nombre, "
+                f"o usa otra ruta en --resume"
+            )
+
+        if valid < len(data):
+            #se corta la línea incompleta para que los registros nuevos queden bien
+            with open(self.path, "r+b") as f:
+                f.truncate(valid)
+
+        for record in records[1:]:
+            kind = record.get("type")
+            if kind == RECORD_PLAYLIST:
+                self.playlist_id = record["id"]
+            elif kind == RECORD_TRACK:
+                self.resolved[record["i"]] = (record["fp"], record.get("id"))
+            elif kind == RECORD_BATCH:
+                self.committed = max(self.committed, record["committed"])
+        return True
+
+    def _write(self, record: dict, sync: bool = False):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            #los puntos de confirmación (playlist, lotes) se fuerzan a disco
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def get(self, index: int, track: Track) -> Tuple[bool, Optional[str]]:
+        """
+        Devuelve (ya_resuelta, id) de la canción en la posición index; id es
+        None si no se encontró. Lanza SourceChangedError si en esa posición
+        había otra canción en la corrida anterior.
+        """
+        entry = self.resolved.get(index)
+        if entry is None:
+            return False, None
+        fp, track_id = entry
+        if fp != track_fingerprint(track):
+            raise SourceChangedError(
+                f"La canción {index + 1} ({track}) no coincide con la corrida anterior; "
+                f"borra {self.path} para empezar de nuevo"
+            )
+        return True, track_id
+
+    def set_playlist(self, playlist_id: str):
+        self.playlist_id = playlist_id
+        self._write({"type": RECORD_PLAYLIST, "id": playlist_id}, sync=True)
+
+    def record_track(self, index: int, track: Track, track_id: Optional[str]):
+        self.resolved[index] = (track_fingerprint(track), track_id)
+        self._write({"type": RECORD_TRACK, "i": index, "fp": self.resolved[index][0], "id": track_id})
+
+    def record_batch(self, committed: int):
+        """committed: cuántos ids (en orden) ya están en la playlist"""
+        self.committed = committed
+        self._write({"type": RECORD_BATCH, "committed": committed}, sync=True)
+
+    def finish(self):
+        self._write({"type": RECORD_DONE}, sync=True)
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
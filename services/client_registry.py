@@ -0,0 +1,111 @@
+import threading
+from typing import Callable, Dict, Optional
+
+#conexiones keep-alive por cliente HTTP compartido (una por hilo que lo use a la vez)
+POOL_SIZE = 16
+
+
+def _spotify_client():
+    from services.spotify_service import load_env, init_spotify
+
+    client_id, client_secret, redirect_uri, username = load_env()
+    return init_spotify(client_id, client_secret, redirect_uri)
+
+
+def _deezer_client():
+    from services.deezer_service import DeezerClient
+    from services.http_cache import shared_http_cache
+
+    return DeezerClient(pool_size=POOL_SIZE, http_cache=shared_http_cache())
+
+
+def _youtube_client():
+    from services.http_cache import shared_http_cache
+    from services.youtube_music_service import YoutubeMusicClient
+
+    return YoutubeMusicClient(pool_size=POOL_SIZE, http_cache=shared_http_cache())
+
+
+def _apple_client():
+    from services.apple_service import AppleMusicClient
+
+    return AppleMusicClient()
+
+
+class ClientRegistry:
+    """
+    Un cliente por servicio, creado la primera vez que se pide y reutilizado
+    por todas las funciones y jobs del proceso.
+
+    Así el pool de conexiones, el token OAuth de Spotify y el contexto de
+    visitante de YTMusic se crean una sola vez, en lugar de pagar el
+    handshake y la autenticación en cada llamada. Los clientes que entrega
+    se comparten entre hilos.
+
+    Cada servicio se crea bajo su propio lock: dos hilos que piden el mismo
+    servicio al mismo tiempo reciben la misma instancia, y crear uno no
+    bloquea a los demás.
+    """
+
+    def __init__(self, factories: Optional[Dict[str, Callable[[], object]]] = None):
+        self._factories: Dict[str, Callable[[], object]] = dict(factories or {})
+        self._clients: Dict[str, object] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, service: str, factory: Callable[[], object]):
+        """Cambia cómo se crea el cliente de un servicio (el actual, si lo hay, se descarta)"""
+        with self._lock:
+            self._factories[service] = factory
+            self._clients.pop(service, None)
+
+    def factory(self, service: str) -> Callable[[], object]:
+        """Cómo se crea el cliente de un servicio (p. ej. para crearlo igual en otro proceso)"""
+        with self._lock:
+            return self._factories[service]
+
+    def set(self, service: str, client):
+        """Usa un cliente ya creado (p. ej. uno simulado en los benchmarks)"""
+        with self._lock:
+            self._clients[service] = client
+
+    def get(self, service: str):
+        client = self._clients.get(service)
+        if client is not None:
+            return client
+
+        with self._lock:
+            if service not in self._factories and service not in self._clients:
+                raise KeyError(f"Servicio desconocido: {service}")
+            lock = self._locks.setdefault(service, threading.Lock())
+        with lock:
+            client = self._clients.get(service)
+            if client is None:
+                client = self._factories[service]()
+                with self._lock:
+                    self._clients[service] = client
+        return client
+
+    def close(self):
+        """Cierra las sesiones HTTP de los clientes creados y los olvida"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            session = getattr(client, "session", None) or getattr(client, "_session", None)
+            if session is not None and hasattr(session, "close"):
+                session.close()
+
+
+#registro compartido por todo el proceso
+REGISTRY = ClientRegistry({
+    "spotify": _spotify_client,
+    "deezer": _deezer_client,
+    "youtube": _youtube_client,
+    "apple": _apple_client,
+})
+
+
+def get_client(service: str):
+    """Cliente compartido de un servicio: "spotify", "deezer", "youtube" o "apple" """
+    return REGISTRY.get(service)
@@ -1,6 +1,66 @@
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
 import requests
-from models import Track
+from models import IncompleteSourceError, Track
+from services.client_registry import get_client
+from services.http_cache import HttpCache
+from services.http_cache_adapter import mount_http_cache
+from services.metrics import METRICS
+from services.rate_limiter import CircuitOpenError, TokenBucket, call_with_retries, get_limiter, retry_after_seconds
+
+#segundos de espera por respuesta
+REQUEST_TIMEOUT = 5
+#código del error "Quota limit exceeded" (Deezer lo manda con status 200)
+QUOTA_ERROR_CODE = 4
+#la cuota de Deezer es por ventanas de 5 s y no manda Retry-After
+QUOTA_PAUSE = 5.0
+#hilos que piden el detalle (/track/{id}) de las canciones de una página para leer su ISRC
+ISRC_WORKERS = 4
+
+#pedir el ISRC de cada canción al leer playlists (ver configure_isrc_lookup)
+_isrc_lookup = False
+
+
+def configure_isrc_lookup(enabled: bool):
+    """
+    Activa la lectura del ISRC de las canciones de las playlists (una
+    petición /track/{id} por canción, con el limiter de Deezer: una playlist
+    de 2000 canciones tarda ~200 s más). Se llama antes de crear los
+    clientes (p. ej. con --deezer-isrc).
+    """
+    global _isrc_lookup
+    _isrc_lookup = enabled
+
+
+def isrc_lookup_enabled() -> bool:
+    return _isrc_lookup
+
+
+class DeezerQuotaError(requests.RequestException):
+    """Deezer respondió con el error de cuota excedida"""
+
+
+def _storable(response: requests.Response) -> bool:
+    """Deezer manda sus errores (p. ej. cuota excedida) con status 200: esos no se guardan en la caché"""
+    try:
+        data = response.json()
+    except ValueError:
+        return False
+    return not (isinstance(data, dict) and "error" in data)
+
+
+def _retry_delay(error: Exception) -> Optional[float]:
+    """Cuánto esperar antes de reintentar (0 = backoff normal) o None si no tiene caso"""
+    if isinstance(error, DeezerQuotaError):
+        return QUOTA_PAUSE
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        if error.response.status_code == 429:
+            return retry_after_seconds(error.response.headers)
+        return 0.0 if error.response.status_code >= 500 else None
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return 0.0
+    return None
+
 
 class DeezerClient:
     """
@@ -9,9 +69,29 @@ class DeezerClient:
     """
 
     BASE_URL = "https://api.deezer.com"
+    PAGE_SIZE = 100 #máximo por request
 
-    def __init__(self):
+    def __init__(
+            self,
+            pool_size: Optional[int] = None,
+            limiter: Optional[TokenBucket] = None,
+            http_cache: Optional[HttpCache] = None,
+            fetch_isrc: Optional[bool] = None
+    ):
+        """
+        pool_size: conexiones keep-alive de la sesión, para compartir el
+        cliente entre hilos (ver services.client_registry)
+        limiter: por defecto el compartido de Deezer (ver get_limiter)
+        http_cache: caché de respuestas; releer una playlist que no cambió
+        no vuelve a descargarla (ver CachingHTTPAdapter)
+        fetch_isrc: pedir el ISRC de cada canción de las playlists (una
+        petición más por canción, ver _fill_isrcs); por defecto lo que diga
+        configure_isrc_lookup (apagado)
+        """
+        self.limiter = limiter or get_limiter("deezer")
+        self.fetch_isrc = isrc_lookup_enabled() if fetch_isrc is None else fetch_isrc
         self.session = requests.Session()
+        mount_http_cache(self.session, http_cache, pool_size, should_store=_storable)
     
     def search_tracks(self, query: str, limit: int = 5) -> List[Track]:
         """
@@ -26,23 +106,14 @@ class DeezerClient:
         }
 
         try:
-            response = self.session.get(endpoint, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
+            data = self._get_json(endpoint, params, "search")
 
-            tracks = [ ]
-            for item in data.get("data", []):
-                track = Track(
-                    artist = item["artist"]["name"],
-                    title=item["title"],
-                    album=item.get("album", {}).get("title", ""),
-                    duration_ms=item.get("duration", 0) * 1000, #convierte segundos a ms
-                )
-                tracks.append(track)
+            tracks = [self._track_from_item(item) for item in data.get("data", [])]
             
             print(f"→ Se encontraron {len(tracks)} canciones en Deezer")
             return tracks
-        except requests.RequestException as e:
+        except (requests.RequestException, CircuitOpenError) as e:
+            METRICS.inc("api_errors_total", service="deezer", endpoint="search")
             print(f"Error buscando en Deezer: {e}")
             return []
     
@@ -53,6 +124,24 @@ class DeezerClient:
         Espera una url tipo:
         https://www.deezer.com/playlist/1234567890
         """
+        tracks = list(self.iter_tracks_from_playlist(playlist_url))
+        print(f"→ Se obtuvieron {len(tracks)} canciones desde Deezer")
+        return tracks
+
+    def iter_tracks_from_playlist(self, playlist_url: str, prefetch: bool = True) -> Iterator[Track]:
+        """
+        Recorre una playlist de Deezer página por página (siguiendo `next`/`index`)
+        y va devolviendo cada Track conforme llegan las páginas.
+
+        Con prefetch=True la siguiente página se descarga en otro hilo mientras
+        se consumen las canciones de la página actual.
+
+        Si falla una página (ya sin reintentos), incluida la primera, o al
+        final se leyeron menos canciones que el total que reporta Deezer, se
+        lanza IncompleteSourceError en lugar de terminar como si la playlist
+        se hubiera acabado: quien la use para --sync --prune no debe tomarla
+        por completa.
+        """
         print(f"(DeezerClient) Obteniendo canciones de Deezer desde: {playlist_url}")
 
         #extrae ID de la playlist desde la URL
@@ -60,32 +149,144 @@ class DeezerClient:
 
         if not playlist_id:
             print("No se pudo extraer el ID de la playlist de la URL")
-            return[]
-        
+            return
+
         endpoint = f"{self.BASE_URL}/playlist/{playlist_id}/tracks"
-        params = {"limit": 100} #máximo por request
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
 
         try:
-            response = self.session.get(endpoint, params=params, timeout=5)
+            index = 0
+            page = self._fetch_page(endpoint, {"limit": self.PAGE_SIZE, "index": index})
+            if page is None:
+                METRICS.inc("source_incomplete_total", source="deezer")
+                raise IncompleteSourceError("No se pudo leer la playlist de Deezer")
+            expected = page.get("total")
+
+            while page:
+                items = page.get("data", [])
+                index += len(items)
+                next_request = self._next_page_request(page, endpoint, index)
+
+                #se pide la siguiente página antes de entregar la actual
+                future = None
+                if next_request and executor:
+                    future = executor.submit(self._fetch_page, *next_request)
+
+                for item in items:
+                    yield self._track_from_item(item)
+
+                if future:
+                    page = future.result()
+                elif next_request:
+                    page = self._fetch_page(*next_request)
+                else:
+                    page = None
+
+                if next_request and page is None:
+                    METRICS.inc("source_incomplete_total", source="deezer")
+                    total = f" de {expected}" if isinstance(expected, int) else ""
+                    raise IncompleteSourceError(
+                        f"No se pudo leer completa la playlist de Deezer: se leyeron {index}{total} canciones"
+                    )
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        if isinstance(expected, int) and index < expected:
+            METRICS.inc("source_incomplete_total", source="deezer")
+            raise IncompleteSourceError(
+                f"Deezer reporta {expected} canciones en la playlist, pero solo se recibieron {index}"
+            )
+
+    def _get_json(self, url: str, params: Optional[dict], endpoint: str) -> dict:
+        """
+        GET a la API respetando el limiter y reintentando ante 429, 5xx,
+        cuota excedida y errores de red. Lanza requests.RequestException
+        (o CircuitOpenError si Deezer lleva rato sin responder).
+        """
+        def _call() -> dict:
+            with METRICS.timer("api_request_seconds", service="deezer", endpoint=endpoint):
+                response = self.session.get(url, params=params, timeout=REQUEST_TIMEOUT)
+            if not getattr(response, "from_cache", False):
+                METRICS.inc("response_bytes_total", len(response.content), service="deezer")
             response.raise_for_status()
             data = response.json()
+            error = data.get("error") if isinstance(data, dict) else None
+            if isinstance(error, dict) and error.get("code") == QUOTA_ERROR_CODE:
+                raise DeezerQuotaError(error.get("message", "Quota limit exceeded"))
+            return data
 
-            tracks = []
-            for item in data.get("data", []):
-                track = Track(
-                    artist=item["artist"]["name"],
-                    title=item["title"],
-                    album=item.get("album", {}).get("title", ""),
-                    duration_ms=item.get("duration", 0) * 1000 #convierte segundos a ms
-                )
-                tracks.append(track)
-            print(f"→ Se obtuvieron {len(tracks)} canciones desde Deezer")
-            return tracks
-        except requests.RequestException as e:
+        return call_with_retries(self.limiter, _call, _retry_delay, service="deezer", endpoint=endpoint)
+
+    def _fetch_page(self, url: str, params: Optional[dict] = None) -> Optional[dict]:
+        """Descarga una página de resultados; devuelve None si hubo error"""
+        try:
+            data = self._get_json(url, params, "playlist_tracks")
+        except (requests.RequestException, CircuitOpenError) as e:
+            METRICS.inc("api_errors_total", service="deezer", endpoint="playlist_tracks")
             print(f"Error obteniendo playlist de Deezer: {e}")
-            return []
-    
-    def _extract_playlist_id(self, url: str) -> Optional[str]:
+            return None
+
+        #Deezer responde 200 con un objeto "error" cuando algo falla
+        if "error" in data:
+            print(f"Error obteniendo playlist de Deezer: {data['error'].get('message', data['error'])}")
+            return None
+        if self.fetch_isrc:
+            self._fill_isrcs(data.get("data", []))
+        return data
+
+    def _fill_isrcs(self, items: List[dict]):
+        """
+        Las canciones de /playlist/{id}/tracks no traen ISRC (solo las de
+        /track/{id}): se pide el detalle de cada una, con el limiter y la
+        caché HTTP, y se agrega su ISRC al item. Si una petición falla la
+        canción se queda sin ISRC y se busca con el fuzzy matching.
+        """
+        ids = [item["id"] for item in items if item.get("id") and not item.get("isrc")]
+        if not ids:
+            return
+        with ThreadPoolExecutor(max_workers=ISRC_WORKERS) as executor:
+            isrcs = dict(zip(ids, executor.map(self._track_isrc, ids)))
+        for item in items:
+            if item.get("id") in isrcs:
+                item["isrc"] = isrcs[item["id"]]
+
+    def _track_isrc(self, track_id) -> Optional[str]:
+        """ISRC de una canción (GET /track/{id}) o None si no se pudo obtener"""
+        try:
+            data = self._get_json(f"{self.BASE_URL}/track/{track_id}", None, "track")
+        except (requests.RequestException, CircuitOpenError):
+            METRICS.inc("api_errors_total", service="deezer", endpoint="track")
+            return None
+        if "error" in data:
+            return None
+        return data.get("isrc") or None
+
+    @classmethod
+    def _next_page_request(cls, page: dict, endpoint: str, index: int):
+        """Devuelve (url, params) de la siguiente página o None si ya no hay más"""
+        if not page.get("data"):
+            return None
+        if page.get("next"):
+            return page["next"], None
+        #algunas respuestas no traen "next", pero sí "total"
+        total = page.get("total")
+        if total is not None and index < total:
+            return endpoint, {"limit": cls.PAGE_SIZE, "index": index}
+        return None
+
+    @staticmethod
+    def _track_from_item(item: dict) -> Track:
+        return Track(
+            artist=item["artist"]["name"],
+            title=item["title"],
+            album=item.get("album", {}).get("title", ""),
+            duration_ms=item.get("duration", 0) * 1000, #convierte segundos a ms
+            isrc=item.get("isrc") or None #solo /track/{id} lo trae; en playlists lo agrega _fill_isrcs si está activo
+        )
+
+    @staticmethod
+    def _extract_playlist_id(url: str) -> Optional[str]:
         """
         extrae el ID de una url de Deezer.
         Se esperan formatos como:
@@ -152,5 +353,14 @@ def get_tracks_from_deezer_playlist(playlist_url: str) -> List[Track]:
      Función de alto nivel usada por el CLI.
      Envuelve al DeezerClient.
      """
-     client = DeezerClient()
-     return client.get_tracks_from_playlist(playlist_url)
\ No newline at end of file
+     client = get_client("deezer")
+     return client.get_tracks_from_playlist(playlist_url)
+
+
+def iter_tracks_from_deezer_playlist(playlist_url: str, prefetch: bool = True) -> Iterator[Track]:
+    """
+    Igual que get_tracks_from_deezer_playlist, pero devuelve las canciones
+    conforme se van descargando las páginas.
+    """
+    client = get_client("deezer")
+    return client.iter_tracks_from_playlist(playlist_url, prefetch=prefetch)
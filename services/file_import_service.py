@@ -0,0 +1,293 @@
+import csv
+import gc
+import os
+import re
+from typing import Iterator, List, Optional, Tuple, Union
+from models import Track, TrackStore
+
+DEFAULT_SEPARATOR = " - "
+#líneas que se leen de golpe del archivo (lectura por bloques)
+CHUNK_LINES_HINT = 1 << 20
+#cuántas líneas inválidas se guardan como ejemplo en el reporte
+MAX_SAMPLES = 10
+
+FORMAT_TEXT = "text"
+FORMAT_CSV = "csv"
+FORMAT_M3U = "m3u"
+
+#nombres de columnas aceptados en CSV (en minúsculas)
+_CSV_COLUMNS = {
+    "artist": ("artist", "artista", "artist name", "artists"),
+    "title": ("title", "titulo", "título", "track", "track name", "name", "song"),
+    "album": ("album", "álbum", "album name"),
+    "duration_ms": ("duration_ms", "duration (ms)"),
+    "duration": ("duration", "duracion", "duración", "length", "duration_s"),
+    "isrc": ("isrc",),
+}
+
+_EXTINF = re.compile(r"#EXTINF:\s*(-?\d+(?:\.\d+)?)[^,]*,(.*)")
+
+
+class ImportReport:
+    """Resumen de una importación: cuántas líneas, duplicados e inválidas hubo"""
+
+    def __init__(self, path: str = "", fmt: str = ""):
+        self.path = path
+        self.format = fmt
+        self.lines = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.malformed = 0
+        self.samples: List[Tuple[int, str]] = [] #(número de línea, texto)
+
+    def add_malformed(self, line_no: int, text: str):
+        self.malformed += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append((line_no, text))
+
+    def summary(self) -> str:
+        lines = [
+            f"→ {self.path} ({self.format}): {self.imported} canciones importadas, "
+            f"{self.duplicates} duplicadas, {self.malformed} líneas inválidas"
+        ]
+        for line_no, text in self.samples:
+            lines.append(f"   [ADVERTENCIA] Línea {line_no} inválida, se ignoró: {text}")
+        if self.malformed > len(self.samples):
+            lines.append(f"   ... y {self.malformed - len(self.samples)} más")
+        return "\n".join(lines)
+
+
+def detect_format(path: str) -> str:
+    """Adivina el formato por la extensión del archivo"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".csv", ".tsv"):
+        return FORMAT_CSV
+    if ext in (".m3u", ".m3u8"):
+        return FORMAT_M3U
+    return FORMAT_TEXT
+
+
+def _split_artist_title(text: str, separator: str) -> Optional[Tuple[str, str]]:
+    parts = text.split(separator, 1)
+    if len(parts) != 2:
+        return None
+    artist, title = parts[0].strip(), parts[1].strip()
+    if not artist or not title:
+        return None
+    return artist, title
+
+
+def _iter_text(f, separator: str, report: ImportReport) -> Iterator[List[Track]]:
+    """Formato de songs.txt: una canción por línea, `Artista - Título`. Entrega bloques de Tracks"""
+    line_no = 0
+    while True:
+        #se lee por bloques para no pagar una llamada de I/O por línea
+        chunk = f.readlines(CHUNK_LINES_HINT)
+        if not chunk:
+            break
+        tracks = []
+        append = tracks.append
+        for raw in chunk:
+            line_no += 1
+            line = raw.strip()
+            if not line:
+                continue
+            parts = line.split(separator, 1)
+            if len(parts) == 2:
+                artist, title = parts[0].strip(), parts[1].strip()
+                if artist and title:
+                    append(Track(artist, title))
+                    continue
+            report.add_malformed(line_no, line)
+        yield tracks
+    report.lines = line_no
+
+
+def _parse_duration(value: str, in_ms: bool) -> Optional[int]:
+    """Acepta segundos, milisegundos (si in_ms) o `m:ss` / `h:mm:ss`"""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        if ":" in value:
+            seconds = 0
+            for part in value.split(":"):
+                seconds = seconds * 60 + int(part)
+            return seconds * 1000
+        number = float(value)
+        return int(number) if in_ms else int(number * 1000)
+    except ValueError:
+        return None
+
+
+def _csv_header_map(row: List[str]) -> Optional[dict]:
+    """Si la fila es un encabezado, devuelve {campo: índice de columna}"""
+    normalized = [cell.strip().lower() for cell in row]
+    mapping = {}
+    for field, names in _CSV_COLUMNS.items():
+        for idx, cell in enumerate(normalized):
+            if cell in names:
+                mapping[field] = idx
+                break
+    if "artist" in mapping and "title" in mapping:
+        return mapping
+    return None
+
+
+def _iter_csv(f, report: ImportReport) -> Iterator[List[Track]]:
+    """
+    CSV con encabezado (artist, title y opcionalmente album, duration/duration_ms, isrc)
+    o sin encabezado con columnas artista,título[,álbum,duración_ms,isrc].
+    """
+    sample = f.read(4096)
+    f.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(f, dialect)
+    columns = None
+    line_no = 0
+    for row in reader:
+        line_no += 1
+        if not row or not any(cell.strip() for cell in row):
+            continue
+
+        #el encabezado es la primera fila no vacía
+        if columns is None:
+            columns = _csv_header_map(row)
+            if columns:
+                continue
+            columns = {"artist": 0, "title": 1, "album": 2, "duration_ms": 3, "isrc": 4}
+
+        def _cell(field: str) -> str:
+            idx = columns.get(field)
+            return row[idx].strip() if idx is not None and idx < len(row) else ""
+
+        artist, title = _cell("artist"), _cell("title")
+        if not artist or not title:
+            report.add_malformed(line_no, dialect.delimiter.join(row))
+            continue
+
+        if "duration_ms" in columns:
+            duration_ms = _parse_duration(_cell("duration_ms"), in_ms=True)
+        else:
+            duration_ms = _parse_duration(_cell("duration"), in_ms=False)
+
+        yield [Track(
+            artist=artist,
+            title=title,
+            album=_cell("album") or None,
+            duration_ms=duration_ms,
+            isrc=_cell("isrc").upper() or None,
+        )]
+    report.lines = line_no
+
+
+def _iter_m3u(f, separator: str, report: ImportReport) -> Iterator[List[Track]]:
+    """
+    M3U/M3U8 extendido: `#EXTINF:segundos,Artista - Título` seguido de la ruta.
+    Si una entrada no tiene #EXTINF se usa el nombre del archivo.
+    """
+    pending = None #(duración, texto) del último #EXTINF
+    line_no = 0
+    while True:
+        chunk = f.readlines(CHUNK_LINES_HINT)
+        if not chunk:
+            break
+        tracks = []
+        for raw in chunk:
+            line_no += 1
+            line = raw.strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                match = _EXTINF.match(line)
+                if match:
+                    seconds = float(match.group(1))
+                    pending = (int(seconds * 1000) if seconds > 0 else None, match.group(2).strip())
+                continue
+
+            if pending:
+                duration_ms, text = pending
+            else:
+                duration_ms, text = None, os.path.splitext(os.path.basename(line.replace("\\", "/")))[0]
+            pending = None
+
+            parsed = _split_artist_title(text, separator)
+            if not parsed:
+                report.add_malformed(line_no, text)
+                continue
+            tracks.append(Track(artist=parsed[0], title=parsed[1], duration_ms=duration_ms))
+        yield tracks
+    report.lines = line_no
+
+
+def iter_tracks_from_file(
+        path: str,
+        fmt: Optional[str] = None,
+        separator: str = DEFAULT_SEPARATOR,
+        dedupe: bool = False,
+        report: Optional[ImportReport] = None,
+) -> Iterator[Track]:
+    """
+    Lee canciones de un archivo de texto (`Artista - Título`), CSV o M3U/M3U8,
+    en streaming y por bloques.
+
+    Las líneas inválidas no se imprimen una por una: se cuentan en `report`
+    (con algunos ejemplos). Con dedupe=True se omiten las canciones repetidas
+    (mismo artista y título, sin distinguir mayúsculas).
+    """
+    fmt = fmt or detect_format(path)
+    if report is None:
+        report = ImportReport()
+    report.path = path
+    report.format = fmt
+
+    seen = set()
+    #utf-8-sig quita el BOM que agregan algunos editores / exportadores
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="" if fmt == FORMAT_CSV else None) as f:
+        if fmt == FORMAT_CSV:
+            chunks = _iter_csv(f, report)
+        elif fmt == FORMAT_M3U:
+            chunks = _iter_m3u(f, separator, report)
+        else:
+            chunks = _iter_text(f, separator, report)
+
+        for tracks in chunks:
+            if dedupe:
+                unique = []
+                for track in tracks:
+                    key = (track.artist.casefold(), track.title.casefold())
+                    if key in seen:
+                        report.duplicates += 1
+                        continue
+                    seen.add(key)
+                    unique.append(track)
+                tracks = unique
+            report.imported += len(tracks)
+            yield from tracks
+
+
+def import_tracks(
+        path: str,
+        fmt: Optional[str] = None,
+        separator: str = DEFAULT_SEPARATOR,
+        dedupe: bool = False,
+        compact: bool = False,
+) -> Tuple[Union[List[Track], TrackStore], ImportReport]:
+    """Importa todo el archivo; devuelve (canciones, reporte)"""
+    report = ImportReport()
+    tracks = iter_tracks_from_file(path, fmt=fmt, separator=separator, dedupe=dedupe, report=report)
+
+    #el recolector de basura se dispara muchas veces al crear millones de objetos
+    #que de todas formas van a seguir vivos; se pausa mientras se importa
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        songs = TrackStore(tracks) if compact else list(tracks)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return songs, report
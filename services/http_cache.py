@@ -0,0 +1,239 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Mapping, NamedTuple, Optional
+from services.metrics import METRICS
+
+DEFAULT_HTTP_CACHE_PATH = ".http_cache.sqlite3"
+#tamaño máximo (comprimido) de las respuestas guardadas; al pasarlo se borran las menos usadas
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+#segundos que una respuesta se usa sin preguntar al servidor si no manda Cache-Control
+#(0: siempre se revalida; una lectura vieja no debe pasar por la playlist actual)
+DEFAULT_FRESH_SECONDS = 0
+#nivel de zlib: el JSON de las playlists se comprime ~10x ya con niveles bajos
+COMPRESSION_LEVEL = 6
+
+_MAX_AGE = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+#headers que dejan de ser ciertos al guardar el cuerpo ya descomprimido
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+class CachedResponse(NamedTuple):
+    """Respuesta guardada en HttpCache"""
+    headers: Dict[str, str]
+    body: bytes
+    fresh: bool #se puede usar sin revalidar
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+
+def cache_key(method: str, url: str, body: Optional[bytes] = None) -> str:
+    """Llave de una petición: método, URL completa (con parámetros) y cuerpo"""
+    digest = hashlib.sha256(f"{method.upper()} {url}\n".encode("utf-8"))
+    if body:
+        digest.update(body if isinstance(body, bytes) else str(body).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def freshness(headers: Mapping[str, str], default: float) -> Optional[float]:
+    """
+    Segundos que la respuesta se puede usar sin revalidar según
+    Cache-Control (None si no se debe guardar: no-store)
+    """
+    cache_control = (headers.get("Cache-Control") or headers.get("cache-control") or "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+    match = _MAX_AGE.search(cache_control)
+    return float(match.group(1)) if match else default
+
+
+class HttpCache:
+    """
+    Caché en disco (SQLite) de respuestas HTTP de lectura (páginas de
+    playlists de Deezer, playlists de YouTube Music).
+
+    - Cada respuesta se guarda comprimida con zlib, con sus headers y hasta
+      cuándo está fresca (Cache-Control max-age o fresh_seconds, que por
+      defecto es 0).
+    - Mientras está fresca se usa sin tocar la red. Después, si el servidor
+      mandó ETag o Last-Modified, se revalida con una petición condicional
+      (ver CachingHTTPAdapter): un 304 no trae cuerpo. Lo que no tiene
+      vigencia ni validadores no se guarda.
+    - El total se limita a max_bytes: al pasarlo se borran las respuestas
+      que hace más tiempo no se usan (LRU).
+    """
+
+    def __init__(
+            self,
+            path: str = DEFAULT_HTTP_CACHE_PATH,
+            max_bytes: int = DEFAULT_MAX_BYTES,
+            fresh_seconds: float = DEFAULT_FRESH_SECONDS,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """La respuesta guardada para una llave (fresca o por revalidar), o None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT headers, body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        headers, body, expires_at = row
+        return CachedResponse(json.loads(headers), zlib.decompress(body), now < expires_at)
+
+    def put(self, key: str, url: str, headers: Mapping[str, str], body: bytes, max_age: float):
+        """Guarda una respuesta 200 (ya descomprimida) que estará fresca max_age segundos"""
+        kept = {name.lower(): value for name, value in headers.items() if name.lower() not in _DROPPED_HEADERS}
+        compressed = zlib.compress(body, COMPRESSION_LEVEL)
+        if len(compressed) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, headers, body, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(kept), compressed, len(compressed), now + max_age, now),
+            )
+            self._size += len(compressed) - (old[0] if old else 0)
+            self._evict()
+
+    def refresh(self, key: str, max_age: float):
+        """El servidor confirmó (304) que la respuesta guardada sigue vigente"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET expires_at = ? WHERE key = ?", (time.time() + max_age, key)
+            )
+
+    def _evict(self):
+        """Borra las respuestas usadas hace más tiempo hasta quedar bajo max_bytes (con el lock tomado)"""
+        while self._size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 32"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                return
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= size
+                METRICS.inc("http_cache_evictions_total")
+
+    def record(self, result: str):
+        """Cuenta cómo se resolvió una petición: "fresh", "revalidated" o "miss" """
+        if result == "fresh":
+            self.fresh_hits += 1
+        elif result == "revalidated":
+            self.revalidated += 1
+        else:
+            self.misses += 1
+        METRICS.inc("http_cache_requests_total", result=result)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        """Bytes (comprimidos) guardados"""
+        return self._size
+
+    def stats(self) -> dict:
+        """Cómo se resolvieron las peticiones cacheables en esta ejecución"""
+        return {
+            "fresh": self.fresh_hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "bytes": self._size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+#caché compartida por los clientes del proceso (ver shared_http_cache)
+_shared: Optional[HttpCache] = None
+_shared_path: Optional[str] = DEFAULT_HTTP_CACHE_PATH
+_shared_max_bytes = DEFAULT_MAX_BYTES
+_shared_fresh_seconds: float = DEFAULT_FRESH_SECONDS
+_shared_lock = threading.Lock()
+
+
+def configure_http_cache(
+        path: Optional[str] = DEFAULT_HTTP_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        fresh_seconds: float = DEFAULT_FRESH_SECONDS
+):
+    """
+    Archivo, tamaño y vigencia por defecto de la caché compartida (path=None
+    la desactiva). Se llama antes de crear los clientes (p. ej. con las
+    opciones del CLI).
+    """
+    global _shared_path, _shared_max_bytes, _shared_fresh_seconds
+    close_http_cache()
+    with _shared_lock:
+        _shared_path = path
+        _shared_max_bytes = max_bytes
+        _shared_fresh_seconds = fresh_seconds
+
+
+def shared_http_cache(create: bool = True) -> Optional[HttpCache]:
+    """
+    La caché que usan DeezerClient y YoutubeMusicClient del registro de
+    clientes. Se abre la primera vez que se pide (con create=False solo se
+    devuelve si ya estaba abierta).
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None and _shared_path and create:
+            _shared = HttpCache(_shared_path, max_bytes=_shared_max_bytes, fresh_seconds=_shared_fresh_seconds)
+        return _shared
+
+
+def close_http_cache():
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+            _shared = None
@@ -0,0 +1,124 @@
+import datetime
+from typing import Callable, Iterable, Optional, Sequence
+import requests
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from services.http_cache import HttpCache, CachedResponse, cache_key, freshness
+
+
+class CachingHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter de requests que pasa las lecturas por un HttpCache.
+
+    - Respuesta guardada y fresca: se devuelve sin tocar la red.
+    - Respuesta guardada pero vencida: se pide con If-None-Match /
+      If-Modified-Since; si el servidor responde 304 se devuelve la guardada
+      (sin descargar el cuerpo otra vez) y se renueva su vigencia.
+    - Un 200 se guarda si queda fresco algún tiempo o trae ETag /
+      Last-Modified (si no, nunca se podría reutilizar) y should_store, si
+      se pasa, lo acepta (p. ej. Deezer manda sus errores con status 200).
+
+    Solo se cachean los métodos de `methods` y, si se indica, las URLs que
+    contienen alguno de `paths` (p. ej. solo "/browse" en YouTube Music,
+    que lee playlists por POST). Con respect_cache_control=False se ignora
+    el Cache-Control del servidor y toda respuesta 200 queda fresca
+    cache.fresh_seconds. Las respuestas servidas desde la caché traen
+    `from_cache = True`.
+    """
+
+    def __init__(
+            self,
+            cache: HttpCache,
+            methods: Iterable[str] = ("GET",),
+            paths: Optional[Sequence[str]] = None,
+            respect_cache_control: bool = True,
+            should_store: Optional[Callable[[requests.Response], bool]] = None,
+            **kwargs
+    ):
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.methods = {method.upper() for method in methods}
+        self.paths = tuple(paths) if paths else None
+        self.respect_cache_control = respect_cache_control
+        self.should_store = should_store
+
+    def _cacheable(self, request: requests.PreparedRequest) -> bool:
+        if request.method not in self.methods:
+            return False
+        return self.paths is None or any(path in request.url for path in self.paths)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if not self._cacheable(request):
+            return super().send(request, **kwargs)
+
+        key = cache_key(request.method, request.url, request.body)
+        cached = self.cache.get(key)
+        if cached is not None and cached.fresh:
+            self.cache.record("fresh")
+            return self._from_cache(request, cached)
+
+        if cached is not None:
+            #petición condicional: si no cambió, el servidor responde 304 sin cuerpo
+            if cached.etag:
+                request.headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request.headers["If-Modified-Since"] = cached.last_modified
+
+        response = super().send(request, **kwargs)
+        if self.respect_cache_control:
+            max_age = freshness(response.headers, self.cache.fresh_seconds)
+        else:
+            max_age = self.cache.fresh_seconds
+        if response.status_code == 304 and cached is not None:
+            self.cache.record("revalidated")
+            self.cache.refresh(key, max_age or 0.0)
+            response.close()
+            return self._from_cache(request, cached)
+
+        self.cache.record("miss")
+        if response.status_code == 200 and self._storable(response, max_age):
+            self.cache.put(key, request.url, response.headers, response.content, max_age)
+        return response
+
+    def _storable(self, response: requests.Response, max_age: Optional[float]) -> bool:
+        if max_age is None:
+            return False
+        #sin vigencia ni validadores nunca se podría reutilizar
+        if max_age <= 0 and not (response.headers.get("ETag") or response.headers.get("Last-Modified")):
+            return False
+        return self.should_store is None or self.should_store(response)
+
+    def _from_cache(self, request: requests.PreparedRequest, cached: CachedResponse) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.headers = CaseInsensitiveDict(cached.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.elapsed = datetime.timedelta(0)
+        response._content = cached.body
+        response._content_consumed = True
+        response.from_cache = True
+        return response
+
+
+def mount_http_cache(
+        session: requests.Session,
+        cache: Optional[HttpCache],
+        pool_size: Optional[int] = None,
+        **options
+):
+    """
+    Monta en la sesión (para https://) un adapter con pool de pool_size
+    conexiones que, si hay caché, pasa las lecturas por ella.
+    options va a CachingHTTPAdapter (methods, paths, respect_cache_control,
+    should_store).
+    """
+    if cache is None and not pool_size:
+        return
+    pool = {"pool_connections": 1, "pool_maxsize": pool_size or DEFAULT_POOLSIZE}
+    adapter = CachingHTTPAdapter(cache, **options, **pool) if cache is not None else HTTPAdapter(**pool)
+    session.mount("https://", adapter)
@@ -0,0 +1,194 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from models import Track
+from services.file_import_service import iter_tracks_from_file, DEFAULT_SEPARATOR
+from services.metrics import METRICS
+from services.normalization import TrackIndex
+
+SOURCES = ("file", "apple", "deezer", "youtube")
+
+#marca de fin de fuente en la cola de cada lector
+_DONE = object()
+
+
+class SourceSpec(NamedTuple):
+    """Una fuente a leer: tipo ("file", "apple", "deezer", "youtube") y ruta/URL"""
+    source: str
+    location: str
+
+    def __str__(self) -> str:
+        return f"{self.source}:{self.location}"
+
+
+def parse_source_spec(text: str) -> SourceSpec:
+    """
+    Convierte `tipo:ubicación` en un SourceSpec, p. ej.
+        deezer:https://www.deezer.com/playlist/123
+        youtube:PLxxxx
+        file:songs.csv
+    Sin tipo conocido se asume que es un archivo.
+    """
+    source, sep, location = text.partition(":")
+    if sep and source.lower() in SOURCES:
+        return SourceSpec(source.lower(), location.strip())
+    return SourceSpec("file", text.strip())
+
+
+class SourceResult:
+    """Cómo le fue a una fuente: cuántas canciones dio, cuánto tardó y si falló"""
+
+    def __init__(self, spec: SourceSpec):
+        self.spec = spec
+        self.tracks = 0
+        self.unique = 0
+        self.seconds = 0.0
+        self.error: Optional[BaseException] = None
+
+    @property
+    def complete(self) -> bool:
+        """
+        La fuente se leyó sin errores y dio al menos una canción (una fuente
+        vacía casi siempre es una lectura fallida, p. ej. una URL mal escrita)
+        """
+        return self.error is None and self.tracks > 0
+
+
+class IngestReport:
+    """Resumen de una lectura combinada de varias fuentes"""
+
+    def __init__(self):
+        self.sources: List[SourceResult] = []
+        self.duplicates = 0
+        self.seconds = 0.0 #tiempo total de pared
+
+    @property
+    def tracks(self) -> int:
+        return sum(result.unique for result in self.sources)
+
+    def summary(self) -> str:
+        lines = [
+            f"→ {self.tracks} canciones distintas de {len(self.sources)} fuentes "
+            f"({self.duplicates} duplicadas) en {self.seconds:.2f} s"
+        ]
+        for result in self.sources:
+            if result.error is not None:
+                lines.append(f"   [ERROR] {result.spec}: {result.error}")
+                continue
+            if not result.tracks:
+                lines.append(f"   [VACÍA] {result.spec}: 0 canciones en {result.seconds:.2f} s")
+                continue
+            lines.append(
+                f"   {result.spec}: {result.tracks} canciones ({result.unique} nuevas) en {result.seconds:.2f} s"
+            )
+        return "\n".join(lines)
+
+
+def iter_source(spec: SourceSpec, separator: str = DEFAULT_SEPARATOR) -> Iterator[Track]:
+    """Canciones de una fuente, sin preguntar nada al usuario"""
+    #cada servicio se importa solo si la corrida lo usa
+    if spec.source == "file":
+        return iter_tracks_from_file(spec.location or "songs.txt", separator=separator)
+    if spec.source == "apple":
+        from services.apple_service import get_tracks_from_apple_playlist
+        return iter(get_tracks_from_apple_playlist(spec.location))
+    if spec.source == "deezer":
+        from services.deezer_service import iter_tracks_from_deezer_playlist
+        return iter_tracks_from_deezer_playlist(spec.location)
+    if spec.source == "youtube":
+        from services.youtube_music_service import iter_tracks_from_youtube_music_playlist
+        return iter_tracks_from_youtube_music_playlist(spec.location)
+    raise ValueError(f"Fuente inválida: {spec.source}")
+
+
+def _read_source(
+        spec: SourceSpec,
+        result: SourceResult,
+        out: queue.Queue,
+        stop: threading.Event,
+        separator: str
+):
+    """Lee una fuente en un hilo y deja sus canciones en `out`, terminando con _DONE"""
+    start = time.perf_counter()
+    try:
+        for track in iter_source(spec, separator=separator):
+            if stop.is_set():
+                break
+            out.put(track)
+            result.tracks += 1
+    except Exception as e:
+        result.error = e
+    finally:
+        result.seconds = time.perf_counter() - start
+        METRICS.observe("source_fetch_seconds", result.seconds, source=spec.source)
+        out.put(_DONE)
+
+
+def iter_merged_sources(
+        specs: Sequence[SourceSpec],
+        dedupe: bool = True,
+        workers: Optional[int] = None,
+        separator: str = DEFAULT_SEPARATOR,
+        report: Optional[IngestReport] = None
+) -> Iterator[Track]:
+    """
+    Lee varias fuentes a la vez y las entrega como un solo flujo ordenado:
+    primero todas las canciones de la primera fuente, luego las de la
+    segunda, etc. (el mismo orden que si se leyeran una tras otra).
+
+    Cada fuente se lee en su propio hilo desde el principio, así que el
+    tiempo total es el de la fuente más lenta y no la suma. Mientras se
+    entrega la fuente i, las siguientes ya se van acumulando en memoria.
+
+    Con dedupe=True una canción que ya salió de una fuente anterior (mismo
+    ISRC o mismo artista/título canónicos y duración compatible) se omite.
+    Si una fuente falla se anota en el reporte y se sigue con las demás.
+    """
+    if report is None:
+        report = IngestReport()
+    results = [SourceResult(spec) for spec in specs]
+    report.sources = results
+    if not specs:
+        return
+
+    index = TrackIndex() if dedupe else None
+    queues: List[queue.Queue] = [queue.Queue() for _ in specs]
+    stop = threading.Event()
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=workers or len(specs), thread_name_prefix="ingest")
+    try:
+        for spec, result, out in zip(specs, results, queues):
+            executor.submit(_read_source, spec, result, out, stop, separator)
+
+        for result, out in zip(results, queues):
+            while True:
+                track = out.get()
+                if track is _DONE:
+                    break
+                if index is not None:
+                    before = len(index)
+                    index.add(track)
+                    if len(index) == before:
+                        report.duplicates += 1
+                        continue
+                result.unique += 1
+                yield track
+    finally:
+        #si el consumidor deja de leer antes de tiempo, los lectores se detienen
+        stop.set()
+        executor.shutdown(wait=False)
+        report.seconds = time.perf_counter() - start
+
+
+def merge_sources(
+        specs: Sequence[SourceSpec],
+        dedupe: bool = True,
+        workers: Optional[int] = None,
+        separator: str = DEFAULT_SEPARATOR
+) -> Tuple[List[Track], IngestReport]:
+    """Lee todas las fuentes a la vez; devuelve (canciones, reporte)"""
+    report = IngestReport()
+    tracks = list(iter_merged_sources(specs, dedupe=dedupe, workers=workers, separator=separator, report=report))
+    return tracks, report
@@ -0,0 +1,115 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+from models import Track
+from services.metrics import METRICS
+from services.normalization import track_key
+
+DEFAULT_CACHE_PATH = ".match_cache.sqlite3"
+#los aciertos casi nunca cambian, los fallos se reintentan más seguido
+DEFAULT_HIT_TTL = 30 * 24 * 3600
+DEFAULT_MISS_TTL = 24 * 3600
+
+
+def compact_item(item: dict) -> dict:
+    """Guarda solo los campos del resultado de Spotify que usa el clonador"""
+    return {
+        "id": item["id"],
+        "name": item.get("name", ""),
+        "artists": [{"name": a.get("name", "")} for a in item.get("artists") or []],
+        "duration_ms": item.get("duration_ms"),
+        "external_ids": item.get("external_ids") or {},
+    }
+
+
+class MatchCache:
+    """
+    Caché en disco (SQLite) de los resultados de search_track.
+
+    Guarda tanto aciertos (id del track + metadatos) como fallos, cada uno
+    con su propio TTL. La llave es artista/título/duración normalizados y
+    separada por destino, para no mezclar ids de distintas plataformas.
+    """
+
+    def __init__(
+            self,
+            path: str = DEFAULT_CACHE_PATH,
+            destination: str = "spotify",
+            hit_ttl: int = DEFAULT_HIT_TTL,
+            miss_ttl: int = DEFAULT_MISS_TTL,
+    ):
+        self.path = path
+        self.destination = destination
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS matches (
+                destination TEXT NOT NULL,
+                key TEXT NOT NULL,
+                track_id TEXT,
+                item TEXT,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (destination, key)
+            )
+            """
+        )
+
+    def get(self, track: Track) -> Tuple[bool, Optional[dict]]:
+        """
+        Busca un track en la caché.
+        Devuelve (encontrado_en_cache, item). item es None si lo guardado fue un fallo.
+        """
+        key = track_key(track)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT track_id, item, stored_at FROM matches WHERE destination = ? AND key = ?",
+                (self.destination, key),
+            ).fetchone()
+
+            if row is not None:
+                track_id, item, stored_at = row
+                ttl = self.hit_ttl if track_id else self.miss_ttl
+                if time.time() - stored_at <= ttl:
+                    self.hits += 1
+                    METRICS.inc("cache_requests_total", result="hit")
+                    return True, json.loads(item) if item else None
+
+            self.misses += 1
+            METRICS.inc("cache_requests_total", result="miss")
+            return False, None
+
+    def put(self, track: Track, item: Optional[dict]):
+        """Guarda el resultado de una búsqueda (item=None para un fallo)"""
+        compact = compact_item(item) if item else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO matches (destination, key, track_id, item, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    self.destination,
+                    track_key(track),
+                    compact["id"] if compact else None,
+                    json.dumps(compact) if compact else None,
+                    time.time(),
+                ),
+            )
+
+    def stats(self) -> dict:
+        """Contadores de aciertos/fallos de la caché en esta ejecución"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,209 @@
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from models import Track
+from services.match_cache import MatchCache, compact_item
+from services.metrics import METRICS
+from services.normalization import TrackIndex
+from services.rate_limiter import TokenBucket, get_limiter
+
+DEFAULT_WORKERS = 4
+#peticiones por segundo a la API de búsqueda de Spotify
+DEFAULT_RATE = 10.0
+#búsquedas en vuelo por hilo en el modo streaming (limita la memoria usada)
+IN_FLIGHT_PER_WORKER = 4
+
+STAGE_CACHE = "cache"
+#resuelta con el catálogo local de candidatos, sin llamar a la API
+STAGE_CATALOG = "catalogo"
+STAGE_NOT_FOUND = "no_encontrada"
+#canción repetida en la fuente: se reutiliza la búsqueda de la primera copia
+STAGE_DUPLICATE = "duplicada"
+#la búsqueda falló (sin respuesta de Spotify tras los reintentos): cuenta como no encontrada
+STAGE_ERROR = "error"
+
+
+class ResolveStats:
+    """Cuenta qué etapa resolvió cada canción y cuántas llamadas a la API se hicieron"""
+
+    def __init__(self):
+        self.tracks = 0
+        self.api_calls = 0
+        self.stages = Counter()
+
+    def record(self, stage: Optional[str], api_calls: int):
+        self.tracks += 1
+        self.api_calls += api_calls
+        self.stages[stage or STAGE_NOT_FOUND] += 1
+        METRICS.inc("tracks_resolved_total", stage=stage or STAGE_NOT_FOUND)
+        METRICS.inc("search_api_calls_total", api_calls)
+
+    def merge(self, other: "ResolveStats"):
+        """Suma las estadísticas de otra búsqueda (p. ej. de un proceso del modo multi-proceso)"""
+        self.tracks += other.tracks
+        self.api_calls += other.api_calls
+        self.stages.update(other.stages)
+        for stage, count in other.stages.items():
+            METRICS.inc("tracks_resolved_total", count, stage=stage)
+        METRICS.inc("search_api_calls_total", other.api_calls)
+
+    def calls_per_track(self) -> float:
+        return self.api_calls / self.tracks if self.tracks else 0.0
+
+    def share(self, stage: str) -> float:
+        """Fracción de canciones resueltas por una etapa"""
+        return self.stages[stage] / self.tracks if self.tracks else 0.0
+
+    def summary(self) -> str:
+        from services.spotify_service import STAGE_ISRC
+
+        stages = ", ".join(f"{stage}={count}" for stage, count in self.stages.most_common())
+        return (
+            f"{self.api_calls} llamadas ({self.calls_per_track():.2f} por canción) | "
+            f"por ISRC: {self.share(STAGE_ISRC):.0%} | etapas: {stages}"
+        )
+
+
+def stream_resolve(
+        sp,
+        tracks: Iterable[Track],
+        workers: int = DEFAULT_WORKERS,
+        limiter: Optional[TokenBucket] = None,
+        cache: Optional[MatchCache] = None,
+        max_in_flight: Optional[int] = None,
+        stats: Optional[ResolveStats] = None,
+        dedupe: bool = True,
+        catalog=None,
+) -> Iterator[Tuple[Track, Optional[dict]]]:
+    """
+    Busca en Spotify las canciones de un iterable (que puede ir llegando poco
+    a poco) y devuelve pares (Track, item o None) en el orden de entrada.
+
+    Nunca hay más de max_in_flight búsquedas pendientes, así que la memoria
+    no depende del tamaño de la playlist.
+    Si se pasa stats, ahí se registra la etapa que resolvió cada canción.
+
+    Con dedupe=True las copias de una misma canción (ver TrackIndex) no se
+    vuelven a buscar: reciben el resultado de la primera. El índice y los
+    resultados compactos crecen con el número de canciones distintas.
+
+    Con un catálogo (ver CatalogIndex) lo que no está en la caché se busca
+    primero ahí; solo sin un candidato confiable se llama a la API, y los
+    candidatos que ésta devuelve se agregan al catálogo.
+
+    Si la búsqueda de una canción falla aun con los reintentos (Spotify no
+    responde), la canción sale con item None y etapa STAGE_ERROR.
+    """
+    #spotipy se importa hasta que de verdad se va a buscar (arranque rápido del CLI)
+    from services.spotify_service import SEARCH_ERRORS, search_track_with_stage
+
+    if limiter is None:
+        limiter = get_limiter("spotify")
+    workers = max(1, workers)
+    if max_in_flight is None:
+        max_in_flight = workers * IN_FLIGHT_PER_WORKER
+
+    def _resolve(song: Track) -> Tuple[Optional[dict], Optional[str], int]:
+        if cache:
+            cached, item = cache.get(song)
+            if cached:
+                return item, STAGE_CACHE if item else None, 0
+
+        item = catalog.lookup(song) if catalog is not None else None
+        if item:
+            if cache:
+                cache.put(song, item)
+            return item, STAGE_CATALOG, 0
+
+        try:
+            item, stage, api_calls = search_track_with_stage(
+                sp, song.artist, song.title, song.duration_ms, limiter=limiter, isrc=song.isrc, catalog=catalog
+            )
+        except SEARCH_ERRORS as e:
+            #una búsqueda que falla no detiene la corrida ni se guarda en la caché
+            print(f"\nError buscando {song}: {e}")
+            return None, STAGE_ERROR, 0
+
+        if cache:
+            cache.put(song, item)
+        return item, stage, api_calls
+
+    def _collect(song: Track, future, group: Optional[int]) -> Tuple[Track, Optional[dict]]:
+        if future is None:
+            #copia de una canción que ya se buscó
+            item = resolved[group]
+            if stats:
+                stats.record(STAGE_DUPLICATE if item else None, 0)
+            return song, item
+
+        item, stage, api_calls = future.result()
+        if group is not None:
+            #para las copias basta con los campos que guarda la caché
+            resolved[group] = compact_item(item) if item else None
+        if stats:
+            stats.record(stage, api_calls)
+        return song, item
+
+    index = TrackIndex() if dedupe else None
+    resolved = [] #resultado de cada grupo del índice
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for song in tracks:
+            group = index.add(song) if index is not None else None
+            if group is not None and group < len(resolved):
+                pending.append((song, None, group))
+            else:
+                if group is not None:
+                    resolved.append(None)
+                pending.append((song, executor.submit(_resolve, song), group))
+            #si la cola está llena se entrega el más antiguo antes de seguir leyendo
+            if len(pending) >= max_in_flight:
+                yield _collect(*pending.popleft())
+
+        while pending:
+            yield _collect(*pending.popleft())
+
+
+def resolve_tracks(
+        sp,
+        tracks: Sequence[Track],
+        workers: int = DEFAULT_WORKERS,
+        limiter: Optional[TokenBucket] = None,
+        cache: Optional[MatchCache] = None,
+        stats: Optional[ResolveStats] = None,
+        on_result: Optional[Callable[[int, Track, Optional[dict]], None]] = None,
+        catalog=None,
+) -> Tuple[List[str], List[Track]]:
+    """
+    Busca todas las canciones en Spotify usando varios hilos.
+
+    Todos los hilos comparten el mismo token bucket, así que un 429 pausa
+    a todos. Los resultados se imprimen y devuelven en el mismo orden que
+    la lista original, igual que en la búsqueda de una en una.
+
+    Si se pasa una caché, primero se consulta ahí y solo se busca en
+    Spotify lo que no esté guardado (o ya haya expirado). Con catalog,
+    antes de la API se busca en el catálogo local (ver stream_resolve).
+
+    on_result(i, canción, item) se llama con cada resultado, en orden
+    (por ejemplo para guardarlo en un journal).
+
+    Devuelve (ids encontrados, canciones no encontradas)
+    """
+    found_track_ids = []
+    not_found = []
+    total = len(tracks)
+
+    results = stream_resolve(sp, tracks, workers=workers, limiter=limiter, cache=cache, stats=stats, catalog=catalog)
+    for idx, (song, track) in enumerate(results, start=1):
+        print(f"[{idx}/{total}] Buscando: {song}...", end=" ", flush=True)
+        if on_result:
+            on_result(idx - 1, song, track)
+        if track:
+            found_track_ids.append(track["id"])
+            print("✅")
+        else:
+            not_found.append(song)
+            print("❌")
+
+    return found_track_ids, not_found
@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+#prefijo de todas las métricas exportadas
+PREFIX = "playlist_cloner"
+#límites (en segundos) de los histogramas de latencia
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+#(nombre, etiquetas ordenadas)
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: dict) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """Histograma acumulativo al estilo Prometheus (conteo por límite superior)"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "max")
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) #el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Aproximación del cuantil q (límite superior del bucket que lo contiene)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 6),
+            "buckets": {str(b): c for b, c in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class Metrics:
+    """
+    Registro de métricas del proceso: contadores e histogramas con etiquetas.
+
+    Es seguro entre hilos y barato de llamar desde el código caliente
+    (un lock y una búsqueda en diccionario). Al final de la corrida se
+    exporta a JSON o al formato textfile de Prometheus.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._counters: Dict[MetricKey, float] = {}
+        self._histograms: Dict[MetricKey, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Suma value al contador name{labels}"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        """Registra una duración en el histograma name{labels}"""
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Mide lo que tarda el bloque `with` (también si lanza una excepción)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get(_key(name, labels))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> dict:
+        """Todas las métricas como diccionario serializable a JSON"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.to_dict()}
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {
+            "started": self.started,
+            "elapsed_seconds": round(time.time() - self.started, 3),
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+    def to_prometheus(self) -> str:
+        """Formato de exposición de texto de Prometheus (node_exporter textfile)"""
+        def _fmt_labels(labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{PREFIX}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{_fmt_labels(labels)} {value:g}")
+
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                metric = f"{PREFIX}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{metric}_bucket{_fmt_labels(labels, (('le', le),))} {cumulative}")
+                lines.append(f"{metric}_sum{_fmt_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{_fmt_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Resumen corto para imprimir al final: tiempo por endpoint y contadores"""
+        with self._lock:
+            histograms = sorted(self._histograms.items(), key=lambda kv: kv[1].sum, reverse=True)
+            counters = sorted(self._counters.items())
+        lines = []
+        for (name, labels), h in histograms:
+            tag = ",".join(f"{k}={v}" for k, v in labels)
+            lines.append(
+                f"   {name}{{{tag}}}: {h.count} x {h.sum / h.count * 1000:.1f} ms "
+                f"(p95 ≤ {h.quantile(0.95) * 1000:.0f} ms, total {h.sum:.2f} s)"
+            )
+        for (name, labels), value in counters:
+            tag = ",".join(f"{k}={v}" for k, v in labels)
+            lines.append(f"   {name}{{{tag}}}: {value:g}")
+        return "\n".join(lines)
+
+
+def _write_atomic(path: str, text: str):
+    """Escribe a un archivo temporal y lo renombra, para no dejar archivos a medias"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_json(path: str, metrics: Optional[Metrics] = None):
+    _write_atomic(path, json.dumps((metrics or METRICS).snapshot(), indent=2, ensure_ascii=False))
+
+
+def write_prometheus(path: str, metrics: Optional[Metrics] = None):
+    _write_atomic(path, (metrics or METRICS).to_prometheus())
+
+
+#registro compartido por todos los servicios del proceso
+METRICS = Metrics()
@@ -0,0 +1,145 @@
+import hashlib
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from models import Track
+
+_SPACES = re.compile(r"\s+")
+_NON_ALNUM = re.compile(r"[^\w\s]|_")
+#"(feat. X)", "[ft. X]" o " feat. X" hasta el final
+_FEAT = re.compile(r"\s*[\(\[]\s*(?:feat|ft|featuring)\b[^\)\]]*[\)\]]|\s+(?:feat|ft|featuring)\b\.?.*$", re.IGNORECASE)
+#"(Remastered 2009)", "[2011 Remaster]", " - Remastered Version", " - 2015 Remaster"
+_REMASTER = re.compile(
+    r"\s*[\(\[][^\)\]]*\bremaster(?:ed)?\b[^\)\]]*[\)\]]|\s+-\s+[^-]*\bremaster(?:ed)?\b.*$",
+    re.IGNORECASE,
+)
+
+#ancho de los rangos de duración usados en las llaves (10 segundos)
+DURATION_BUCKET_MS = 10_000
+#diferencia máxima de duración para considerar dos canciones la misma
+DUPLICATE_DURATION_MS = 5_000
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Pasa a minúsculas y colapsa espacios, para comparar textos de distintas fuentes"""
+    if not text:
+        return ""
+    return _SPACES.sub(" ", text).strip().lower()
+
+
+def duration_bucket(duration_ms: Optional[int]) -> int:
+    """Agrupa la duración en rangos de 10 segundos (-1 si no se conoce)"""
+    if not duration_ms:
+        return -1
+    return int(duration_ms) // DURATION_BUCKET_MS
+
+
+def track_key(track: Track) -> str:
+    """Llave normalizada artista/título/duración de un Track"""
+    return "|".join((
+        normalize_text(track.artist),
+        normalize_text(track.title),
+        str(duration_bucket(track.duration_ms)),
+    ))
+
+
+def strip_accents(text: str) -> str:
+    """"Canción" → "Cancion" """
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+@lru_cache(maxsize=65536)
+def canonical_text(text: Optional[str]) -> str:
+    """Minúsculas, sin acentos ni signos de puntuación y con espacios colapsados"""
+    if not text:
+        return ""
+    text = _NON_ALNUM.sub(" ", strip_accents(text).casefold())
+    return _SPACES.sub(" ", text).strip()
+
+
+@lru_cache(maxsize=65536)
+def canonical_artist(artist: Optional[str]) -> str:
+    """Artista sin los invitados ("feat. X")"""
+    return canonical_text(_FEAT.sub("", artist or ""))
+
+
+@lru_cache(maxsize=65536)
+def canonical_title(title: Optional[str]) -> str:
+    """
+    Título sin invitados ni sufijos de remasterización. Las versiones en vivo,
+    remixes, etc. se dejan: son otras grabaciones y se buscan por separado.
+    """
+    title = _REMASTER.sub("", title or "")
+    return canonical_text(_FEAT.sub("", title))
+
+
+def dedupe_key(track: Track) -> bytes:
+    """
+    Llave de 8 bytes (hash) de artista/título canónicos. Dos Tracks con la
+    misma llave son la misma canción salvo que su duración no coincida.
+    """
+    text = f"{canonical_artist(track.artist)}|{canonical_title(track.title)}"
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def _same_duration(a: Optional[int], b: Optional[int]) -> bool:
+    return not a or not b or abs(a - b) <= DUPLICATE_DURATION_MS
+
+
+class TrackIndex:
+    """
+    Índice de canciones distintas de una lista de Tracks.
+
+    Cada Track que se agrega se asigna a un grupo: el del primer Track igual
+    (mismo ISRC, o mismo artista/título canónicos y duración compatible) o
+    uno nuevo. Así solo se busca una vez cada canción distinta y luego el
+    resultado se reparte a todas sus copias con fan_out.
+    """
+
+    def __init__(self):
+        self.representatives: List[Track] = [] #primer Track de cada grupo
+        self.groups: List[int] = [] #grupo de cada Track agregado, en orden
+        self._by_key: Dict[bytes, List[int]] = {}
+        self._by_isrc: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """Número de canciones distintas"""
+        return len(self.representatives)
+
+    @property
+    def duplicates(self) -> int:
+        return len(self.groups) - len(self.representatives)
+
+    def _find(self, track: Track, key: bytes) -> Optional[int]:
+        if track.isrc:
+            group = self._by_isrc.get(track.isrc.upper())
+            if group is not None:
+                return group
+        for group in self._by_key.get(key, ()):
+            if _same_duration(self.representatives[group].duration_ms, track.duration_ms):
+                return group
+        return None
+
+    def add(self, track: Track) -> int:
+        """Agrega un Track y devuelve su grupo"""
+        key = dedupe_key(track)
+        group = self._find(track, key)
+        if group is None:
+            group = len(self.representatives)
+            self.representatives.append(track)
+            self._by_key.setdefault(key, []).append(group)
+
+        if track.isrc:
+            self._by_isrc.setdefault(track.isrc.upper(), group)
+        self.groups.append(group)
+        return group
+
+    def extend(self, tracks: Iterable[Track]):
+        for track in tracks:
+            self.add(track)
+
+    def fan_out(self, results: List) -> List:
+        """results[g] es el resultado del grupo g; devuelve uno por Track agregado, en orden"""
+        return [results[group] for group in self.groups]
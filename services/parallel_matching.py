@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+from models import Track
+from services.catalog_index import CatalogIndex
+from services.client_registry import REGISTRY, get_client
+from services.match_cache import MatchCache, compact_item
+from services.matching_service import (
+    stream_resolve,
+    ResolveStats,
+    DEFAULT_WORKERS,
+    DEFAULT_RATE,
+    STAGE_DUPLICATE
+)
+from services.normalization import TrackIndex
+from services.rate_limiter import get_limiter
+
+#canciones distintas por tarea: tareas chicas reparten mejor la carga entre
+#procesos, tareas grandes pagan menos envío de datos entre procesos
+SHARD_SIZE = 500
+#parte de --rate que se queda el proceso principal (escritura de lotes,
+#consultas del total) cuando la búsqueda corre en otros procesos
+MAIN_RATE_SHARE = 0.1
+
+#estado de cada proceso del pool (cliente, limiter y caché propios)
+_worker: dict = {}
+
+
+def split_rate(rate: float) -> Tuple[float, float]:
+    """
+    Reparte --rate entre el proceso principal y los de búsqueda: devuelve
+    (rate del principal, rate total de los procesos de búsqueda). La suma
+    es rate.
+    """
+    main_rate = rate * MAIN_RATE_SHARE
+    return main_rate, rate - main_rate
+
+
+def _init_worker(
+        client_factory: Callable[[], object],
+        rate: float,
+        workers: int,
+        cache_path: Optional[str],
+        catalog_path: Optional[str]
+):
+    REGISTRY.register("spotify", client_factory)
+    _worker["sp"] = get_client("spotify")
+    #cada proceso tiene su propio limiter adaptativo con su parte del rate
+    _worker["limiter"] = get_limiter("spotify", rate)
+    _worker["workers"] = workers
+    #SQLite en modo WAL admite varios procesos sobre el mismo archivo
+    _worker["cache"] = MatchCache(cache_path) if cache_path else None
+    _worker["catalog"] = CatalogIndex(catalog_path) if catalog_path else None
+
+
+def _resolve_shard(shard: List[Track]) -> Tuple[List[Optional[dict]], ResolveStats]:
+    """Busca y califica un bloque de canciones distintas dentro de un proceso del pool"""
+    stats = ResolveStats()
+    results = stream_resolve(
+        _worker["sp"],
+        shard,
+        workers=_worker["workers"],
+        limiter=_worker["limiter"],
+        cache=_worker["cache"],
+        stats=stats,
+        dedupe=False,
+        catalog=_worker["catalog"]
+    )
+    #solo viajan de vuelta los campos que usa el clonador
+    items = [compact_item(item) if item else None for _, item in results]
+    return items, stats
+
+
+def resolve_tracks_parallel(
+        tracks: Sequence[Track],
+        processes: Optional[int] = None,
+        workers: int = DEFAULT_WORKERS,
+        rate: float = DEFAULT_RATE,
+        cache_path: Optional[str] = None,
+        catalog_path: Optional[str] = None,
+        stats: Optional[ResolveStats] = None,
+        on_result: Optional[Callable[[int, Track, Optional[dict]], None]] = None,
+        shard_size: int = SHARD_SIZE,
+) -> Tuple[List[str], List[Track]]:
+    """
+    Igual que resolve_tracks, pero reparte la búsqueda entre varios procesos.
+
+    Con la red en caché (o muy rápida) lo que queda es calificar candidatos
+    con fuzzy matching, que en un solo proceso está limitado por el GIL.
+    Aquí las canciones distintas (ver TrackIndex) se parten en bloques de
+    shard_size; cada proceso busca y califica sus bloques con su propio
+    cliente de Spotify (creado con la misma fábrica del registro de
+    clientes), sus propias conexiones a la caché y al catálogo, y workers
+    hilos. rate es el límite de todos los procesos juntos y se reparte
+    por igual entre ellos; lo que use el proceso principal (p. ej. el
+    PlaylistWriter) debe quedar fuera (ver split_rate).
+
+    Los bloques se recogen en orden, así que on_result(i, canción, item) y
+    el resultado salen en el mismo orden que la fuente, igual que en
+    resolve_tracks. Los procesos se crean con "spawn": no heredan sockets
+    ni hilos del proceso principal.
+
+    Devuelve (ids encontrados, canciones no encontradas)
+    """
+    processes = max(1, processes or os.cpu_count() or 1)
+    index = TrackIndex()
+    index.extend(tracks)
+    unique = index.representatives
+    shards = [unique[i:i + shard_size] for i in range(0, len(unique), shard_size)]
+
+    found_track_ids = []
+    not_found = []
+    resolved: List[Optional[dict]] = [] #resultado de cada grupo del índice
+    cursor = 0 #siguiente canción de la fuente por entregar
+    first_seen = 0 #grupos ya entregados al menos una vez
+
+    def _emit(idx: int):
+        nonlocal first_seen
+        song = tracks[idx]
+        group = index.groups[idx]
+        item = resolved[group]
+        if group < first_seen:
+            #copia de una canción que ya salió: se reutiliza su resultado
+            if stats:
+                stats.record(STAGE_DUPLICATE if item else None, 0)
+        else:
+            first_seen += 1
+        if on_result:
+            on_result(idx, song, item)
+        if item:
+            found_track_ids.append(item["id"])
+        else:
+            not_found.append(song)
+
+    print(f"→ {len(unique)} canciones distintas en {len(shards)} bloques, {processes} procesos")
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(REGISTRY.factory("spotify"), rate / processes, workers, cache_path, catalog_path)
+    ) as executor:
+        for items, shard_stats in executor.map(_resolve_shard, shards):
+            resolved.extend(items)
+            if stats:
+                stats.merge(shard_stats)
+            #se entregan, en el orden de la fuente, las canciones cuyo grupo ya se resolvió
+            while cursor < len(tracks) and index.groups[cursor] < len(resolved):
+                _emit(cursor)
+                cursor += 1
+            print(f"[{len(resolved)}/{len(unique)}] canciones distintas buscadas")
+
+    return found_track_ids, not_found
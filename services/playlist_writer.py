@@ -0,0 +1,229 @@
+import random
+import threading
+import time
+from typing import Callable, List, Optional
+from services.metrics import METRICS
+
+#máximo de ids por petición (límite de Spotify; también sirve para otros destinos)
+MAX_BATCH_SIZE = 100
+#tamaño mínimo al que se reduce el lote cuando el destino falla
+MIN_BATCH_SIZE = 10
+MAX_RETRIES = 5
+#espera base del backoff exponencial (segundos); se le suma jitter
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+#si hay ids esperando más de esto, se manda un lote aunque no esté lleno
+MAX_DELAY = 1.0
+
+#send(ids, position): agrega los ids en esa posición de la playlist
+SendFn = Callable[[List[str], int], None]
+#retry_delay(error): segundos a esperar (0 = usar backoff) o None si no se debe reintentar
+RetryDelayFn = Callable[[Exception], Optional[float]]
+
+
+class BatchFailedError(RuntimeError):
+    """Un lote no se pudo agregar después de todos los reintentos"""
+
+
+class PlaylistWriter:
+    """
+    Escribe ids en una playlist en un hilo aparte, mientras el resto del
+    flujo sigue buscando canciones.
+
+    - Los ids se agregan con add() en el orden final de la playlist. Cada
+      lote se manda con su posición explícita, así que el orden se conserva
+      aunque un lote se reintente.
+    - El tamaño del lote se adapta: se manda lo que haya acumulado (hasta
+      100) y, si el destino falla, se parte a la mitad; tras varios lotes
+      buenos vuelve a crecer.
+    - Antes de reintentar se consulta el total de la playlist (get_total): si
+      el lote sí llegó (p. ej. se perdió la respuesta) no se vuelve a mandar,
+      así que no se duplican canciones.
+    - Se manda un lote a la vez; no hay escrituras en paralelo. Una
+      inserción en la posición N requiere que las anteriores ya existan, y
+      tanto la comprobación con get_total como on_commit suponen que lo
+      escrito es un prefijo de la lista. Una playlist de 10k canciones son
+      ~100 peticiones seguidas: lo que se gana es que corren al mismo
+      tiempo que la búsqueda, no que se manden varias a la vez.
+
+    on_commit(posición) se llama tras cada lote confirmado con cuántos
+    elementos tiene ya la playlist (p. ej. para el journal de checkpoint).
+    """
+
+    def __init__(
+            self,
+            send: SendFn,
+            get_total: Optional[Callable[[], int]] = None,
+            start: Optional[int] = None,
+            retry_delay: Optional[RetryDelayFn] = None,
+            on_commit: Optional[Callable[[int], None]] = None,
+            limiter=None,
+            destination: str = "spotify",
+            max_batch_size: int = MAX_BATCH_SIZE,
+            max_retries: int = MAX_RETRIES,
+            max_delay: float = MAX_DELAY,
+    ):
+        self.send = send
+        self.get_total = get_total
+        self.retry_delay = retry_delay or (lambda error: None)
+        self.on_commit = on_commit
+        self.limiter = limiter
+        self.destination = destination
+        self.max_batch_size = max_batch_size
+        self.batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.max_delay = max_delay
+        #posición donde va el siguiente lote (None: se pregunta al destino)
+        self.position = start
+
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.latencies: List[float] = []
+
+        self._pending: List[str] = []
+        self._oldest = 0.0 #cuándo llegó el id más antiguo de _pending
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="playlist-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, track_id: str):
+        self.extend((track_id,))
+
+    def extend(self, track_ids):
+        with self._cond:
+            self._raise_if_failed()
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.extend(track_ids)
+            self._cond.notify()
+
+    def close(self):
+        """Espera a que se escriba todo lo pendiente; relanza el error si un lote falló"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._raise_if_failed()
+
+    def __enter__(self) -> "PlaylistWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            #si el flujo falló se escribe lo que ya estaba en cola, sin tapar el error original
+            with self._cond:
+                self._closed = True
+                self._cond.notify()
+            self._thread.join()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise BatchFailedError(f"No se pudo escribir en la playlist: {self._error}") from self._error
+
+    def _next_batch(self) -> Optional[List[str]]:
+        """Espera hasta tener un lote listo; None cuando ya no hay nada más"""
+        with self._cond:
+            while True:
+                if len(self._pending) >= self.batch_size or (self._closed and self._pending):
+                    break
+                if self._closed:
+                    return None
+                if self._pending:
+                    #lote incompleto: se espera un poco a que se llene
+                    wait = self._oldest + self.max_delay - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            batch = self._pending[:self.batch_size]
+            del self._pending[:len(batch)]
+            if self._pending:
+                self._oldest = time.monotonic()
+            return batch
+
+    def _run(self):
+        try:
+            if self.position is None:
+                self.position = self.get_total() if self.get_total else 0
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                #si el lote se partió por errores, lo que sobra vuelve al frente de la cola
+                sent = self._write(batch)
+                if sent < len(batch):
+                    with self._cond:
+                        self._pending[:0] = batch[sent:]
+        except BaseException as e:
+            self._error = e
+
+    def _already_written(self, position: int, size: int) -> bool:
+        """¿El lote llegó aunque la petición haya fallado?"""
+        if not self.get_total:
+            return False
+        try:
+            return self.get_total() >= position + size
+        except Exception:
+            return False
+
+    def _write(self, batch: List[str]) -> int:
+        """Manda un lote (o su primera parte si hay que reducirlo); devuelve cuántos ids se escribieron"""
+        attempt = 0
+        while True:
+            chunk = batch[:self.batch_size]
+            if self.limiter:
+                self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                self.send(chunk, self.position)
+            except Exception as error:
+                delay = self.retry_delay(error)
+                if self.limiter and delay is not None:
+                    #el limiter adaptativo baja el rate ante 429/5xx (ver AdaptiveRateLimiter)
+                    self.limiter.record_failure(throttled=delay > 0)
+                if delay is None or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                METRICS.inc("api_retries_total", service=self.destination, endpoint="playlist_add_items")
+                if self._already_written(self.position, len(chunk)):
+                    self._commit(chunk, time.perf_counter() - start)
+                    return len(chunk)
+                #el destino no aguanta este tamaño o está saturado: lotes más chicos
+                self.batch_size = max(MIN_BATCH_SIZE, self.batch_size // 2)
+                backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1))
+                time.sleep(max(delay, backoff * random.uniform(0.5, 1.5)))
+                continue
+
+            if self.limiter:
+                self.limiter.record_success()
+            self._commit(chunk, time.perf_counter() - start)
+            #tras un lote bueno el tamaño vuelve a crecer poco a poco
+            self.batch_size = min(self.max_batch_size, self.batch_size + MIN_BATCH_SIZE)
+            return len(chunk)
+
+    def _commit(self, chunk: List[str], latency: float):
+        self.position += len(chunk)
+        self.written += len(chunk)
+        self.batches += 1
+        self.latencies.append(latency)
+        METRICS.observe("playlist_batch_seconds", latency, destination=self.destination)
+        METRICS.inc("tracks_written_total", len(chunk), destination=self.destination)
+        if self.on_commit:
+            self.on_commit(self.position)
+
+    def summary(self) -> str:
+        if not self.latencies:
+            return "sin lotes"
+        ordered = sorted(self.latencies)
+        p50 = ordered[len(ordered) // 2]
+        return (
+            f"{self.written} canciones en {self.batches} lotes | latencia por lote: "
+            f"p50 {p50 * 1000:.0f} ms, máx {ordered[-1] * 1000:.0f} ms | reintentos: {self.retries}"
+        )
@@ -0,0 +1,316 @@
+import random
+import threading
+import time
+from typing import Callable, Dict, Mapping, Optional, TypeVar
+from services.metrics import METRICS
+
+T = TypeVar("T")
+
+#peticiones por segundo (máximas) de cada servicio si no se configura otra cosa;
+#Deezer permite 50 peticiones cada 5 s, YouTube Music no publica límite
+DEFAULT_RATES = {"spotify": 10.0, "deezer": 10.0, "youtube": 5.0}
+#por debajo de esto el AIMD ya no baja el rate
+MIN_RATE = 0.5
+#AIMD: peticiones/s que se suman por cada segundo de respuestas buenas...
+ADDITIVE_INCREASE = 1.0
+#...y factor que se aplica ante un 429/5xx
+MULTIPLICATIVE_DECREASE = 0.5
+#los errores de las peticiones que ya estaban en vuelo cuando llegó el
+#primero no vuelven a bajar el rate
+DECREASE_COOLDOWN = 1.0
+#reintentos ante 429/5xx/errores de red antes de rendirse
+MAX_RETRIES = 3
+#backoff exponencial con jitter completo (segundos)
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+#fallos seguidos que abren el circuito y segundos que se queda abierto
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+#segundos que una petición espera a que el circuito se cierre antes de rendirse
+CIRCUIT_MAX_WAIT = 2 * RESET_TIMEOUT
+#con el circuito medio abierto (otro hilo manda la prueba) se vuelve a consultar cada tanto
+CIRCUIT_POLL = 0.5
+
+#retry_delay(error): segundos que pidió esperar el servicio (429 / cuota), 0 si
+#el error se reintenta con backoff (5xx, red) o None si no se reintenta
+RetryDelayFn = Callable[[Exception], Optional[float]]
+
+
+class CircuitOpenError(RuntimeError):
+    """El servicio falló demasiadas veces seguidas: no se le mandan peticiones por un rato"""
+
+    def __init__(self, service: str, retry_in: float):
+        super().__init__(f"{service} no responde (circuito abierto, se reintenta en {retry_in:.0f} s)")
+        self.service = service
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    """
+    Token bucket compartido entre hilos.
+
+    Limita cuántas peticiones por segundo se mandan a una API y permite
+    pausar a todos los hilos cuando la API responde 429 con `Retry-After`.
+    El rate es fijo: record_success/record_failure no hacen nada (ver
+    AdaptiveRateLimiter).
+    """
+
+    def __init__(self, rate: float = 10.0, capacity: Optional[int] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        self._last = now
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+
+    def try_acquire(self) -> float:
+        """Toma un token si hay; si no, devuelve cuántos segundos esperar antes de volver a intentar"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible (y no haya pausa activa)"""
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Detiene a todos los hilos durante `seconds` (p. ej. tras un 429)"""
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            #al reanudar no se manda una ráfaga completa
+            self._tokens = 0
+            self._last = self._blocked_until
+
+    def check_circuit(self):
+        """Lanza CircuitOpenError si no se deben mandar peticiones (nunca, en el bucket fijo)"""
+
+    def record_success(self):
+        """La petición tuvo respuesta (no 429/5xx)"""
+
+    def record_failure(self, throttled: bool = False):
+        """La petición falló con 429 (throttled) o con 5xx / error de red"""
+
+
+class AdaptiveRateLimiter(TokenBucket):
+    """
+    Token bucket de un servicio que ajusta su rate con AIMD y corta el
+    tráfico con un circuit breaker.
+
+    - AIMD: cada respuesta buena sube el rate un poco (ADDITIVE_INCREASE
+      peticiones/s por cada segundo de tráfico, hasta max_rate); un 429/5xx
+      lo multiplica por MULTIPLICATIVE_DECREASE. Así se busca el rate más
+      alto que el servicio aguanta en lugar de alternar entre ráfagas
+      bloqueadas y esperas largas.
+    - Circuit breaker: tras failure_threshold fallos seguidos (5xx o
+      errores de red; los 429 ya pausan con Retry-After) ya no se mandan
+      peticiones durante reset_timeout segundos: check_circuit lanza
+      CircuitOpenError y call_with_retries espera a que se cierre. Después
+      pasa una sola petición de prueba y, si responde, se cierra.
+
+    Una instancia por servicio y proceso (ver get_limiter): todos los hilos
+    y clientes de ese servicio comparten el mismo presupuesto.
+    """
+
+    def __init__(
+            self,
+            service: str,
+            rate: float,
+            min_rate: float = MIN_RATE,
+            failure_threshold: int = FAILURE_THRESHOLD,
+            reset_timeout: float = RESET_TIMEOUT,
+    ):
+        super().__init__(rate)
+        self.service = service
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._last_decrease = 0.0
+        self._failures = 0 #fallos seguidos
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    def configure(self, max_rate: float):
+        """Cambia el rate máximo (p. ej. el de --rate); se empieza desde ahí"""
+        with self._lock:
+            self.max_rate = max_rate
+            self.min_rate = min(self.min_rate, max_rate)
+            self.rate = max_rate
+            self.capacity = max(1, int(max_rate))
+
+    def check_circuit(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(self.service, max(remaining, 0.0))
+            #medio abierto: pasa solo esta petición
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._opened_at is not None:
+                self._opened_at = None
+                print(f"→ {self.service} volvió a responder (circuito cerrado)")
+            self.rate = min(self.max_rate, self.rate + ADDITIVE_INCREASE / self.rate)
+
+    def record_failure(self, throttled: bool = False):
+        with self._lock:
+            now = time.monotonic()
+            if not throttled:
+                self._failures += 1
+            if self._probing or (not throttled and self._failures == self.failure_threshold):
+                METRICS.inc("circuit_open_total", service=self.service)
+                print(f"⚠️  {self.service} falló {self._failures} veces seguidas: pausa de {self.reset_timeout:.0f} s")
+                self._opened_at = now
+                self._probing = False
+            if now - self._last_decrease >= DECREASE_COOLDOWN:
+                self._last_decrease = now
+                self.rate = max(self.min_rate, self.rate * MULTIPLICATIVE_DECREASE)
+                METRICS.inc("rate_decreases_total", service=self.service)
+
+
+class RateLimiterRegistry:
+    """Un AdaptiveRateLimiter por servicio, creado la primera vez que se pide"""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        self._rates: Dict[str, float] = dict(rates or {})
+        self._limiters: Dict[str, AdaptiveRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, service: str, rate: Optional[float] = None) -> AdaptiveRateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(service)
+            if limiter is None:
+                if not rate and service not in self._rates:
+                    raise KeyError(f"Servicio desconocido: {service}")
+                limiter = self._limiters[service] = AdaptiveRateLimiter(service, rate or self._rates[service])
+                return limiter
+        if rate and rate != limiter.max_rate:
+            limiter.configure(rate)
+        return limiter
+
+
+#limiters compartidos por todo el proceso
+RATE_LIMITS = RateLimiterRegistry(DEFAULT_RATES)
+
+
+def get_limiter(service: str, rate: Optional[float] = None) -> AdaptiveRateLimiter:
+    """
+    Limiter compartido de un servicio ("spotify", "deezer", "youtube").
+    Con rate se fija su rate máximo.
+    """
+    return RATE_LIMITS.get(service, rate)
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """Backoff exponencial con jitter completo: los hilos que fallaron juntos no reintentan juntos"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def circuit_delay(limiter: TokenBucket, deadline: float) -> float:
+    """
+    0 si el circuito deja pasar la petición; si no, segundos a esperar antes
+    de volver a consultar. Pasado deadline (time.monotonic) relanza
+    CircuitOpenError.
+    """
+    try:
+        limiter.check_circuit()
+        return 0.0
+    except CircuitOpenError as error:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise
+        return min(remaining, max(error.retry_in, CIRCUIT_POLL))
+
+
+def wait_for_circuit(limiter: TokenBucket, max_wait: float = CIRCUIT_MAX_WAIT):
+    """Espera (hasta max_wait segundos) a que el circuito del limiter se cierre"""
+    deadline = time.monotonic() + max_wait
+    delay = circuit_delay(limiter, deadline)
+    while delay > 0:
+        time.sleep(delay)
+        delay = circuit_delay(limiter, deadline)
+
+
+async def wait_for_circuit_async(limiter: TokenBucket, max_wait: float = CIRCUIT_MAX_WAIT):
+    """Igual que wait_for_circuit, sin bloquear el event loop"""
+    import asyncio
+
+    deadline = time.monotonic() + max_wait
+    delay = circuit_delay(limiter, deadline)
+    while delay > 0:
+        await asyncio.sleep(delay)
+        delay = circuit_delay(limiter, deadline)
+
+
+def call_with_retries(
+        limiter: TokenBucket,
+        func: Callable[[], T],
+        retry_delay: RetryDelayFn,
+        service: str,
+        endpoint: str,
+        max_retries: int = MAX_RETRIES,
+) -> T:
+    """
+    Llama func() respetando el limiter y reintentando los errores para los
+    que retry_delay no devuelve None.
+
+    Un Retry-After pausa a todos los hilos del limiter; sin él se espera un
+    backoff con jitter solo en este hilo. Cada resultado se le informa al
+    limiter (AIMD y circuit breaker); los errores que no se reintentan
+    (p. ej. un 404) cuentan como respuesta del servicio. Con el circuito
+    abierto se espera a que se cierre (ver wait_for_circuit); solo si sigue
+    abierto después de CIRCUIT_MAX_WAIT se lanza CircuitOpenError.
+    """
+    for attempt in range(max_retries + 1):
+        wait_for_circuit(limiter)
+        limiter.acquire()
+        try:
+            result = func()
+        except Exception as error:
+            delay = retry_delay(error)
+            if delay is None:
+                limiter.record_success()
+                raise
+            limiter.record_failure(throttled=delay > 0)
+            if attempt == max_retries:
+                raise
+            METRICS.inc("api_retries_total", service=service, endpoint=endpoint)
+            if delay > 0:
+                limiter.pause(delay)
+            else:
+                time.sleep(backoff_delay(attempt))
+            continue
+        limiter.record_success()
+        return result
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]], default: float = 1.0) -> float:
+    """Lee el header `Retry-After` (en segundos) de una respuesta 429"""
+    if not headers:
+        return default
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,148 @@
+import re
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    from rapidfuzz import process
+    from rapidfuzz.distance import Indel
+except ImportError:
+    process = None
+    Indel = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if Indel is None:
+    #respaldo: mucho más lento, pero da los mismos scores
+    from fuzzywuzzy import fuzz as fuzzywuzzy_fuzz
+else:
+    fuzzywuzzy_fuzz = None
+
+#mismos pesos que el fuzzy matching original
+ARTIST_WEIGHT = 0.6
+TITLE_WEIGHT = 0.4
+DURATION_PENALTY = 0.7
+DURATION_TOLERANCE_MS = 5000
+
+_NON_ALNUM = re.compile(r"(?ui)\W")
+#fuzzywuzzy (force_ascii) solo elimina el rango Latin-1 (128-255)
+_LATIN1 = dict.fromkeys(range(128, 256))
+
+#(artista, título, duración en ms)
+Query = Tuple[str, str, Optional[int]]
+
+
+@lru_cache(maxsize=65536)
+def normalize_for_scoring(text: str) -> str:
+    """
+    Mismo preprocesado que fuzzywuzzy (full_process con force_ascii):
+    quita caracteres Latin-1, cambia símbolos por espacios y pasa a minúsculas.
+    Se hace una sola vez por texto gracias a la caché.
+    """
+    if not text:
+        return ""
+    return _NON_ALNUM.sub(" ", text.lower().translate(_LATIN1)).lower().strip()
+
+
+def _candidate_fields(item: dict) -> Tuple[str, str, int]:
+    artist = item["artists"][0]["name"] if item.get("artists") else ""
+    return artist, item.get("name", ""), item.get("duration_ms", 0) or 0
+
+
+def _token_set_strings(a: str, b: str) -> Tuple[str, str, str]:
+    """Las tres cadenas que compara token_set_ratio: intersección e intersección + resto de cada lado"""
+    tokens_a = set(a.split())
+    tokens_b = set(b.split())
+    sect = " ".join(sorted(tokens_a & tokens_b))
+    combined_ab = (sect + " " + " ".join(sorted(tokens_a - tokens_b))).strip()
+    combined_ba = (sect + " " + " ".join(sorted(tokens_b - tokens_a))).strip()
+    return sect, combined_ab, combined_ba
+
+
+def _ratios(left: List[str], right: List[str]) -> List[int]:
+    """fuzz.ratio de cada par, calculado en bloque con rapidfuzz"""
+    if np is not None:
+        similarity = process.cpdist(
+            left, right, scorer=Indel.normalized_similarity, processor=None, dtype=np.float64
+        )
+        #100 * r igual que fuzzywuzzy, para redondear exactamente igual en los .5
+        return np.rint(similarity * 100).astype(int).tolist()
+    return [int(round(100 * Indel.normalized_similarity(a, b))) for a, b in zip(left, right)]
+
+
+def _pairwise_similarity(left: List[str], right: List[str]) -> List[int]:
+    """
+    token_set_ratio de fuzzywuzzy para cada par (left[i], right[i]),
+    con textos ya normalizados y el mismo redondeo a enteros.
+    """
+    if not left:
+        return []
+    if Indel is None:
+        return [fuzzywuzzy_fuzz.token_set_ratio(a, b, full_process=False) for a, b in zip(left, right)]
+
+    sects, combined_ab, combined_ba = [], [], []
+    for a, b in zip(left, right):
+        sect, ab, ba = _token_set_strings(a, b)
+        sects.append(sect)
+        combined_ab.append(ab)
+        combined_ba.append(ba)
+
+    first = _ratios(sects, combined_ab)
+    second = _ratios(sects, combined_ba)
+    third = _ratios(combined_ab, combined_ba)
+
+    return [
+        max(x, y, z) if a and b else 0 #fuzzywuzzy devuelve 0 si algún texto queda vacío
+        for x, y, z, a, b in zip(first, second, third, left, right)
+    ]
+
+
+def score_batch(queries: Sequence[Query], candidate_lists: Sequence[Sequence[dict]]) -> List[List[float]]:
+    """
+    Califica de una sola vez los candidatos de muchas canciones.
+
+    queries[i] es (artista, título, duración) de la canción buscada y
+    candidate_lists[i] sus candidatos de Spotify. Devuelve los scores (0-100)
+    con la misma fórmula de siempre: 60% artista, 40% título y x0.7 si la
+    duración difiere más de 5 segundos.
+    """
+    query_artists, query_titles, cand_artists, cand_titles = [], [], [], []
+    penalized = []
+
+    for (artist, title, duration_ms), candidates in zip(queries, candidate_lists):
+        artist = normalize_for_scoring(artist)
+        title = normalize_for_scoring(title)
+        for item in candidates:
+            item_artist, item_title, item_duration = _candidate_fields(item)
+            query_artists.append(artist)
+            query_titles.append(title)
+            cand_artists.append(normalize_for_scoring(item_artist))
+            cand_titles.append(normalize_for_scoring(item_title))
+            penalized.append(bool(duration_ms) and abs(item_duration - duration_ms) > DURATION_TOLERANCE_MS)
+
+    artist_scores = _pairwise_similarity(query_artists, cand_artists)
+    title_scores = _pairwise_similarity(query_titles, cand_titles)
+
+    if np is not None and artist_scores:
+        combined = np.asarray(artist_scores) * ARTIST_WEIGHT + np.asarray(title_scores) * TITLE_WEIGHT
+        combined = np.where(penalized, combined * DURATION_PENALTY, combined).tolist()
+    else:
+        combined = []
+        for a, t, p in zip(artist_scores, title_scores, penalized):
+            score = a * ARTIST_WEIGHT + t * TITLE_WEIGHT
+            combined.append(score * DURATION_PENALTY if p else score)
+
+    #se regresa a una lista por canción
+    results = []
+    offset = 0
+    for candidates in candidate_lists:
+        results.append(combined[offset:offset + len(candidates)])
+        offset += len(candidates)
+    return results
+
+
+def score_candidates(artist: str, title: str, duration_ms: Optional[int], candidates: Sequence[dict]) -> List[float]:
+    """Scores de los candidatos de una sola canción (ver score_batch)"""
+    return score_batch([(artist, title, duration_ms)], [candidates])[0]
@@ -1,11 +1,42 @@
 import os
-from typing import List, Tuple
-from dotenv import load_dotenv
+import threading
+import weakref
+from typing import Callable, Generator, List, NamedTuple, Optional, Tuple, TypeVar
+import requests
 import spotipy
+from spotipy.cache_handler import CacheFileHandler, CacheHandler
+from spotipy.exceptions import SpotifyException
 from spotipy.oauth2 import SpotifyOAuth
+from services.metrics import METRICS
+from services.playlist_writer import PlaylistWriter
+from services.rate_limiter import CircuitOpenError, TokenBucket, call_with_retries, get_limiter, retry_after_seconds
+from services.scoring import score_candidates, DURATION_TOLERANCE_MS
+
+T = TypeVar("T")
+
+#reintentos ante 429 antes de rendirse con una búsqueda
+MAX_RATE_LIMIT_RETRIES = 3
+#score (0-100) con el que se acepta un candidato sin más búsquedas
+CONFIDENT_SCORE = 85
+#score mínimo para aceptar un candidato del fuzzy matching
+MIN_SCORE = 60
+
+#etapas de búsqueda (para estadísticas)
+STAGE_ISRC = "isrc"
+STAGE_WIDE = "amplia"
+STAGE_STRICT = "estricta"
+STAGE_TITLE = "titulo"
+
+#máximo de canciones por llamada a playlist_add_items (limitación de la API)
+BATCH_SIZE = 100
+SERVER_ERRORS = (500, 502, 503, 504)
+#errores con los que una búsqueda se da por fallida después de los reintentos
+SEARCH_ERRORS = (SpotifyException, requests.RequestException, CircuitOpenError)
 
 def load_env():
     """cargar variables de entorno desde .env"""
+    from dotenv import load_dotenv
+
     load_dotenv()
     client_id = os.getenv("SPOTIFY_CLIENT_ID")
     client_secret = os.getenv("SPOTIFY_CLIENT_SECRET")
@@ -17,113 +48,361 @@ def load_env():
     
     return client_id, client_secret, redirect_uri, username
 
+class MemoryTokenCache(CacheHandler):
+    """
+    Guarda el token en memoria delante de otro CacheHandler (por defecto el
+    archivo .cache de spotipy). spotipy pide el token en cada petición; así
+    el archivo solo se lee una vez y solo se escribe cuando el token cambia.
+    """
+
+    def __init__(self, inner: Optional[CacheHandler] = None):
+        self.inner = inner or CacheFileHandler()
+        self._token: Optional[dict] = None
+        self._loaded = False
+
+    def get_cached_token(self) -> Optional[dict]:
+        if not self._loaded:
+            self._token = self.inner.get_cached_token()
+            self._loaded = True
+        return self._token
+
+    def save_token_to_cache(self, token_info: dict):
+        self._token = token_info
+        self._loaded = True
+        self.inner.save_token_to_cache(token_info)
+
+
+class SharedSpotifyOAuth(SpotifyOAuth):
+    """
+    SpotifyOAuth que se puede compartir entre hilos: si el token venció,
+    solo un hilo lo refresca y los demás esperan y usan el nuevo.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._token_lock = threading.Lock()
+
+    def get_access_token(self, *args, **kwargs):
+        with self._token_lock:
+            return super().get_access_token(*args, **kwargs)
+
+
 def init_spotify(client_id: str, client_secret: str, redirect_uri: str) -> spotipy.Spotify:
-    """inicializa el cliente spotify con OAuth"""
+    """
+    inicializa el cliente spotify con OAuth
+
+    Para reutilizar el mismo cliente en toda la corrida (y entre jobs) usar
+    services.client_registry.get_client("spotify").
+    """
     scope = "playlist-modify-public playlist-modify-private"
 
-    auth_manager = SpotifyOAuth(
+    auth_manager = SharedSpotifyOAuth(
         client_id = client_id,
         client_secret = client_secret,
         redirect_uri = redirect_uri,
-        scope = scope
+        scope = scope,
+        cache_handler = MemoryTokenCache()
     )
 
-    sp = spotipy.Spotify(auth_manager = auth_manager)
+    #con una sesión propia spotipy no monta su Retry (que reintenta 429/5xx y, al
+    #agotarse, reporta un 5xx como 429 sin headers): cada error llega con su status
+    #a call_with_retries, donde el Retry-After pausa a todos los hilos y los 5xx
+    #cuentan para el circuit breaker
+    sp = spotipy.Spotify(
+        auth_manager = auth_manager,
+        requests_session = requests.Session()
+    )
     return sp
 
-def search_track(sp: spotipy.Spotify, artist: str, title: str, duration_ms: int = None):
+#perfil del usuario de cada cliente (no cambia durante la corrida)
+_current_users: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_current_users_lock = threading.Lock()
+
+def get_current_user(sp: spotipy.Spotify) -> dict:
+    """sp.current_user(), pero se pide una sola vez por cliente y se reutiliza"""
+    with _current_users_lock:
+        me = _current_users.get(sp)
+    if me is None:
+        me = _api_call("current_user", sp.current_user)
+        with _current_users_lock:
+            me = _current_users.setdefault(sp, me)
+    return me
+
+def _retry_delay(error: Exception) -> Optional[float]:
+    """Cuánto esperar antes de reintentar (0 = backoff normal) o None si no tiene caso"""
+    if isinstance(error, SpotifyException):
+        if error.http_status == 429:
+            return retry_after_seconds(error.headers)
+        return 0.0 if error.http_status in SERVER_ERRORS else None
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return 0.0
+    return None
+
+def _api_call(endpoint: str, func: Callable[[], T]) -> T:
     """
-    Busca un track en Spotify usando tres estrategias:
-    1) Búsqueda estricta con qualifiers (track: / artist:)
-    2) Búsqueda flexible sin qualifiers
-    3) Fuzzy matching si las anteriores fallan
-    
-    Filtra por duración si está disponible.
+    Llamada a la API fuera de la búsqueda (perfil, crear/leer/limpiar
+    playlists) con el limiter compartido y reintentos ante 429, 5xx y
+    errores de red: spotipy ya no reintenta por su cuenta (ver init_spotify).
     """
-    from fuzzywuzzy import fuzz
-    
-    # 1) Búsqueda estricta
-    query_strict = f"track:{title} artist:{artist}"
-    result = sp.search(q=query_strict, type="track", limit=5)
-    items = result.get("tracks", {}).get("items", [])
-    
-    if items:
-        # Validar duración si está disponible
-        if duration_ms:
-            for item in items:
-                duration_diff = abs(item.get("duration_ms", 0) - duration_ms)
-                # Si la duración está dentro de ±5 segundos, es probablemente correcta
-                if duration_diff < 5000:
-                    return item
-        # Si no hay duración o no coincide exactamente, devolver el primero
-        return items[0]
-
-    # 2) Búsqueda flexible (sin qualifiers), hasta 5 resultados
-    query_flexible = f"{title} {artist}"
-    result = sp.search(q=query_flexible, type="track", limit=5)
-    items = result.get("tracks", {}).get("items", [])
-    
-    if items:
-        # Validar duración si está disponible
-        if duration_ms:
-            for item in items:
-                duration_diff = abs(item.get("duration_ms", 0) - duration_ms)
-                if duration_diff < 5000:
-                    return item
-        return items[0]
-
-    # 3) Fuzzy matching: Si nada funcionó, intentar con fuzzy
-    # Buscar solo por título (menos restrictivo)
-    query_title_only = title
-    result = sp.search(q=query_title_only, type="track", limit=10)
-    items = result.get("tracks", {}).get("items", [])
-    
-    if items:
-        # Calcular similitud fuzzy entre el artista buscado y los resultados
-        best_match = None
-        best_score = 0
-        
+    def _timed() -> T:
+        with METRICS.timer("api_request_seconds", service="spotify", endpoint=endpoint):
+            return func()
+
+    return call_with_retries(get_limiter("spotify"), _timed, _retry_delay, service="spotify", endpoint=endpoint)
+
+def _search(sp: spotipy.Spotify, query: str, limit: int, limiter: Optional[TokenBucket] = None) -> dict:
+    """
+    Hace un sp.search respetando el rate limiter (por defecto el compartido
+    de Spotify, ver get_limiter) y reintentando ante 429, 5xx y errores de red.
+    """
+    def _call() -> dict:
+        try:
+            with METRICS.timer("api_request_seconds", service="spotify", endpoint="search"):
+                return sp.search(q=query, type="track", limit=limit)
+        except SpotifyException as e:
+            METRICS.inc("api_errors_total", service="spotify", endpoint="search", status=e.http_status)
+            raise
+
+    return call_with_retries(
+        limiter or get_limiter("spotify"),
+        _call,
+        _retry_delay,
+        service="spotify",
+        endpoint="search",
+        max_retries=MAX_RATE_LIMIT_RETRIES
+    )
+
+class SearchResult(NamedTuple):
+    """Resultado de search_track_with_stage"""
+    item: Optional[dict]
+    stage: Optional[str] #estrategia que resolvió el track (None si no se encontró)
+    api_calls: int
+
+
+def _duration_ok(item: dict, duration_ms: Optional[int]) -> bool:
+    return abs(item.get("duration_ms", 0) - duration_ms) < DURATION_TOLERANCE_MS
+
+
+def _pick_by_duration(items: List[dict], duration_ms: Optional[int]) -> dict:
+    """El primer resultado con duración parecida, o el primero si no hay"""
+    if duration_ms:
         for item in items:
-            # Extraer artistas del resultado
-            item_artist = item["artists"][0]["name"] if item.get("artists") else ""
-            
-            # Calcular similitud
-            artist_similarity = fuzz.token_set_ratio(artist.lower(), item_artist.lower())
-            title_similarity = fuzz.token_set_ratio(title.lower(), item.get("name", "").lower())
-            
-            # Score combinado (60% artista, 40% título)
-            combined_score = (artist_similarity * 0.6) + (title_similarity * 0.4)
-            
-            # Validar duración
-            if duration_ms:
-                duration_diff = abs(item.get("duration_ms", 0) - duration_ms)
-                if duration_diff > 5000:
-                    combined_score *= 0.7  # Penalizar si la duración no coincide
-            
-            if combined_score > best_score:
-                best_score = combined_score
-                best_match = item
-        
-        # Solo devolver si el score es razonable (>60)
-        if best_match and best_score > 60:
-            return best_match
+            if _duration_ok(item, duration_ms):
+                return item
+    return items[0]
+
+
+def search_plan(
+        artist: str,
+        title: str,
+        duration_ms: int = None,
+        isrc: Optional[str] = None
+) -> Generator[Tuple[str, str, int], dict, SearchResult]:
+    """
+    Estrategia de búsqueda de un track, sin hacer las llamadas a la API:
+    0) Si se conoce el ISRC, una búsqueda exacta `isrc:` (una sola llamada).
+    1) Búsqueda amplia (título + artista, 10 resultados). Se califican todos los
+       candidatos y si el mejor pasa CONFIDENT_SCORE ya no se busca más.
+    2) Búsqueda estricta con qualifiers (track: / artist:).
+    3) Solo por título, con fuzzy matching sobre el artista.
+
+    Es un generador: entrega (etapa, query, limit), recibe la respuesta de
+    sp.search y al final devuelve un SearchResult. Así la misma lógica sirve
+    para el cliente normal y para el asíncrono.
+
+    Los candidatos de cada etapa se juntan con los anteriores y solo se
+    califican una vez.
+    """
+    candidates = {} #id -> (item, etapa en la que apareció)
+    scores = {}
+    api_calls = 0
+
+    def _add_candidates(stage: str, result: dict) -> List[dict]:
+        items = [item for item in result.get("tracks", {}).get("items", []) if item]
+
+        #solo se califican (en bloque) los candidatos que no habían aparecido
+        new_items = []
+        for item in items:
+            if item.get("id") and item["id"] not in candidates:
+                candidates[item["id"]] = (item, stage)
+                new_items.append(item)
+        for item, score in zip(new_items, score_candidates(artist, title, duration_ms, new_items)):
+            scores[item["id"]] = score
+        return items
+
+    def _best() -> Tuple[Optional[str], float]:
+        if not scores:
+            return None, 0
+        best_id = max(scores, key=scores.get)
+        return best_id, scores[best_id]
+
+    # 0) ISRC exacto
+    if isrc:
+        result = yield STAGE_ISRC, f"isrc:{isrc}", 1
+        api_calls += 1
+        items = result.get("tracks", {}).get("items", [])
+        if items and items[0]:
+            return SearchResult(items[0], STAGE_ISRC, api_calls)
+
+    # 1) Búsqueda amplia
+    result = yield STAGE_WIDE, f"{title} {artist}", 10
+    api_calls += 1
+    wide_items = _add_candidates(STAGE_WIDE, result)
+    best_id, best_score = _best()
+    if best_id and best_score >= CONFIDENT_SCORE:
+        return SearchResult(*candidates[best_id], api_calls)
+
+    # 2) Búsqueda estricta
+    result = yield STAGE_STRICT, f"track:{title} artist:{artist}", 5
+    api_calls += 1
+    strict_items = _add_candidates(STAGE_STRICT, result)
+    best_id, best_score = _best()
+
+    #si la estricta o la amplia dieron resultados, ya no se escala (igual que antes)
+    fallback_items, fallback_stage = (strict_items, STAGE_STRICT) if strict_items else (wide_items, STAGE_WIDE)
+    if fallback_items:
+        if best_id and best_score > MIN_SCORE:
+            return SearchResult(*candidates[best_id], api_calls)
+        return SearchResult(_pick_by_duration(fallback_items, duration_ms), fallback_stage, api_calls)
+
+    # 3) Solo por título (menos restrictivo), con fuzzy sobre el artista
+    result = yield STAGE_TITLE, title, 10
+    api_calls += 1
+    _add_candidates(STAGE_TITLE, result)
+    best_id, best_score = _best()
+    if best_id and best_score > MIN_SCORE:
+        return SearchResult(*candidates[best_id], api_calls)
+
+    return SearchResult(None, None, api_calls)
 
-    return None
+
+def search_track_with_stage(
+        sp: spotipy.Spotify,
+        artist: str,
+        title: str,
+        duration_ms: int = None,
+        limiter: Optional[TokenBucket] = None,
+        isrc: Optional[str] = None,
+        catalog=None
+) -> SearchResult:
+    """
+    Busca un track en Spotify con la estrategia de search_plan.
+    Devuelve el item encontrado, qué etapa lo resolvió y cuántas llamadas se hicieron.
+    Si se pasa un catálogo (ver CatalogIndex), ahí se guardan todos los
+    candidatos de cada respuesta.
+    """
+    plan = search_plan(artist, title, duration_ms, isrc)
+    try:
+        stage, query, limit = next(plan)
+        while True:
+            with METRICS.timer("search_stage_seconds", stage=stage):
+                result = _search(sp, query, limit, limiter)
+            if catalog is not None:
+                catalog.add_items(result.get("tracks", {}).get("items", []))
+            stage, query, limit = plan.send(result)
+    except StopIteration as stop:
+        return stop.value
+
+
+def search_track(
+        sp: spotipy.Spotify,
+        artist: str,
+        title: str,
+        duration_ms: int = None,
+        limiter: Optional[TokenBucket] = None,
+        isrc: Optional[str] = None
+):
+    """
+    Busca un track en Spotify (ver search_track_with_stage).
+    Devuelve el item de Spotify o None.
+    """
+    return search_track_with_stage(sp, artist, title, duration_ms, limiter, isrc).item
 
 def create_playlist(sp: spotipy.Spotify, username: str, name: str, description: str = "") -> str:
     """Crea un playlist y devuelve su ID"""
-    playlist = sp.user_playlist_create(
-        user = username,
-        name = name,
-        public = False,
-        description = description or "Creada con Clonador de Playlist"
+    playlist = _api_call(
+        "playlist_create",
+        lambda: sp.user_playlist_create(
+            user = username,
+            name = name,
+            public = False,
+            description = description or "Creada con Clonador de Playlist"
+        )
     )
     return playlist["id"]
 
-def add_tracks_in_batches(sp: spotipy.Spotify, playlist_id: str, track_ids: List[str]):
-    """Agrega tracks en lotes de máximo 100 (limitación de la API)."""
-    BATCH_SIZE = 100
+def open_playlist_writer(
+        sp: spotipy.Spotify,
+        playlist_id: str,
+        start: Optional[int] = None,
+        on_commit: Optional[Callable[[int], None]] = None,
+        limiter: Optional[TokenBucket] = None
+) -> PlaylistWriter:
+    """
+    PlaylistWriter para una playlist de Spotify (inserciones con posición).
+    start es cuántas canciones tiene ya la playlist (0 si se acaba de crear);
+    si es None se consulta a Spotify. Por defecto los lotes comparten el
+    limiter de Spotify con las búsquedas.
+    """
+    def _send(batch: List[str], position: int):
+        with METRICS.timer("api_request_seconds", service="spotify", endpoint="playlist_add_items"):
+            sp.playlist_add_items(playlist_id, batch, position=position)
+
+    return PlaylistWriter(
+        send=_send,
+        get_total=lambda: get_playlist_total(sp, playlist_id),
+        start=start,
+        retry_delay=_retry_delay,
+        on_commit=on_commit,
+        limiter=limiter or get_limiter("spotify"),
+        max_batch_size=BATCH_SIZE,
+    )
+
+def add_tracks_in_batches(
+        sp: spotipy.Spotify,
+        playlist_id: str,
+        track_ids: List[str],
+        on_batch: Optional[Callable[[int], None]] = None,
+        start: Optional[int] = None
+):
+    """
+    Agrega tracks al final de la playlist en lotes de máximo 100 (limitación
+    de la API), reintentando los lotes que fallan sin duplicar canciones.
+    on_batch(n) se llama después de cada lote con cuántas canciones tiene ya
+    la playlist. start como en open_playlist_writer.
+    """
+    with open_playlist_writer(sp, playlist_id, start=start, on_commit=on_batch) as writer:
+        writer.extend(track_ids)
+    print(f"→ Escritura: {writer.summary()}")
+
+def get_playlist_total(sp: spotipy.Spotify, playlist_id: str) -> int:
+    """Número de canciones que tiene una playlist (una sola llamada)"""
+    page = _api_call("playlist_items", lambda: sp.playlist_items(playlist_id, fields="total", limit=1))
+    return page.get("total", 0)
+
+def get_playlist_items(sp: spotipy.Spotify, playlist_id: str) -> List[dict]:
+    """Devuelve todos los tracks (items de Spotify) de una playlist, recorriendo todas las páginas"""
+    fields = "items(track(id,name,duration_ms,artists(name),external_ids)),next"
+    page = _api_call(
+        "playlist_items",
+        lambda: sp.playlist_items(playlist_id, fields=fields, limit=100, additional_types=("track",))
+    )
+
+    items = []
+    while page:
+        for entry in page.get("items", []):
+            track = entry.get("track")
+            #los episodios y tracks locales no tienen id
+            if track and track.get("id"):
+                items.append(track)
+        if not page.get("next"):
+            break
+        page = _api_call("playlist_items", lambda: sp.next(page))
+    return items
+
+def remove_tracks_in_batches(sp: spotipy.Spotify, playlist_id: str, track_ids: List[str]):
+    """Quita tracks de una playlist en lotes de máximo 100."""
     for i in range(0, len(track_ids), BATCH_SIZE):
         batch = track_ids[i : i + BATCH_SIZE]
-        sp.playlist_add_items(playlist_id, batch)
-        print (f"→ Agregadas {len(batch)} canciones a la playlist (total parcial: {i + len(batch)})")
+        _api_call("playlist_remove_items", lambda: sp.playlist_remove_all_occurrences_of_items(playlist_id, batch))
+        print(f"→ Quitadas {len(batch)} canciones de la playlist (total parcial: {i + len(batch)})")
@@ -0,0 +1,172 @@
+from typing import Callable, Dict, List, Optional, Sequence, Set
+from models import Track
+from services.match_cache import MatchCache
+from services.matching_service import stream_resolve, ResolveStats, DEFAULT_WORKERS, STAGE_ERROR
+from services.normalization import canonical_artist, canonical_title, normalize_text
+from services.rate_limiter import TokenBucket
+from services.spotify_service import get_playlist_items, add_tracks_in_batches, remove_tracks_in_batches
+
+
+def sync_key(artist: str, title: str) -> str:
+    """Llave artista/título sin duración (las fuentes de texto no la tienen)"""
+    return f"{normalize_text(artist)}|{normalize_text(title)}"
+
+
+def loose_key(artist: str, title: str) -> str:
+    """Llave canónica (sin acentos, invitados ni sufijos como "Remastered") para no quitar parecidos"""
+    return f"{canonical_artist(artist)}|{canonical_title(title)}"
+
+
+def _isrc_key(isrc: Optional[str]) -> Optional[str]:
+    return isrc.upper() if isrc else None
+
+
+def sync_playlist(
+        sp,
+        playlist_id: str,
+        tracks: Sequence[Track],
+        workers: int = DEFAULT_WORKERS,
+        limiter: Optional[TokenBucket] = None,
+        cache: Optional[MatchCache] = None,
+        prune: bool = False,
+        catalog=None,
+        source_complete: bool = True,
+        confirm: Optional[Callable[[List[dict]], bool]] = None,
+) -> dict:
+    """
+    Sincroniza una playlist de Spotify ya existente con las canciones de la fuente.
+
+    Lee la playlist destino y la compara con la fuente por ISRC o por
+    artista/título normalizados. Solo se buscan y agregan las canciones que
+    faltan; con prune=True también se quitan las que ya no están en la fuente.
+    catalog igual que en stream_resolve.
+
+    Quitar canciones solo es seguro si `tracks` es la fuente completa: no
+    se quita nada si la fuente está vacía o source_complete=False (falló la
+    lectura de alguna fuente). Tampoco se quitan las canciones del destino
+    que se parecen (ver loose_key) a una de la fuente que no se pudo
+    resolver, y si alguna búsqueda falló (Spotify no respondió) no se
+    quita nada. Antes de quitar se muestra cuántas son y, si se pasa,
+    confirm(items) decide si se quitan.
+    """
+    print(f"\n→ Leyendo playlist destino {playlist_id}...")
+    existing = get_playlist_items(sp, playlist_id)
+    print(f"→ La playlist tiene {len(existing)} canciones")
+
+    #llaves de lo que ya está en el destino → id de Spotify
+    by_isrc: Dict[str, str] = {}
+    by_key: Dict[str, str] = {}
+    for item in existing:
+        isrc = _isrc_key((item.get("external_ids") or {}).get("isrc"))
+        if isrc:
+            by_isrc.setdefault(isrc, item["id"])
+        artist = item["artists"][0]["name"] if item.get("artists") else ""
+        by_key.setdefault(sync_key(artist, item.get("name", "")), item["id"])
+
+    existing_ids: Set[str] = {item["id"] for item in existing}
+    kept_ids: Set[str] = set()
+    delta: List[Track] = []
+
+    for track in tracks:
+        matched = by_isrc.get(_isrc_key(track.isrc)) if track.isrc else None
+        matched = matched or by_key.get(sync_key(track.artist, track.title))
+        if matched:
+            kept_ids.add(matched)
+        else:
+            delta.append(track)
+
+    print(f"→ {len(tracks) - len(delta)} canciones ya están en la playlist, {len(delta)} por buscar")
+
+    # buscar solo las que faltan
+    stats = ResolveStats()
+    to_add: List[str] = []
+    not_found: List[Track] = []
+    for song, item in stream_resolve(
+            sp, delta, workers=workers, limiter=limiter, cache=cache, stats=stats, catalog=catalog
+    ):
+        if not item:
+            not_found.append(song)
+            continue
+        #puede que ya estuviera con otro nombre (p. ej. "Remastered")
+        if item["id"] not in existing_ids and item["id"] not in kept_ids:
+            to_add.append(item["id"])
+        kept_ids.add(item["id"])
+    if delta:
+        print(f"→ Búsquedas: {stats.summary()}")
+
+    if to_add:
+        print(f"→ Agregando {len(to_add)} canciones nuevas...")
+        add_tracks_in_batches(sp, playlist_id, to_add)
+
+    removed: List[str] = []
+    if prune:
+        if stats.stages[STAGE_ERROR]:
+            #no se sabe a qué canción del destino corresponden las búsquedas que fallaron
+            print(f"⚠️  {stats.stages[STAGE_ERROR]} búsquedas fallaron: no se quita nada de la playlist")
+        else:
+            removed = _prune(sp, playlist_id, existing, kept_ids, tracks, not_found, source_complete, confirm)
+
+    return {
+        "status": "success",
+        "destination": "Spotify",
+        "playlist_id": playlist_id,
+        "playlist_name": playlist_id,
+        "total": len(tracks),
+        "found": len(tracks) - len(not_found),
+        "added": len(to_add),
+        "removed": len(removed),
+        "not_found": len(not_found),
+        "not_found_list": not_found
+    }
+
+
+def _prune(
+        sp,
+        playlist_id: str,
+        existing: List[dict],
+        kept_ids: Set[str],
+        tracks: Sequence[Track],
+        not_found: List[Track],
+        source_complete: bool,
+        confirm: Optional[Callable[[List[dict]], bool]],
+) -> List[str]:
+    """Quita del destino lo que ya no está en la fuente; devuelve los ids quitados"""
+    if not tracks:
+        print("⚠️  La fuente no tiene canciones: no se quita nada de la playlist")
+        return []
+    if not source_complete:
+        print("⚠️  La fuente no se leyó completa: no se quita nada de la playlist")
+        return []
+
+    #una canción que no se pudo resolver puede estar en el destino con otro nombre
+    unresolved = {loose_key(song.artist, song.title) for song in not_found}
+    to_remove: Dict[str, dict] = {}
+    protected = 0
+    for item in existing:
+        if item["id"] in kept_ids or item["id"] in to_remove:
+            continue
+        artists = [artist.get("name", "") for artist in item.get("artists") or []] or [""]
+        if any(loose_key(artist, item.get("name", "")) in unresolved for artist in artists):
+            protected += 1
+            continue
+        to_remove[item["id"]] = item
+
+    if protected:
+        print(f"→ {protected} canciones se parecen a canciones no encontradas de la fuente: se dejan")
+    if not to_remove:
+        return []
+
+    print(f"→ {len(to_remove)} canciones de la playlist ya no están en la fuente:")
+    for item in list(to_remove.values())[:10]:
+        artist = item["artists"][0]["name"] if item.get("artists") else ""
+        print(f"  - {artist} - {item.get('name', '')}")
+    if len(to_remove) > 10:
+        print(f"  ... y {len(to_remove) - 10} más")
+    if confirm is not None and not confirm(list(to_remove.values())):
+        print("→ No se quitó ninguna canción")
+        return []
+
+    removed = list(to_remove)
+    print(f"→ Quitando {len(removed)} canciones que ya no están en la fuente...")
+    remove_tracks_in_batches(sp, playlist_id, removed)
+    return removed
@@ -1,11 +1,51 @@
-from typing import List, Optional
-from models import Track
+import re
+from typing import Iterator, List, Optional
+from models import IncompleteSourceError, Track
+from services.client_registry import get_client
+from services.metrics import METRICS
+from services.rate_limiter import TokenBucket, call_with_retries, get_limiter
 
-try:
-    from ytmusicapi import YTMusic
-except ImportError:
-    print("ytmusicapi no instalado, instala con pip install ytmusicapi")
-    YTMusic = None
+#ytmusicapi no expone el status: lo incluye en el mensaje ("Server returned HTTP 429: ...")
+_HTTP_STATUS = re.compile(r"HTTP (\d{3})")
+#YouTube no manda Retry-After: segundos de pausa ante un 429
+THROTTLE_PAUSE = 5.0
+#endpoints de la API interna de YouTube Music que se pasan por la caché HTTP
+BROWSE_PATHS = ("/youtubei/v1/browse",)
+
+#ytmusicapi.YTMusic, cargado al crear el primer cliente
+_ytmusic_class = None
+_ytmusic_checked = False
+
+
+def load_ytmusic():
+    """
+    Importa ytmusicapi.YTMusic la primera vez que se necesita (no en cada
+    arranque del CLI). Avisa y devuelve None si no está instalado.
+    """
+    global _ytmusic_class, _ytmusic_checked
+    if not _ytmusic_checked:
+        _ytmusic_checked = True
+        try:
+            from ytmusicapi import YTMusic
+            _ytmusic_class = YTMusic
+        except ImportError:
+            print("ytmusicapi no instalado, instala con pip install ytmusicapi")
+    return _ytmusic_class
+
+
+def _retry_delay(error: Exception) -> Optional[float]:
+    """Cuánto esperar antes de reintentar (0 = backoff normal) o None si no tiene caso"""
+    import requests
+
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return 0.0
+    match = _HTTP_STATUS.search(str(error))
+    if not match:
+        return None
+    status = int(match.group(1))
+    if status == 429:
+        return THROTTLE_PAUSE
+    return 0.0 if status >= 500 else None
 
 
 class YoutubeMusicClient:
@@ -17,13 +57,57 @@ class YoutubeMusicClient:
     La creación de playlists requiere configuración adicional que se añadirá en el futuro.
     """
 
-    def __init__(self):
-        """inicializa el cliente sin autenticar (solo lectura)"""
+    def __init__(
+            self,
+            yt=None,
+            pool_size: Optional[int] = None,
+            limiter: Optional[TokenBucket] = None,
+            http_cache=None
+    ):
+        """
+        inicializa el cliente sin autenticar (solo lectura)
+        yt permite reutilizar una instancia de YTMusic ya creada
+        pool_size: conexiones keep-alive de la sesión HTTP, para compartir el
+        cliente entre hilos (ver services.client_registry)
+        limiter: por defecto el compartido de YouTube Music (ver get_limiter)
+        http_cache: caché (HttpCache) para las lecturas de playlists; solo se
+        usa si su vigencia por defecto (fresh_seconds) es mayor que 0
+        """
+        self.limiter = limiter or get_limiter("youtube")
+        self.session = None
+        if yt is not None:
+            self.yt = yt
+            return
+
+        YTMusic = load_ytmusic()
         if YTMusic is None:
             raise RuntimeError("ytmusicapi no está instalado")
+
+        #la API interna marca todo como no cacheable y no manda ETag: sin una vigencia
+        #por defecto (--http-cache-fresh) nada se guardaría y cada petición solo
+        #pagaría la consulta a SQLite
+        if http_cache is not None and http_cache.fresh_seconds <= 0:
+            http_cache = None
         
         #Inicializar sin archivo de auth (solo lectura de playlists públicas por el momento)
-        self.yt = YTMusic()
+        if pool_size or http_cache is not None:
+            import requests
+            from services.http_cache_adapter import mount_http_cache
+
+            self.session = requests.Session()
+            #YTMusic lee playlists (y sus continuaciones) con POST a /browse; las búsquedas
+            #no se cachean y las lecturas se reutilizan mientras estén frescas
+            mount_http_cache(
+                self.session,
+                http_cache,
+                pool_size,
+                methods=("POST",),
+                paths=BROWSE_PATHS,
+                respect_cache_control=False
+            )
+            self.yt = YTMusic(requests_session=self.session)
+        else:
+            self.yt = YTMusic()
     
     def search_tracks(self, query: str, limit: int=5) -> List[Track]:
         """
@@ -33,7 +117,7 @@ class YoutubeMusicClient:
 
         try:
             #search_songs devolverá resultados de canciones
-            results = self.yt.search(query, filter="songs", limit=limit)
+            results = self._call("search", self.yt.search, query, filter="songs", limit=limit)
 
             tracks = []
             for item in results:
@@ -54,6 +138,7 @@ class YoutubeMusicClient:
             print(f"→ Se encontraron {len(tracks)} canciones en Youtube Music")
             return tracks
         except Exception as e:
+            METRICS.inc("api_errors_total", service="youtube", endpoint="search")
             print(f" Error buscando en Youtube Music: {e}")
             return []
     
@@ -68,6 +153,25 @@ class YoutubeMusicClient:
         o un ID de playlist:
         PLrAXtmErZgOeiKm4sgNOknGvNjby9efdf
         """
+        tracks = list(self.iter_tracks_from_playlist(playlist_url))
+        print(f"→ Se obtuvieron {len(tracks)} canciones desde Youtube Music")
+        return tracks
+
+    def iter_tracks_from_playlist(self, playlist_url: str) -> Iterator[Track]:
+        """
+        Igual que get_tracks_from_playlist, pero entrega las canciones una por una.
+
+        Se piden todas las páginas de continuación (limit=None); con el límite
+        por defecto de ytmusicapi las playlists largas llegan cortadas a 100.
+        ytmusicapi descarga la playlist completa antes de devolverla, así que
+        la memoria no queda acotada; solo cada elemento crudo se suelta en
+        cuanto se convierte a Track, para que lo que se guarda después (p. ej.
+        un TrackStore) no conviva con la respuesta completa.
+
+        Si la playlist no se pudo leer o se recibieron menos canciones que el
+        total que reporta YouTube Music se lanza IncompleteSourceError (igual
+        que en Deezer), en lugar de terminar como una lectura vacía o corta.
+        """
         print(f"(YoutubeMusicClient) Obteniendo canciones de Youtube Music desde {playlist_url}")
 
         # Extraer ID de la playlist
@@ -75,49 +179,77 @@ class YoutubeMusicClient:
 
         if not playlist_id:
             print("❌ Error: No se pudo extraer el ID de la playlist")
-            return []
+            return
         
         try:
-            # Obtener playlist y canciones
-            playlist_contents = self.yt.get_playlist(playlist_id)
+            # Obtener playlist y canciones (todas las páginas)
+            #una sola llamada aunque ytmusicapi pida varias páginas de continuación
+            playlist_contents = self._call("get_playlist", self.yt.get_playlist, playlist_id, limit=None)
+        except Exception as e:
+            METRICS.inc("api_errors_total", service="youtube", endpoint="get_playlist")
+            METRICS.inc("source_incomplete_total", source="youtube")
+            print("   Tip: Asegúrate de que la URL es correcta y la playlist es pública")
+            raise IncompleteSourceError(f"Error obteniendo playlist de Youtube Music: {e}") from e
             
-            # Validar que se obtuvo la playlist
-            if playlist_contents is None:
-                print("❌ Error: No se pudo obtener la playlist (puede ser privada o no existe)")
-                return []
+        # Validar que se obtuvo la playlist
+        if playlist_contents is None:
+            METRICS.inc("source_incomplete_total", source="youtube")
+            raise IncompleteSourceError("No se pudo obtener la playlist de Youtube Music (puede ser privada o no existe)")
             
-            # Validar que tiene canciones
-            if "tracks" not in playlist_contents or playlist_contents["tracks"] is None:
-                print("❌ Error: La playlist no tiene canciones o no se pudieron cargar")
-                return []
+        # Validar que tiene canciones
+        items = playlist_contents.get("tracks")
+        if items is None:
+            METRICS.inc("source_incomplete_total", source="youtube")
+            raise IncompleteSourceError("No se pudieron cargar las canciones de la playlist de Youtube Music")
 
-            tracks = []
-            for item in playlist_contents.get("tracks", []):
-                # Validar que item no sea None
-                if item is None:
-                    continue
-                
-                artist_name = ""
-                if "artists" in item and item["artists"] and len(item["artists"]) > 0:
-                    artist_name = item["artists"][0].get("name", "")
+        expected = playlist_contents.get("trackCount")
+        received = len(items)
+        del playlist_contents
+        for idx in range(received):
+            item, items[idx] = items[idx], None #se suelta el dict crudo
+            track = self._track_from_item(item)
+            if track is not None:
+                yield track
 
-                title = item.get("title", "")
+        if isinstance(expected, int) and received < expected:
+            METRICS.inc("source_incomplete_total", source="youtube")
+            raise IncompleteSourceError(
+                f"Youtube Music reporta {expected} canciones en la playlist, "
+                f"pero solo se recibieron {received} (canciones no disponibles u ocultas)"
+            )
 
-                if title:
-                    track = Track(
-                        artist=artist_name or "Artista Desconocido",
-                        title=title,
-                        album=item.get("album", {}).get("name", "") if item.get("album") else ""
-                    )
-                    tracks.append(track)
-            
-            print(f"→ Se obtuvieron {len(tracks)} canciones desde Youtube Music")
-            return tracks
-            
-        except Exception as e:
-            print(f"❌ Error obteniendo playlist de Youtube Music: {e}")
-            print("   Tip: Asegúrate de que la URL es correcta y la playlist es pública")
-            return []
+    def _call(self, endpoint: str, func, *args, **kwargs):
+        """Llamada a ytmusicapi con el limiter compartido y reintentos ante 429, 5xx y errores de red"""
+        def _timed():
+            with METRICS.timer("api_request_seconds", service="youtube", endpoint=endpoint):
+                return func(*args, **kwargs)
+
+        return call_with_retries(self.limiter, _timed, _retry_delay, service="youtube", endpoint=endpoint)
+
+    @staticmethod
+    def _track_from_item(item: Optional[dict]) -> Optional[Track]:
+        """Convierte un elemento de get_playlist en Track; None si no tiene título"""
+        # Validar que item no sea None
+        if item is None:
+            return None
+
+        title = item.get("title", "")
+        if not title:
+            return None
+
+        artist_name = ""
+        if item.get("artists"):
+            artist_name = item["artists"][0].get("name", "")
+
+        #la duración alimenta el filtro por duración de la búsqueda en Spotify
+        duration = item.get("duration_seconds")
+        return Track(
+            artist=artist_name or "Artista Desconocido",
+            title=title,
+            album=item.get("album", {}).get("name", "") if item.get("album") else "",
+            duration_ms=int(duration) * 1000 if duration else None,
+            source_id=item.get("videoId")
+        )
     
     def _extract_playlist_id(self, url_or_id: str) -> Optional[str]:
         """
@@ -192,5 +324,14 @@ def get_tracks_from_youtube_music_playlist(playlist_url: str) -> List[Track]:
     Función de alto nivel usada por el CLI.
     envuelve al YoutubeMusicClient.
     """
-    client = YoutubeMusicClient()
+    client = get_client("youtube")
     return client.get_tracks_from_playlist(playlist_url)
+
+
+def iter_tracks_from_youtube_music_playlist(playlist_url: str) -> Iterator[Track]:
+    """
+    Igual que get_tracks_from_youtube_music_playlist, pero entrega las
+    canciones una por una (para el modo streaming).
+    """
+    client = get_client("youtube")
+    return client.iter_tracks_from_playlist(playlist_url)